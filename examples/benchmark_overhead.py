@@ -0,0 +1,122 @@
+"""
+Measures the fixed per-request overhead of Pokie over bare Flask
+
+Each application is called directly through its WSGI entrypoint, without sockets, so the results only include
+framework dispatch: the Pokie entry path (init check, middleware chain), PokieView construction and dispatch, and
+response assembly.
+
+usage: python examples/benchmark_overhead.py [requests]
+"""
+import sys
+from time import perf_counter
+from typing import Callable
+
+from flask import Flask, jsonify
+from rick.base import Container
+from werkzeug.test import EnvironBuilder
+
+from pokie.core import FlaskApplication
+from pokie.http import PokieView
+
+
+class HelloView(PokieView):
+    def get(self):
+        return self.success({"hello": "world"})
+
+
+def bare_flask() -> Flask:
+    app = Flask("bare", static_folder=None)
+
+    @app.route("/hello")
+    def hello():
+        return jsonify({"success": True, "data": {"hello": "world"}})
+
+    return app
+
+
+def pokie_function() -> Flask:
+    pokie_app = FlaskApplication(Container({}))
+    app = pokie_app.build([])
+
+    @app.route("/hello")
+    def hello():
+        return jsonify({"success": True, "data": {"hello": "world"}})
+
+    pokie_app.init()
+    return app
+
+
+def pokie_view() -> Flask:
+    pokie_app = FlaskApplication(Container({}))
+    app = pokie_app.build([])
+    app.add_url_rule("/hello", view_func=HelloView.as_view("hello"))
+    pokie_app.init()
+    return app
+
+
+def wsgi_call(app: Flask) -> Callable:
+    """
+    Build a function that performs a GET /hello request through the WSGI entrypoint
+    :param app:
+    :return:
+    """
+    environ = EnvironBuilder(path="/hello").get_environ()
+
+    def start_response(status, headers, exc_info=None):
+        pass
+
+    def call():
+        body = app(dict(environ), start_response)
+        for _ in body:
+            pass
+        if hasattr(body, "close"):
+            body.close()
+
+    return call
+
+
+def measure(call: Callable, count: int) -> float:
+    """
+    :param call:
+    :param count:
+    :return: average seconds per request
+    """
+    start = perf_counter()
+    for _ in range(count):
+        call()
+    return (perf_counter() - start) / count
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    rounds = 20
+    apps = [
+        ("flask", wsgi_call(bare_flask())),
+        ("pokie + flask function", wsgi_call(pokie_function())),
+        ("pokie + PokieView", wsgi_call(pokie_view())),
+    ]
+
+    # warm up caches and lazy initialization
+    for _, call in apps:
+        measure(call, min(count, 1000))
+
+    # rounds are interleaved, and the best round of each application is used, to reduce noise
+    best = {}
+    for _ in range(rounds):
+        for name, call in apps:
+            elapsed = measure(call, count)
+            if name not in best.keys() or elapsed < best[name]:
+                best[name] = elapsed
+
+    baseline = best["flask"]
+    print("{:<26} {:>12} {:>14}".format("application", "us/request", "overhead (us)"))
+    for name, _ in apps:
+        print(
+            "{:<26} {:>12.2f} {:>14.2f}".format(
+                name, best[name] * 1e6, (best[name] - baseline) * 1e6
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,7 @@ class Config(EnvironmentConfig, PokieConfig):
     REDIS_SSL = "0"
     REDIS_PORT = 6379
     REDIS_PASSWORD = "myRedisPassword"
+    AUTH_SECRET = "pokie-test-secret"
     TEST_MANAGE_DB = True
     TEST_DB_SSL = False
 
@@ -1,3 +1,4 @@
 from .dummy import DummyCache
 from .memory import MemoryCache
 from .redis import RedisCache
+from .local import LocalCache
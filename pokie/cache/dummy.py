@@ -10,3 +10,9 @@ class DummyCache(CacheNull, Injectable):
 
     def __init__(self, di: Di):
         super().__init__(di)
+
+    def incr(self, key, amount: int = 1) -> int:
+        return 0
+
+    def get_counter(self, key) -> int:
+        return 0
@@ -0,0 +1,61 @@
+import threading
+from collections import OrderedDict
+from time import monotonic
+
+from rick.resource import CacheInterface
+
+
+class LocalCache(CacheInterface):
+    """
+    Bounded in-process LRU cache with optional TTL
+
+    Values are stored by reference (no serialization), so cached objects should be treated as immutable.
+    This cache is process-local; it is meant to sit in front of a shared cache for hot-path lookups
+    """
+
+    def __init__(self, max_size: int = 10000, ttl: float = None):
+        """
+        :param max_size: max number of entries; least recently used entries are evicted first
+        :param ttl: default ttl in seconds; None means entries only expire by eviction
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key, None)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires is not None and expires < monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        if ttl is None:
+            ttl = self.ttl
+        expires = None if ttl is None else monotonic() + ttl
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def has(self, key):
+        return self.get(key) is not None
+
+    def remove(self, key):
+        with self._lock:
+            if key in self._data.keys():
+                del self._data[key]
+
+    def purge(self):
+        with self._lock:
+            self._data = OrderedDict()
+
+    def __len__(self):
+        return len(self._data)
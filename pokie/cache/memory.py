@@ -1,4 +1,5 @@
 import pickle
+import threading
 
 from rick.base import Di
 from rick.mixin import Injectable
@@ -18,6 +19,7 @@ class MemoryCache(CacheInterface, Injectable):
     def __init__(self, di: Di):
         super().__init__(di)
         self.cache = {}
+        self._lock = threading.Lock()
 
     def get(self, key):
         if key not in self.cache.keys():
@@ -34,5 +36,18 @@ class MemoryCache(CacheInterface, Injectable):
         if key in self.cache.keys():
             del self.cache[key]
 
+    def incr(self, key, amount: int = 1) -> int:
+        # counters are shared between threads; read-modify-write must be atomic
+        with self._lock:
+            value = self.get_counter(key) + amount
+            self.set(key, value)
+            return value
+
+    def get_counter(self, key) -> int:
+        value = self.get(key)
+        if value is None:
+            return 0
+        return int(value)
+
     def purge(self):
         self.cache = {}
@@ -17,3 +17,28 @@ class RedisCache(BaseRedisCache, Injectable):
         self._deserialize = pickle.loads
         self._prefix = None
         self._redis = di.get(DI_REDIS)
+
+    def incr(self, key, amount: int = 1) -> int:
+        """
+        Atomically increment an integer counter
+        Counters are stored as plain integers, and must be read with get_counter()
+        :param key:
+        :param amount:
+        :return: new counter value
+        """
+        if self._prefix is not None:
+            key = key + self._prefix
+        return self._redis.incr(key, amount)
+
+    def get_counter(self, key) -> int:
+        """
+        Read an integer counter created by incr()
+        :param key:
+        :return: counter value, or 0 if counter does not exist
+        """
+        if self._prefix is not None:
+            key = key + self._prefix
+        value = self._redis.get(key)
+        if value is None:
+            return 0
+        return int(value)
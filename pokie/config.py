@@ -1,4 +1,3 @@
-import uuid
 from rick.resource.config import StrOrFile
 
 
@@ -6,6 +5,9 @@ class PokieConfig:
     # default HTTP Exception Handler - 404 and 500 exceptions
     HTTP_ERROR_HANDLER = "pokie.http.HttpErrorHandler"
 
+    # if true, the time spent in each module middleware stage is recorded on the http_middleware:<name> metrics
+    HTTP_MIDDLEWARE_TIMING = True
+
     # if true, all endpoints are authenticated by default
     USE_AUTH = True
 
@@ -15,12 +17,58 @@ class PokieConfig:
     # If true, ACL are loaded for users
     AUTH_ACL = True
 
-    # Secret key for flask-login hashing
-    AUTH_SECRET = uuid.uuid4().hex
+    # Secret key for flask-login hashing and JWT signing; required by JWTProvider. If empty, SessionProvider uses a
+    # random per-process secret
+    AUTH_SECRET = ""
 
     # Enables cache on User and Acl Services
     AUTH_USE_CACHE = True
 
+    # TTL (in seconds) for cached negative lookups (unknown usernames and tokens); 0 disables negative caching
+    AUTH_NEGATIVE_TTL = 60
+
+    # Compiled ACLs are kept in-process; the shared ACL change version is checked every AUTH_ACL_CHECK_INTERVAL
+    # seconds, and entries expire after AUTH_ACL_LOCAL_TTL seconds regardless of version
+    AUTH_ACL_CHECK_INTERVAL = 1
+    AUTH_ACL_LOCAL_TTL = 300
+    AUTH_ACL_LOCAL_SIZE = 10000
+
+    # TokenProvider: lifetime of issued tokens (0 for non-expiring tokens), and in-process token cache; revoked
+    # tokens are rejected by every worker within AUTH_TOKEN_LOCAL_TTL seconds
+    AUTH_TOKEN_TTL = 86400
+    AUTH_TOKEN_LOCAL_TTL = 5
+    AUTH_TOKEN_LOCAL_SIZE = 10000
+
+    # JWTProvider: token lifetimes (in seconds), and interval for loading new revocations from jwt_revoked; each
+    # load re-reads revocations from the last AUTH_JWT_REVOKED_MARGIN seconds before the previous one, to cover
+    # slow transactions and clock differences between workers and the database
+    AUTH_JWT_ACCESS_TTL = 900
+    AUTH_JWT_REFRESH_TTL = 1209600
+    AUTH_JWT_REVOKED_INTERVAL = 5
+    AUTH_JWT_REVOKED_MARGIN = 60
+
+    # Password hashing runs in a per-process pool of AUTH_HASHER_WORKERS threads; when AUTH_HASHER_QUEUE_SIZE
+    # operations are already waiting, logins fail fast with 503. 0 workers hashes inline on the request thread
+    AUTH_HASHER_WORKERS = 2
+    AUTH_HASHER_QUEUE_SIZE = 32
+
+    # last_login updates are written inline by default; if AUTH_LASTLOGIN_STALENESS is > 0, they are buffered
+    # in-process and written in batches once the oldest pending update is AUTH_LASTLOGIN_STALENESS seconds old,
+    # checked every AUTH_LASTLOGIN_INTERVAL seconds; buffered updates are lost if the process is killed
+    AUTH_LASTLOGIN_INTERVAL = 1
+    AUTH_LASTLOGIN_STALENESS = 0
+
+    # TokenPruneJob: removes expired tokens and JWT revocations every AUTH_PRUNE_INTERVAL seconds, in batches of
+    # AUTH_PRUNE_BATCH_SIZE rows with AUTH_PRUNE_BATCH_DELAY_MS milliseconds between batches
+    AUTH_PRUNE_INTERVAL = 300
+    AUTH_PRUNE_BATCH_SIZE = 1000
+    AUTH_PRUNE_BATCH_DELAY_MS = 100
+
+    # SessionProvider: if true, the user ACL is stored in the (signed) session cookie and reused until the ACL
+    # version moves or AUTH_SESSION_ACL_TTL seconds have passed; user records are then only loaded on access
+    AUTH_SESSION_ACL = False
+    AUTH_SESSION_ACL_TTL = 60
+
     # cache table-related metadata (such as primary key info)
     # development should be false
     DB_CACHE_METADATA = False
@@ -41,6 +89,61 @@ class PokieConfig:
     REDIS_PASSWORD = StrOrFile("")
     REDIS_DB = 0
     REDIS_SSL = "1"
+    REDIS_MAX_CONNECTIONS = 50  # max connections per process
+    REDIS_POOL_TIMEOUT = 5  # seconds to wait for a free pool connection
+    REDIS_SOCKET_TIMEOUT = 5
+    REDIS_CONNECT_TIMEOUT = 2
+    REDIS_HEALTH_CHECK_INTERVAL = 30
+    REDIS_KEEPALIVE = True
+
+    # job scheduler
+    JOB_WORKERS = 4  # max number of concurrently running jobs
+    JOB_IDLE_INTERVAL = 15  # seconds between runs of jobs without schedule; failed runs also back off exponentially
+    JOB_STATE_FILE = ""  # job state file, used by job:list; if empty, a file in the temp dir is used
+    # singleton jobs (singleton = True) run on a single node at a time, holding a lock from JOB_LOCK_BACKEND:
+    # "db" (PostgreSQL advisory lock) or "redis" (lease of JOB_LOCK_TTL seconds, renewed while held)
+    JOB_LOCK_BACKEND = "db"
+    JOB_LOCK_TTL = 30
+    # if true, job state is also published to redis, so job:status reports every node
+    JOB_STATE_REDIS = False
+    # job:status reports workers without state updates, and due jobs not started, for this long as stale/late
+    JOB_STALE_AFTER = 60
+
+    # task queue: TaskQueueJob only runs with the module jobs if TASK_QUEUE_JOB is true. It polls for due tasks
+    # every TASK_POLL_INTERVAL seconds, claiming TASK_BATCH_SIZE tasks at a time; claimed tasks not finished within
+    # TASK_LEASE seconds are considered abandoned and run again. Failed tasks are retried after
+    # TASK_RETRY_DELAY * 2^(attempts - 1) seconds (up to TASK_RETRY_MAX_DELAY), and are moved to the dead-letter
+    # state after TASK_MAX_ATTEMPTS attempts
+    TASK_QUEUE_JOB = False
+    TASK_POLL_INTERVAL = 1
+    TASK_BATCH_SIZE = 10
+    TASK_LEASE = 300
+    TASK_MAX_ATTEMPTS = 5
+    TASK_RETRY_DELAY = 5
+    TASK_RETRY_MAX_DELAY = 3600
+
+    # outbox: OutboxRelayJob only runs with the module jobs if OUTBOX_RELAY_JOB is true. It publishes pending events
+    # every OUTBOX_POLL_INTERVAL seconds, OUTBOX_BATCH_SIZE events at a time. Failed events are retried after
+    # OUTBOX_RETRY_DELAY * 2^(attempts - 1) seconds (up to OUTBOX_RETRY_MAX_DELAY), holding back the events after
+    # them; events failing OUTBOX_MAX_ATTEMPTS times are marked as dead, and published events are removed after
+    # OUTBOX_RETENTION seconds
+    OUTBOX_RELAY_JOB = False
+    OUTBOX_POLL_INTERVAL = 1
+    OUTBOX_BATCH_SIZE = 100
+    OUTBOX_MAX_ATTEMPTS = 10
+    OUTBOX_RETRY_DELAY = 5
+    OUTBOX_RETRY_MAX_DELAY = 3600
+    OUTBOX_RETENTION = 604800
+
+    # deferred event handlers run on a per-process pool of EVENT_WORKERS threads; when EVENT_QUEUE_SIZE handler
+    # runs are pending, new ones are dropped
+    EVENT_WORKERS = 2
+    EVENT_QUEUE_SIZE = 1000
+
+    # CLI: list, help and shell completion read command details from a cached manifest, rebuilt when module command
+    # maps or source files change; if CLI_MANIFEST_FILE is empty, a file in the user cache dir is used
+    CLI_MANIFEST = True
+    CLI_MANIFEST_FILE = ""
 
     # Pytest Configuration
     TEST_DB_NAME = "pokie_test"  # test database parameters
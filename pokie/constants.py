@@ -14,6 +14,7 @@ HTTP_FORBIDDEN = 403
 HTTP_NOT_FOUND = 404
 HTTP_NOT_ALLOWED = 405
 HTTP_INTERNAL_ERROR = 500
+HTTP_SERVICE_UNAVAILABLE = 503
 
 # DI Keys
 DI_CONFIG = "config"  # config object
@@ -27,10 +28,12 @@ DI_CACHE = "cache"  # generic cache client
 DI_EVENTS = "event_manager"  # event manager
 DI_TTY = "tty"  # console writer
 DI_SIGNAL = "signal"  # signal manager
+DI_METRICS = "metrics"  # metrics registry
 DI_HTTP_ERROR_HANDLER = "http_error_handler"  # http exception manager
 
 # Flask error Handler configuration
 CFG_HTTP_ERROR_HANDLER = "http_error_handler"
+CFG_HTTP_MIDDLEWARE_TIMING = "http_middleware_timing"
 
 # DB Configuration
 CFG_DB_NAME = "db_name"
@@ -48,10 +51,33 @@ CFG_REDIS_PORT = "redis_port"
 CFG_REDIS_PASSWORD = "redis_password"
 CFG_REDIS_DB = "redis_db"
 CFG_REDIS_SSL = "redis_ssl"
+CFG_REDIS_MAX_CONNECTIONS = "redis_max_connections"
+CFG_REDIS_POOL_TIMEOUT = "redis_pool_timeout"
+CFG_REDIS_SOCKET_TIMEOUT = "redis_socket_timeout"
+CFG_REDIS_CONNECT_TIMEOUT = "redis_connect_timeout"
+CFG_REDIS_HEALTH_CHECK_INTERVAL = "redis_health_check_interval"
+CFG_REDIS_KEEPALIVE = "redis_keepalive"
 
 # Auth Configuration
 CFG_AUTH_SECRET = "auth_secret"
 
+# Job scheduler configuration
+CFG_JOB_WORKERS = "job_workers"
+CFG_JOB_IDLE_INTERVAL = "job_idle_interval"
+CFG_JOB_STATE_FILE = "job_state_file"
+CFG_JOB_LOCK_BACKEND = "job_lock_backend"
+CFG_JOB_LOCK_TTL = "job_lock_ttl"
+CFG_JOB_STATE_REDIS = "job_state_redis"
+CFG_JOB_STALE_AFTER = "job_stale_after"
+
+# Event configuration
+CFG_EVENT_WORKERS = "event_workers"
+CFG_EVENT_QUEUE_SIZE = "event_queue_size"
+
+# CLI configuration
+CFG_CLI_MANIFEST = "cli_manifest"
+CFG_CLI_MANIFEST_FILE = "cli_manifest_file"
+
 
 # default list size for DBGrid Operations
 DEFAULT_LIST_SIZE = 100
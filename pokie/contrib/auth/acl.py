@@ -0,0 +1,76 @@
+import sys
+from typing import Iterable, Dict
+
+
+class UserAcl:
+    """
+    Compiled, read-only ACL for a given user
+
+    Roles and resources are stored as frozensets, so permission checks are a single hash lookup; resource ids are
+    interned, so matching against the (also interned) literals used in view acl lists is mostly an identity check
+    """
+
+    __slots__ = ("id_user", "version", "roles", "resources")
+
+    def __init__(
+        self, id_user, version: int, roles: Iterable, resources: Iterable
+    ):
+        self.id_user = id_user
+        self.version = version
+        self.roles = frozenset(roles)
+        self.resources = frozenset(
+            sys.intern(r) if type(r) is str else r for r in resources
+        )
+
+    def can_access(self, id_resource) -> bool:
+        return id_resource in self.resources
+
+    def has_role(self, id_role) -> bool:
+        return id_role in self.roles
+
+
+class AclSnapshot:
+    """
+    In-memory copy of the whole role->resource matrix
+
+    The ACL graph is small and rarely changes, so each process keeps a full copy and resolves user resources as
+    the union of precomputed role sets; a snapshot is replaced when the ACL change version moves
+    """
+
+    __slots__ = ("version", "expires", "resources", "role_resources")
+
+    def __init__(self, version: int, expires: float, rows: Iterable):
+        """
+        :param version: ACL change version at load time
+        :param expires: monotonic time after which the snapshot must be reloaded
+        :param rows: iterable of (id_role, AclResourceRecord); id_role is None for unassigned resources
+        """
+        self.version = version
+        self.expires = expires
+        self.resources = {}
+        role_resources = {}
+        for id_role, record in rows:
+            self.resources[record.id] = record
+            if id_role is not None:
+                role_resources.setdefault(id_role, set()).add(sys.intern(record.id))
+
+        self.role_resources = {
+            k: frozenset(v) for k, v in role_resources.items()
+        }  # type: Dict[int, frozenset]
+
+    def resource_ids(self, id_roles: Iterable) -> frozenset:
+        """
+        Resource ids for a list of roles
+        :param id_roles:
+        :return: frozenset
+        """
+        empty = frozenset()
+        return empty.union(*[self.role_resources.get(r, empty) for r in id_roles])
+
+    def resolve(self, id_roles: Iterable) -> dict:
+        """
+        Resource records for a list of roles
+        :param id_roles:
+        :return: dict[str, AclResourceRecord]
+        """
+        return {r: self.resources[r] for r in self.resource_ids(id_roles)}
@@ -1,16 +1,32 @@
-from .user import UserCreateCmd, UserInfoCmd, UserModCmd, UserListCmd
-from .acl import (
-    AclRoleListCmd,
-    AclRoleCreateCmd,
-    AclRoleRemoveCmd,
-    AclRoleInfoCmd,
-    AclRoleLinkCmd,
-    AclRoleUnlinkCmd,
-)
-from .acl import (
-    AclResourceListCmd,
-    AclResourceCreateCmd,
-    AclResourceLinkCmd,
-    AclResourceUnlinkCmd,
-    AclUserRoleCmd,
-)
+import importlib
+
+# command classes are imported on first access, so running a command does not import all the others
+# class name: submodule
+_exports = {
+    "UserCreateCmd": "user",
+    "UserInfoCmd": "user",
+    "UserModCmd": "user",
+    "UserListCmd": "user",
+    "AclRoleListCmd": "acl",
+    "AclRoleCreateCmd": "acl",
+    "AclRoleRemoveCmd": "acl",
+    "AclRoleInfoCmd": "acl",
+    "AclRoleLinkCmd": "acl",
+    "AclRoleUnlinkCmd": "acl",
+    "AclResourceListCmd": "acl",
+    "AclResourceCreateCmd": "acl",
+    "AclResourceLinkCmd": "acl",
+    "AclResourceUnlinkCmd": "acl",
+    "AclUserRoleCmd": "acl",
+}
+
+
+def __getattr__(name):
+    if name not in _exports:
+        raise AttributeError("module {} has no attribute {}".format(__name__, name))
+    module = importlib.import_module("." + _exports[name], __name__)
+    return getattr(module, name)
+
+
+def __dir__():
+    return list(globals().keys()) + list(_exports.keys())
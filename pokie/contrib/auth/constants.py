@@ -4,3 +4,32 @@ SVC_USER = "svc_user"
 
 
 CFG_AUTH_USE_CACHE = "auth_use_cache"
+CFG_AUTH_NEGATIVE_TTL = "auth_negative_ttl"
+CFG_AUTH_ACL_CHECK_INTERVAL = "auth_acl_check_interval"
+CFG_AUTH_ACL_LOCAL_TTL = "auth_acl_local_ttl"
+CFG_AUTH_ACL_LOCAL_SIZE = "auth_acl_local_size"
+CFG_AUTH_TOKEN_TTL = "auth_token_ttl"
+CFG_AUTH_TOKEN_LOCAL_TTL = "auth_token_local_ttl"
+CFG_AUTH_TOKEN_LOCAL_SIZE = "auth_token_local_size"
+CFG_AUTH_JWT_ACCESS_TTL = "auth_jwt_access_ttl"
+CFG_AUTH_JWT_REFRESH_TTL = "auth_jwt_refresh_ttl"
+CFG_AUTH_JWT_REVOKED_INTERVAL = "auth_jwt_revoked_interval"
+CFG_AUTH_JWT_REVOKED_MARGIN = "auth_jwt_revoked_margin"
+CFG_AUTH_HASHER_WORKERS = "auth_hasher_workers"
+CFG_AUTH_HASHER_QUEUE_SIZE = "auth_hasher_queue_size"
+CFG_AUTH_LASTLOGIN_INTERVAL = "auth_lastlogin_interval"
+CFG_AUTH_LASTLOGIN_STALENESS = "auth_lastlogin_staleness"
+CFG_AUTH_PRUNE_INTERVAL = "auth_prune_interval"
+CFG_AUTH_PRUNE_BATCH_SIZE = "auth_prune_batch_size"
+CFG_AUTH_PRUNE_BATCH_DELAY_MS = "auth_prune_batch_delay_ms"
+CFG_AUTH_SESSION_ACL = "auth_session_acl"
+CFG_AUTH_SESSION_ACL_TTL = "auth_session_acl_ttl"
+
+# metric names
+METRIC_USERNAME_MISS = "auth_username_miss"
+METRIC_TOKEN_MISS = "auth_token_miss"
+METRIC_HASHER_QUEUE = "auth_hasher_queue"
+METRIC_HASHER_LATENCY = "auth_hasher_latency"
+METRIC_HASHER_REJECTED = "auth_hasher_rejected"
+METRIC_PRUNE_REMOVED = "auth_prune_removed"
+METRIC_PRUNE_BATCH = "auth_prune_batch"
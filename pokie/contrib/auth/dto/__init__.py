@@ -4,5 +4,7 @@ from .acl import (
     AclRoleResourceRecord,
     AclResourceRecord,
     AclRoleRecord,
+    AclVersionRecord,
 )
 from .token import UserTokenRecord
+from .jwt import JwtRevokedRecord
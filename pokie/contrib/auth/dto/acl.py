@@ -25,3 +25,9 @@ class AclUserRoleRecord:
     id = "id_acl_user_role"
     id_role = "fk_acl_role"
     id_user = "fk_user"
+
+
+@fieldmapper(tablename="acl_version", pk="id_acl_version")
+class AclVersionRecord:
+    id = "id_acl_version"
+    version = "version"
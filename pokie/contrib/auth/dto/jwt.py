@@ -0,0 +1,11 @@
+from rick_db import fieldmapper
+
+
+@fieldmapper(tablename="jwt_revoked", pk="id_jwt_revoked")
+class JwtRevokedRecord:
+    id = "id_jwt_revoked"
+    token_type = "token_type"
+    jti = "jti"
+    expires = "expires"
+    sub = "sub"
+    created = "created"
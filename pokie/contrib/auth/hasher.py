@@ -0,0 +1,104 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from time import monotonic
+
+from rick.crypto.hasher import HasherInterface
+from werkzeug.exceptions import ServiceUnavailable
+
+from pokie.contrib.auth.constants import (
+    METRIC_HASHER_QUEUE,
+    METRIC_HASHER_LATENCY,
+    METRIC_HASHER_REJECTED,
+)
+from pokie.core.metrics import MetricsRegistry
+
+
+class HasherBusyError(ServiceUnavailable):
+    """
+    Raised when the password hashing queue is full
+    Unhandled, it results in a 503 response with a Retry-After header
+    """
+
+    description = "Authentication service busy, please retry"
+
+
+class PooledHasher(HasherInterface):
+    """
+    Runs a (slow) password hasher in a dedicated, bounded thread pool
+
+    bcrypt releases the GIL while hashing, so a small pool bounds the CPU spent on password checks without
+    occupying request threads beyond waiting for the result; when workers + queue_size operations are already in
+    flight, new operations fail immediately with HasherBusyError instead of piling up
+    """
+
+    def __init__(
+        self,
+        hasher: HasherInterface,
+        workers: int = 2,
+        queue_size: int = 32,
+        metrics: MetricsRegistry = None,
+        retry_after: int = 1,
+    ):
+        self.hasher = hasher
+        self.workers = workers
+        self.queue_size = queue_size
+        self.retry_after = retry_after
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+        if metrics is None:
+            metrics = MetricsRegistry()
+        self.queue_depth = metrics.gauge(
+            METRIC_HASHER_QUEUE, "password hash operations in flight"
+        )
+        self.latency = metrics.histogram(
+            METRIC_HASHER_LATENCY, "password hash operation time, including queue wait"
+        )
+        self.rejected = metrics.counter(
+            METRIC_HASHER_REJECTED, "password hash operations rejected with a full queue"
+        )
+
+    def hash(self, password: str) -> str:
+        return self._run(self.hasher.hash, password)
+
+    def is_valid(self, password: str, pw_hash: str) -> bool:
+        return self._run(self.hasher.is_valid, password, pw_hash)
+
+    def need_rehash(self, pw_hash, prefix=None):
+        # cheap string check, no need to offload
+        return self.hasher.need_rehash(pw_hash, prefix)
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            self.rejected.inc()
+            raise HasherBusyError(retry_after=self.retry_after)
+
+        start = monotonic()
+        self.queue_depth.inc()
+        try:
+            return self._get_executor().submit(fn, *args).result()
+        finally:
+            self.queue_depth.dec()
+            self._slots.release()
+            self.latency.observe(monotonic() - start)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        # executor threads do not survive fork(); build a new pool in each process
+        pid = os.getpid()
+        if self._executor is None or self._pid != pid:
+            with self._lock:
+                if self._executor is None or self._pid != pid:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.workers, thread_name_prefix="hasher"
+                    )
+                    self._pid = pid
+        return self._executor
@@ -0,0 +1 @@
+from .prune import TokenPruneJob
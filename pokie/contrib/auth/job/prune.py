@@ -0,0 +1,89 @@
+from datetime import datetime, timezone
+from time import sleep, monotonic
+
+from rick.base import Di
+from rick.mixin import Injectable, Runnable
+
+from pokie.constants import DI_CONFIG, DI_DB, DI_METRICS
+from pokie.contrib.auth.constants import (
+    CFG_AUTH_PRUNE_INTERVAL,
+    CFG_AUTH_PRUNE_BATCH_SIZE,
+    CFG_AUTH_PRUNE_BATCH_DELAY_MS,
+    METRIC_PRUNE_REMOVED,
+    METRIC_PRUNE_BATCH,
+)
+from pokie.contrib.auth.repository import UserTokenRepository, JwtRevokedRepository
+from pokie.core.metrics import MetricsRegistry
+
+
+class TokenPruneJob(Injectable, Runnable):
+    """
+    Removes expired user tokens and JWT revocations
+
+    Rows are deleted in small id-ordered batches with a pause between batches, so each statement holds few locks
+    and generates little WAL; the scheduler runs a pass every interval seconds
+    """
+
+    DEFAULT_INTERVAL = 300
+    DEFAULT_BATCH_SIZE = 1000
+    DEFAULT_BATCH_DELAY_MS = 100
+
+    # run on a single node at a time
+    singleton = True
+
+    def __init__(self, di: Di):
+        super().__init__(di)
+        cfg = di.get(DI_CONFIG)
+        self.interval = float(cfg.get(CFG_AUTH_PRUNE_INTERVAL, self.DEFAULT_INTERVAL))
+        self.batch_size = int(
+            cfg.get(CFG_AUTH_PRUNE_BATCH_SIZE, self.DEFAULT_BATCH_SIZE)
+        )
+        # delay between batches, in seconds; configured in milliseconds
+        self.batch_delay = (
+            int(cfg.get(CFG_AUTH_PRUNE_BATCH_DELAY_MS, self.DEFAULT_BATCH_DELAY_MS))
+            / 1000
+        )
+        # scheduler interval
+        self.schedule = self.interval
+
+        metrics = di.get(DI_METRICS) if di.has(DI_METRICS) else MetricsRegistry()
+        self.removed = metrics.counter(
+            METRIC_PRUNE_REMOVED, "expired tokens and revocations removed"
+        )
+        self.batch_latency = metrics.histogram(
+            METRIC_PRUNE_BATCH, "prune batch execution time"
+        )
+
+    def run(self, di: Di):
+        self.prune()
+
+    def prune(self) -> int:
+        """
+        Run a full pruning pass
+        :return: number of removed rows
+        """
+        db = self.get_di().get(DI_DB)
+        now = datetime.now(timezone.utc)
+        total = self.prune_table(UserTokenRepository(db), now)
+        # jwt_revoked uses timestamps without time zone, in UTC
+        total += self.prune_table(JwtRevokedRepository(db), now.replace(tzinfo=None))
+        return total
+
+    def prune_table(self, repository, now: datetime) -> int:
+        """
+        Remove expired rows in batches until a partial batch is found
+        :param repository: repository implementing prune_batch()
+        :param now:
+        :return: number of removed rows
+        """
+        total = 0
+        while True:
+            start = monotonic()
+            removed = repository.prune_batch(now, self.batch_size)
+            self.batch_latency.observe(monotonic() - start)
+            self.removed.inc(removed)
+            total += removed
+            if removed < self.batch_size:
+                return total
+            if self.batch_delay > 0:
+                sleep(self.batch_delay)
@@ -0,0 +1,166 @@
+import base64
+import hashlib
+import hmac
+import json
+import threading
+from datetime import datetime, timezone, timedelta
+from time import monotonic, time
+from typing import Optional, Iterable
+
+# token types, as stored in jwt_revoked.token_type
+JWT_ACCESS = "A"
+JWT_REFRESH = "R"
+
+_HEADER = {"alg": "HS256", "typ": "JWT"}
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _json(data: dict) -> bytes:
+    return json.dumps(data, separators=(",", ":"), sort_keys=True).encode("utf-8")
+
+
+_HEADER_SEGMENT = _b64encode(_json(_HEADER))
+
+
+def jwt_encode(claims: dict, secret: bytes) -> str:
+    """
+    Build a HS256-signed JWT
+    :param claims:
+    :param secret:
+    :return: token string
+    """
+    signing_input = _HEADER_SEGMENT + "." + _b64encode(_json(claims))
+    signature = hmac.new(
+        secret, signing_input.encode("ascii"), hashlib.sha256
+    ).digest()
+    return signing_input + "." + _b64encode(signature)
+
+
+def jwt_decode(token: str, secret: bytes, now: float = None) -> Optional[dict]:
+    """
+    Verify a HS256-signed JWT and return its claims
+    Tokens with an invalid signature, an unsupported header or an expired 'exp' claim are rejected
+    :param token:
+    :param secret:
+    :param now: current epoch; defaults to time()
+    :return: claims dict or None
+    """
+    try:
+        header, payload, signature = token.split(".")
+        if header != _HEADER_SEGMENT:
+            # we only issue one header; anything else (including alg=none) is rejected
+            return None
+        expected = hmac.new(
+            secret, (header + "." + payload).encode("ascii"), hashlib.sha256
+        ).digest()
+        if not hmac.compare_digest(expected, _b64decode(signature)):
+            return None
+        claims = json.loads(_b64decode(payload))
+    except (ValueError, TypeError, UnicodeError):
+        return None
+
+    if not isinstance(claims, dict):
+        return None
+    if now is None:
+        now = time()
+    exp = claims.get("exp", None)
+    if not isinstance(exp, (int, float)) or exp <= now:
+        return None
+    return claims
+
+
+class RevocationList:
+    """
+    In-process set of revoked token ids (jti)
+
+    The set is built incrementally from jwt_revoked: each refresh reads rows created since the previous refresh,
+    minus a margin of seconds, so rows committed after a refresh by transactions started before it are not missed;
+    rows in the overlap window are deduplicated by id. Entries are dropped once their token would have expired
+    anyway, so the set stays as small as the number of revoked, still-valid tokens. Lookups never perform I/O; the
+    database is read at most once every interval seconds
+    """
+
+    def __init__(self, interval: float = 5, margin: float = 60):
+        self.interval = interval
+        self.margin = margin
+        self.last_refresh = None  # naive UTC datetime
+        self._window = {}  # id: created, for rows loaded within the overlap window
+        self._revoked = {}  # jti: exp epoch
+        self._next_refresh = 0.0
+        self._lock = threading.Lock()
+
+    def __contains__(self, jti) -> bool:
+        return jti in self._revoked
+
+    def __len__(self):
+        return len(self._revoked)
+
+    def add(self, jti: str, exp: float):
+        with self._lock:
+            self._revoked[jti] = exp
+
+    def due(self) -> bool:
+        return monotonic() >= self._next_refresh
+
+    def refresh(self, repository, force: bool = False):
+        """
+        Load new revocations and prune expired entries
+        :param repository: JwtRevokedRepository
+        :param force: if True, ignore the refresh interval
+        :return:
+        """
+        if not force and not self.due():
+            return
+        with self._lock:
+            if not force and not self.due():
+                # another thread refreshed it already
+                return
+            self._next_refresh = monotonic() + self.interval
+            now = datetime.now(timezone.utc)
+            utc_now = now.replace(tzinfo=None)
+            since = None
+            if self.last_refresh is not None:
+                since = self.last_refresh - timedelta(seconds=self.margin)
+            self.load(repository.find_since(since, utc_now))
+            self.last_refresh = utc_now
+            self.prune(now.timestamp())
+
+    def load(self, rows: Iterable):
+        """
+        Merge JwtRevokedRecord rows; caller must hold the lock
+        Rows already loaded within the overlap window are skipped
+        :param rows:
+        :return:
+        """
+        for record in rows:
+            if record.id in self._window:
+                continue
+            if record.created is not None:
+                self._window[record.id] = record.created
+            self._revoked[record.jti] = (
+                record.expires.replace(tzinfo=timezone.utc).timestamp()
+            )
+
+    def prune(self, now: float):
+        """
+        Drop entries for tokens that are already expired; caller must hold the lock
+        :param now: epoch
+        :return:
+        """
+        expired = [jti for jti, exp in self._revoked.items() if exp <= now]
+        for jti in expired:
+            del self._revoked[jti]
+
+        # rows created before the next overlap window are not read again
+        if self.last_refresh is not None:
+            since = self.last_refresh - timedelta(seconds=self.margin)
+            old = [id_row for id_row, created in self._window.items() if created < since]
+            for id_row in old:
+                del self._window[id_row]
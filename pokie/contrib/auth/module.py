@@ -31,5 +31,9 @@ class Module(BaseModule):
         "resource:unlink": "pokie.contrib.auth.cli.AclResourceUnlinkCmd",
     }
 
+    jobs = [
+        "pokie.contrib.auth.job.TokenPruneJob",
+    ]
+
     def build(self, parent=None):
         pass
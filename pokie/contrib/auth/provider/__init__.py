@@ -0,0 +1,3 @@
+from .session_provider import SessionProvider
+from .token_provider import TokenProvider
+from .jwt_provider import JWTProvider
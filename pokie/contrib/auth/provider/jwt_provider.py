@@ -0,0 +1,259 @@
+import uuid
+from datetime import datetime, timezone
+from time import time
+from typing import Optional
+
+from flask import Request
+from flask_login import LoginManager
+from rick.base import Di
+from rick.mixin import Injectable
+
+from pokie.constants import DI_CONFIG, DI_SERVICES, DI_FLASK, DI_DB, CFG_AUTH_SECRET
+from pokie.contrib.auth import User
+from pokie.contrib.auth.constants import (
+    SVC_USER,
+    SVC_ACL,
+    CFG_AUTH_JWT_ACCESS_TTL,
+    CFG_AUTH_JWT_REFRESH_TTL,
+    CFG_AUTH_JWT_REVOKED_INTERVAL,
+    CFG_AUTH_JWT_REVOKED_MARGIN,
+)
+from pokie.contrib.auth.dto import JwtRevokedRecord
+from pokie.contrib.auth.jwt import (
+    JWT_ACCESS,
+    JWT_REFRESH,
+    RevocationList,
+    jwt_encode,
+    jwt_decode,
+)
+from pokie.contrib.auth.repository import JwtRevokedRepository
+from pokie.contrib.auth.service import UserService, AclService
+from pokie.contrib.auth.user import UserInterface
+
+
+class JWTProvider(Injectable):
+    """
+    Stateless JWT authentication provider
+
+    Access and refresh tokens are HS256-signed with AUTH_SECRET and carry the user role ids; user resources are
+    resolved from the in-memory ACL snapshot, and revoked tokens are checked against an in-process revocation list,
+    so authenticating a request does not touch the database or the cache.
+    Revocations reach all workers within AUTH_JWT_REVOKED_INTERVAL seconds; role changes are picked up when the
+    access token is refreshed
+    """
+
+    header = "Authorization"
+    scheme = "bearer"
+
+    ACCESS_TTL = 900
+    REFRESH_TTL = 1209600
+    REVOKED_INTERVAL = 5
+    REVOKED_MARGIN = 60
+
+    def __init__(self, di: Di):
+        super().__init__(di)
+        cfg = di.get(DI_CONFIG)
+        secret = cfg.get(CFG_AUTH_SECRET, None)
+        if not secret:
+            # a random secret would invalidate tokens on restart, and differ between hosts
+            raise RuntimeError("JWTProvider: AUTH_SECRET must be configured")
+        self.secret = str(secret).encode("utf-8")
+        self.access_ttl = int(cfg.get(CFG_AUTH_JWT_ACCESS_TTL, self.ACCESS_TTL))
+        self.refresh_ttl = int(cfg.get(CFG_AUTH_JWT_REFRESH_TTL, self.REFRESH_TTL))
+        self.revoked = RevocationList(
+            float(cfg.get(CFG_AUTH_JWT_REVOKED_INTERVAL, self.REVOKED_INTERVAL)),
+            float(cfg.get(CFG_AUTH_JWT_REVOKED_MARGIN, self.REVOKED_MARGIN)),
+        )
+
+        app = di.get(DI_FLASK)
+        login_manager = LoginManager()
+        login_manager.init_app(app)
+
+        @login_manager.request_loader
+        def load_user_from_request(req: Request):
+            return self.get_user(req)
+
+    def login(self, username, password, **kwargs) -> Optional[UserInterface]:
+        """
+        Authenticate a user and issue a token pair
+        Tokens are available as User.access_token and User.refresh_token
+        :param username:
+        :param password:
+        :param kwargs:
+        :return:
+        """
+        user_record = self.svc_user.authenticate(username, password)
+        if not user_record:
+            return None
+
+        id_roles = self.svc_acl.get_user_role_ids(user_record.id)
+        tokens = self.issue(user_record.id, id_roles)
+        return User(
+            id_user=user_record.id,
+            record=user_record,
+            roles=id_roles,
+            resources=self.svc_acl.get_snapshot().resource_ids(id_roles),
+            access_token=tokens["access"],
+            refresh_token=tokens["refresh"],
+        )
+
+    def issue(self, id_user: int, id_roles: list = None) -> dict:
+        """
+        Build a new access and refresh token pair
+        :param id_user:
+        :param id_roles:
+        :return: dict with 'access' and 'refresh' keys
+        """
+        if id_roles is None:
+            id_roles = self.svc_acl.get_user_role_ids(id_user)
+        now = int(time())
+        sub = str(id_user)
+        access = {
+            "sub": sub,
+            "jti": uuid.uuid4().hex,
+            "typ": JWT_ACCESS,
+            "iat": now,
+            "exp": now + self.access_ttl,
+            "roles": list(id_roles),
+        }
+        refresh = {
+            "sub": sub,
+            "jti": uuid.uuid4().hex,
+            "typ": JWT_REFRESH,
+            "iat": now,
+            "exp": now + self.refresh_ttl,
+        }
+        return {
+            "access": jwt_encode(access, self.secret),
+            "refresh": jwt_encode(refresh, self.secret),
+        }
+
+    def refresh(self, refresh_token: str) -> Optional[dict]:
+        """
+        Exchange a refresh token for a new token pair
+        The user is reloaded, so disabled users are rejected and role changes are applied; the old refresh token
+        is revoked, and only the request that stores its revocation gets a new pair, so concurrent refreshes with
+        the same token cannot both succeed
+        :param refresh_token:
+        :return: dict with 'access' and 'refresh' keys, or None
+        """
+        claims = self.verify(refresh_token, JWT_REFRESH)
+        if claims is None:
+            return None
+
+        user_record = self.svc_user.get_by_id(int(claims["sub"]))
+        if user_record is None or not user_record.active:
+            return None
+
+        if not self.revoke_claims(claims):
+            # already used
+            return None
+        return self.issue(user_record.id)
+
+    def verify(self, token: str, token_type: str = JWT_ACCESS) -> Optional[dict]:
+        """
+        Validate a token and return its claims
+        :param token:
+        :param token_type: JWT_ACCESS or JWT_REFRESH
+        :return: claims dict or None
+        """
+        claims = jwt_decode(token, self.secret)
+        if claims is None or claims.get("typ", None) != token_type:
+            return None
+
+        if self.revoked.due():
+            self.revoked.refresh(self.revoked_repository)
+        if claims.get("jti", None) in self.revoked:
+            return None
+        return claims
+
+    def get_user(self, req: Request, **kwargs) -> Optional[User]:
+        """
+        Resolve the user from the request bearer token
+        :param req:
+        :param kwargs:
+        :return: User or None
+        """
+        token = self.extract_token(req)
+        if token is None:
+            return None
+
+        claims = self.verify(token)
+        if claims is None:
+            return None
+
+        id_roles = claims.get("roles", [])
+        return User(
+            id_user=int(claims["sub"]),
+            roles=id_roles,
+            resources=self.svc_acl.get_snapshot().resource_ids(id_roles),
+            claims=claims,
+        )
+
+    def extract_token(self, req: Request) -> Optional[str]:
+        """
+        Extract the bearer token from the request headers
+        :param req:
+        :return:
+        """
+        value = req.headers.get(self.header, None)
+        if not value:
+            return None
+        parts = value.split(None, 1)
+        if len(parts) != 2 or parts[0].lower() != self.scheme:
+            return None
+        token = parts[1].strip()
+        return token if token else None
+
+    def revoke(self, token: str) -> bool:
+        """
+        Revoke an access or refresh token
+        :param token:
+        :return: False if the token is invalid or already expired
+        """
+        claims = jwt_decode(token, self.secret)
+        if claims is None:
+            return False
+        self.revoke_claims(claims)
+        return True
+
+    def revoke_claims(self, claims: dict) -> bool:
+        """
+        Record a revocation for the given (already verified) token claims
+        :param claims:
+        :return: False if the token was already revoked
+        """
+        record = JwtRevokedRecord(
+            token_type=claims.get("typ", JWT_ACCESS),
+            jti=claims["jti"],
+            expires=datetime.fromtimestamp(claims["exp"], timezone.utc).replace(
+                tzinfo=None
+            ),
+            sub=claims.get("sub", None),
+        )
+        added = self.revoked_repository.add(record)
+        self.revoked.add(claims["jti"], claims["exp"])
+        return added
+
+    def logout(self, **kwargs):
+        """
+        Revoke the tokens passed as 'token' and/or 'refresh_token'
+        :param kwargs:
+        :return:
+        """
+        for name in ["token", "refresh_token"]:
+            token = kwargs.get(name, None)
+            if token is not None:
+                self.revoke(token)
+
+    @property
+    def revoked_repository(self) -> JwtRevokedRepository:
+        return JwtRevokedRepository(self.get_di().get(DI_DB))
+
+    @property
+    def svc_user(self) -> UserService:
+        return self.get_di().get(DI_SERVICES).get(SVC_USER)
+
+    @property
+    def svc_acl(self) -> AclService:
+        return self.get_di().get(DI_SERVICES).get(SVC_ACL)
@@ -1,6 +1,7 @@
+from time import time
 from typing import Optional
 
-from flask import Request
+from flask import Request, session
 from rick.mixin import Injectable
 import uuid
 
@@ -9,7 +10,12 @@ from rick.base import Di
 
 from pokie.constants import DI_CONFIG, DI_SERVICES, CFG_AUTH_SECRET, DI_FLASK
 from pokie.contrib.auth import User
-from pokie.contrib.auth.constants import SVC_USER, SVC_ACL
+from pokie.contrib.auth.constants import (
+    SVC_USER,
+    SVC_ACL,
+    CFG_AUTH_SESSION_ACL,
+    CFG_AUTH_SESSION_ACL_TTL,
+)
 from pokie.contrib.auth.dto import UserRecord
 from pokie.contrib.auth.service import AclService
 from pokie.contrib.auth.user import UserInterface
@@ -17,20 +23,59 @@ from pokie.contrib.auth.user import UserInterface
 
 def build_user_acl(di, user_record: UserRecord):
     svc_acl = di.get(DI_SERVICES).get(SVC_ACL)  # type: AclService
-    roles = list(svc_acl.get_user_roles(user_record.id).keys())
-    resources = list(svc_acl.get_user_resources(user_record.id).keys())
+    acl = svc_acl.get_user_acl(user_record.id)
     return User(
-        id_user=user_record.id, record=user_record, roles=roles, resources=resources
+        id_user=user_record.id,
+        record=user_record,
+        roles=acl.roles,
+        resources=acl.resources,
+        acl=acl,
     )
 
 
+class SessionUser(User):
+    """
+    User restored from a session ACL snapshot
+    The user record is only loaded if accessed
+    """
+
+    def __init__(self, di: Di, **kwargs):
+        self._di = di
+        self._record = None
+        super().__init__(**kwargs)
+
+    @property
+    def record(self):
+        if self._record is None and self.id is not None:
+            self._record = self._di.get(DI_SERVICES).get(SVC_USER).load_id(self.id)
+        return self._record
+
+    @record.setter
+    def record(self, value):
+        self._record = value
+
+    @property
+    def is_active(self):
+        # the snapshot is only issued for active users, and expires after AUTH_SESSION_ACL_TTL
+        return self.id is not None
+
+
 class SessionProvider(Injectable):
+    # session key for the ACL snapshot
+    SESSION_KEY = "_pokie_acl"
+    SESSION_ACL_TTL = 60
+
     def __init__(self, di: Di):
         super().__init__(di)
 
         cfg = di.get(DI_CONFIG)
         app = di.get(DI_FLASK)
-        app.secret_key = cfg.get(CFG_AUTH_SECRET, uuid.uuid4().hex)
+        # without AUTH_SECRET, sessions are only valid within the current process
+        app.secret_key = cfg.get(CFG_AUTH_SECRET, None) or uuid.uuid4().hex
+        self.session_acl = bool(cfg.get(CFG_AUTH_SESSION_ACL, False))
+        self.session_acl_ttl = int(
+            cfg.get(CFG_AUTH_SESSION_ACL_TTL, self.SESSION_ACL_TTL)
+        )
         login_manager = LoginManager()
         login_manager.init_app(app)
 
@@ -38,11 +83,19 @@ class SessionProvider(Injectable):
         def load_user(user_id):
             # restores user profile from user service
             user_id = int(user_id)
+            if self.session_acl:
+                user = self.load_snapshot(user_id)
+                if user is not None:
+                    return user
+
             svc_manager = di.get(DI_SERVICES)
             user_record = svc_manager.get(SVC_USER).load_id(user_id)
             if not user_record:
                 return None  # this will clear session
-            return build_user_acl(di, user_record)
+            user = build_user_acl(di, user_record)
+            if self.session_acl and user_record.active:
+                self.save_snapshot(user)
+            return user
 
     def login(self, username, password, **kwargs) -> Optional[UserInterface]:
         svc_user = self.get_di().get(DI_SERVICES).get(SVC_USER)
@@ -57,6 +110,8 @@ class SessionProvider(Injectable):
 
         # create user session
         login_user(user, remember)
+        if self.session_acl:
+            self.save_snapshot(user)
         return user
 
     def get_user(self, req: Request, **kwargs) -> User:
@@ -64,4 +119,45 @@ class SessionProvider(Injectable):
 
     def logout(self, **kwargs):
         # remove user session
+        session.pop(self.SESSION_KEY, None)
         logout_user()
+
+    def save_snapshot(self, user: User):
+        """
+        Store the user ACL in the session
+        The Flask session cookie is signed with AUTH_SECRET, so the snapshot cannot be tampered with
+        :param user:
+        :return:
+        """
+        session[self.SESSION_KEY] = {
+            "u": user.id,
+            "v": self.svc_acl.get_version(),
+            "t": int(time()),
+            "roles": list(user.roles),
+            "resources": list(user.resources),
+        }
+
+    def load_snapshot(self, id_user: int) -> Optional[SessionUser]:
+        """
+        Restore a user from the session ACL snapshot
+        Returns None if there is no snapshot, if it expired, or if the ACL version moved since it was issued
+        :param id_user:
+        :return:
+        """
+        snapshot = session.get(self.SESSION_KEY, None)
+        if not isinstance(snapshot, dict) or snapshot.get("u", None) != id_user:
+            return None
+        if int(time()) - snapshot.get("t", 0) >= self.session_acl_ttl:
+            return None
+        if snapshot.get("v", None) != self.svc_acl.get_version():
+            return None
+        return SessionUser(
+            self.get_di(),
+            id_user=id_user,
+            roles=snapshot.get("roles", []),
+            resources=snapshot.get("resources", []),
+        )
+
+    @property
+    def svc_acl(self) -> AclService:
+        return self.get_di().get(DI_SERVICES).get(SVC_ACL)
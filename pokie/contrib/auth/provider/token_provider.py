@@ -1,7 +1,174 @@
+from datetime import datetime, timezone, timedelta
+from typing import Optional
+
+from flask import Request
+from flask_login import LoginManager
 from rick.base import Di
 from rick.mixin import Injectable
 
+from pokie.cache import LocalCache
+from pokie.constants import DI_CONFIG, DI_SERVICES, DI_FLASK
+from pokie.contrib.auth import User
+from pokie.contrib.auth.constants import (
+    SVC_USER,
+    SVC_ACL,
+    CFG_AUTH_TOKEN_TTL,
+    CFG_AUTH_TOKEN_LOCAL_TTL,
+    CFG_AUTH_TOKEN_LOCAL_SIZE,
+)
+from pokie.contrib.auth.service import UserService, AclService
+from pokie.contrib.auth.user import UserInterface
+
 
 class TokenProvider(Injectable):
+    """
+    Bearer token authentication provider
+
+    Tokens are resolved through an in-process TTL LRU in front of the UserService cache and the database; each local
+    entry holds the user record and the compiled user ACL, so authenticated requests usually cost a hash and a dict
+    lookup. Token revocation and expiry reach all workers within AUTH_TOKEN_LOCAL_TTL seconds
+    """
+
+    header = "Authorization"
+    scheme = "bearer"
+
+    # local cache marker for unknown, expired or disabled tokens
+    NEGATIVE_MARKER = False
+
+    TOKEN_TTL = 86400
+    LOCAL_TTL = 5
+    LOCAL_SIZE = 10000
+
     def __init__(self, di: Di):
         super().__init__(di)
+        cfg = di.get(DI_CONFIG)
+        self.token_ttl = int(cfg.get(CFG_AUTH_TOKEN_TTL, self.TOKEN_TTL))
+        self.local_ttl = float(cfg.get(CFG_AUTH_TOKEN_LOCAL_TTL, self.LOCAL_TTL))
+        self.local_cache = LocalCache(
+            int(cfg.get(CFG_AUTH_TOKEN_LOCAL_SIZE, self.LOCAL_SIZE)), self.local_ttl
+        )
+
+        app = di.get(DI_FLASK)
+        login_manager = LoginManager()
+        login_manager.init_app(app)
+
+        @login_manager.request_loader
+        def load_user_from_request(req: Request):
+            return self.get_user(req)
+
+    def login(self, username, password, **kwargs) -> Optional[UserInterface]:
+        """
+        Authenticate a user and issue a new token
+        The plain token is available as User.token
+        :param username:
+        :param password:
+        :param kwargs: optional 'expires' datetime
+        :return:
+        """
+        user_record = self.svc_user.authenticate(username, password)
+        if not user_record:
+            return None
+
+        expires = kwargs.get("expires", None)
+        if expires is None and self.token_ttl > 0:
+            expires = datetime.now(timezone.utc) + timedelta(seconds=self.token_ttl)
+
+        _, token = self.svc_user.add_user_token(user_record.id, expires)
+        acl = self.svc_acl.get_user_acl(user_record.id)
+        return User(
+            id_user=user_record.id,
+            record=user_record,
+            roles=acl.roles,
+            resources=acl.resources,
+            acl=acl,
+            token=token,
+        )
+
+    def get_user(self, req: Request, **kwargs) -> Optional[User]:
+        """
+        Resolve the user from the request bearer token
+        :param req:
+        :param kwargs:
+        :return: User or None
+        """
+        token = self.extract_token(req)
+        if token is None:
+            return None
+
+        key = UserService.hash_token(token)
+        entry = self.local_cache.get(key)
+        if entry is self.NEGATIVE_MARKER:
+            return None
+
+        if entry is None:
+            user_record = self.svc_user.get_user_by_token(token)
+            if user_record is None or not user_record.active:
+                self.local_cache.set(key, self.NEGATIVE_MARKER)
+                return None
+
+            user_record = self.svc_user.sanitize_record(user_record)
+            entry = (user_record, self.svc_acl.get_user_acl(user_record.id))
+            self.local_cache.set(key, entry)
+
+        user_record, acl = entry
+        if acl.version != self.svc_acl.get_version():
+            # acl changed since the entry was cached
+            acl = self.svc_acl.get_user_acl(user_record.id)
+            self.local_cache.set(key, (user_record, acl))
+
+        return User(
+            id_user=user_record.id,
+            record=user_record,
+            roles=acl.roles,
+            resources=acl.resources,
+            acl=acl,
+        )
+
+    def extract_token(self, req: Request) -> Optional[str]:
+        """
+        Extract the bearer token from the request headers
+        :param req:
+        :return:
+        """
+        value = req.headers.get(self.header, None)
+        if not value:
+            return None
+        parts = value.split(None, 1)
+        if len(parts) != 2 or parts[0].lower() != self.scheme:
+            return None
+        token = parts[1].strip()
+        return token if token else None
+
+    def revoke(self, id_user_token: int) -> bool:
+        """
+        Disable a token
+        The local entry is dropped immediately; other workers pick up the change when their entry expires
+        :param id_user_token:
+        :return:
+        """
+        record = self.svc_user.user_token_repository.fetch_pk(id_user_token)
+        if record is None:
+            return False
+        self.local_cache.remove(record.token)
+        return self.svc_user.disable_user_token(id_user_token)
+
+    def logout(self, **kwargs):
+        """
+        Revoke the token passed as 'token'
+        :param kwargs:
+        :return:
+        """
+        token = kwargs.get("token", None)
+        if token is None:
+            return
+        record = self.svc_user.get_token(token)
+        if record is not None:
+            self.revoke(record.id)
+
+    @property
+    def svc_user(self) -> UserService:
+        return self.get_di().get(DI_SERVICES).get(SVC_USER)
+
+    @property
+    def svc_acl(self) -> AclService:
+        return self.get_di().get(DI_SERVICES).get(SVC_ACL)
@@ -1,3 +1,4 @@
-from .acl import AclRoleRepository, AclResourceRepository
+from .acl import AclRoleRepository, AclResourceRepository, AclVersionRepository
 from .token import UserTokenRepository
 from .user import UserRepository
+from .jwt import JwtRevokedRepository
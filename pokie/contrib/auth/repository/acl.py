@@ -8,6 +8,7 @@ from pokie.contrib.auth.dto import (
     AclUserRoleRecord,
     AclResourceRecord,
     AclRoleResourceRecord,
+    AclVersionRecord,
     UserRecord,
 )
 from pokie.contrib.auth.repository.user import UserRepository
@@ -297,6 +298,38 @@ class AclResourceRepository(Repository):
         with self.cursor() as c:
             return c.fetchall(sql, [id_role], cls=AclResourceRecord)
 
+    def find_role_resources(self) -> List[tuple]:
+        """
+        Load the full role -> resource matrix in a single query
+        Resources not associated with any role are returned with a None role id
+        :return: list of (id_role, AclResourceRecord)
+        """
+        key = "find_role_resources"
+        sql = self.query_cache.get(key)
+        if not sql:
+            sql, _ = (
+                self.select()
+                .join_left(
+                    AclRoleResourceRecord,
+                    AclRoleResourceRecord.id_resource,
+                    AclResourceRecord,
+                    AclResourceRecord.id,
+                    cols=[AclRoleResourceRecord.id_role],
+                )
+                .assemble()
+            )
+            self.query_cache.set(key, sql)
+
+        result = []
+        with self.cursor() as c:
+            for row in c.fetchall(sql):
+                record = AclResourceRecord(
+                    id=row[AclResourceRecord.id],
+                    description=row[AclResourceRecord.description],
+                )
+                result.append((row[AclRoleResourceRecord.id_role], record))
+        return result
+
     def can_remove(self, id_resource: str):
         """
         Check if a given resource can be removed
@@ -318,3 +351,49 @@ class AclResourceRepository(Repository):
         with self.cursor() as c:
             result = c.fetchone(sql, values)
             return result["total"] == 0
+
+
+class AclVersionRepository(Repository):
+    # single row holding the ACL change version
+    ID_VERSION = 1
+
+    def __init__(self, db):
+        super().__init__(db, AclVersionRecord)
+
+    def _fields(self) -> dict:
+        return {
+            "table": self.dialect.table(self.table_name, None, self.schema),
+            "id": self.dialect.field(AclVersionRecord.id),
+            "version": self.dialect.field(AclVersionRecord.version),
+        }
+
+    def get_version(self) -> int:
+        """
+        Current ACL change version
+        :return:
+        """
+        key = "get_version"
+        sql = self.query_cache.get(key)
+        if not sql:
+            sql = "SELECT {version} FROM {table} WHERE {id} = %s".format(
+                **self._fields()
+            )
+            self.query_cache.set(key, sql)
+        result = self.exec(sql, [self.ID_VERSION], useCls=False)
+        return 0 if len(result) == 0 else int(result[0][0])
+
+    def incr(self) -> int:
+        """
+        Atomically bump the ACL change version
+        :return: new version
+        """
+        key = "incr"
+        sql = self.query_cache.get(key)
+        if not sql:
+            sql = (
+                "INSERT INTO {table} ({id}, {version}) VALUES (%s, 1) "
+                "ON CONFLICT ({id}) DO UPDATE SET {version} = {table}.{version} + 1 "
+                "RETURNING {version}"
+            ).format(**self._fields())
+            self.query_cache.set(key, sql)
+        return int(self.exec(sql, [self.ID_VERSION], useCls=False)[0][0])
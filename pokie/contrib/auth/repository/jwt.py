@@ -0,0 +1,98 @@
+from datetime import datetime
+from typing import List, Optional
+
+from rick_db import Repository
+
+from pokie.contrib.auth.dto.jwt import JwtRevokedRecord
+
+
+class JwtRevokedRepository(Repository):
+    def __init__(self, db):
+        super().__init__(db, JwtRevokedRecord)
+
+    def find_since(
+        self, since: Optional[datetime], now: datetime
+    ) -> List[JwtRevokedRecord]:
+        """
+        Non-expired revocations created at or after the given time
+        :param since: naive UTC datetime; if None, all non-expired revocations are returned
+        :param now: naive UTC datetime
+        :return:
+        """
+        if since is None:
+            key = "find_valid"
+            values = [now]
+        else:
+            key = "find_since"
+            values = [since, now]
+        sql = self.query_cache.get(key)
+        if not sql:
+            qry = self.select()
+            if since is not None:
+                qry = qry.where(JwtRevokedRecord.created, ">=", since)
+            sql, _ = (
+                qry.where(JwtRevokedRecord.expires, ">", now)
+                .order(JwtRevokedRecord.id)
+                .assemble()
+            )
+            self.query_cache.set(key, sql)
+
+        with self.cursor() as c:
+            return c.fetchall(sql, values, cls=JwtRevokedRecord)
+
+    def add(self, record: JwtRevokedRecord) -> bool:
+        """
+        Store a revocation, unless the token id is already revoked
+        :param record:
+        :return: True if the revocation was stored
+        """
+        key = "add"
+        sql = self.query_cache.get(key)
+        if not sql:
+            sql = (
+                "INSERT INTO {table} ({token_type}, {jti}, {expires}, {sub}) VALUES (%s, %s, %s, %s) "
+                "ON CONFLICT ({jti}) DO NOTHING RETURNING {pk}"
+            ).format(
+                table=self.dialect.table(self.table_name, None, self.schema),
+                token_type=self.dialect.field(JwtRevokedRecord.token_type),
+                jti=self.dialect.field(JwtRevokedRecord.jti),
+                expires=self.dialect.field(JwtRevokedRecord.expires),
+                sub=self.dialect.field(JwtRevokedRecord.sub),
+                pk=self.dialect.field(JwtRevokedRecord.id),
+            )
+            self.query_cache.set(key, sql)
+        values = [record.token_type, record.jti, record.expires, record.sub]
+        return len(self.exec(sql, values, useCls=False)) > 0
+
+    def prune(self, now: datetime):
+        return self.delete_where(
+            [
+                (JwtRevokedRecord.expires, "<", now),
+            ]
+        )
+
+    def prune_batch(self, now: datetime, limit: int) -> int:
+        """
+        Remove up to limit expired revocations, oldest ids first
+        Rows locked by other transactions are skipped, so concurrent pruners never wait on each other
+        :param now:
+        :param limit:
+        :return: number of removed rows
+        """
+        key = "prune_batch"
+        sql = self.query_cache.get(key)
+        if not sql:
+            table = self.dialect.table(self.table_name, None, self.schema)
+            pk = self.dialect.field(JwtRevokedRecord.id)
+            sql = (
+                "DELETE FROM {table} WHERE {pk} IN ("
+                "SELECT {pk} FROM {table} WHERE {expires} < %s "
+                "ORDER BY {pk} LIMIT %s FOR UPDATE SKIP LOCKED"
+                ") RETURNING {pk}"
+            ).format(
+                table=table,
+                pk=pk,
+                expires=self.dialect.field(JwtRevokedRecord.expires),
+            )
+            self.query_cache.set(key, sql)
+        return len(self.exec(sql, [now, limit], useCls=False))
@@ -1,3 +1,4 @@
+from datetime import datetime
 from typing import List, Optional
 
 from rick_db import Repository
@@ -32,3 +33,29 @@ class UserTokenRepository(Repository):
                 (UserTokenRecord.expires, "<", now),
             ]
         )
+
+    def prune_batch(self, now: datetime, limit: int) -> int:
+        """
+        Remove up to limit expired tokens, oldest ids first
+        Rows locked by other transactions are skipped, so concurrent pruners never wait on each other
+        :param now:
+        :param limit:
+        :return: number of removed rows
+        """
+        key = "prune_batch"
+        sql = self.query_cache.get(key)
+        if not sql:
+            table = self.dialect.table(self.table_name, None, self.schema)
+            pk = self.dialect.field(UserTokenRecord.id)
+            sql = (
+                "DELETE FROM {table} WHERE {pk} IN ("
+                "SELECT {pk} FROM {table} WHERE {expires} < %s "
+                "ORDER BY {pk} LIMIT %s FOR UPDATE SKIP LOCKED"
+                ") RETURNING {pk}"
+            ).format(
+                table=table,
+                pk=pk,
+                expires=self.dialect.field(UserTokenRecord.expires),
+            )
+            self.query_cache.set(key, sql)
+        return len(self.exec(sql, [now, limit], useCls=False))
@@ -1,4 +1,4 @@
-from typing import Union
+from typing import Union, Dict
 
 from rick_db import Repository
 from rick_db.sql import Sql
@@ -30,3 +30,26 @@ class UserRepository(Repository):
             sort_order = Sql.SQL_ASC
         qry = self.select().order(sort_field, sort_order)
         return self.list(qry, limit, offset, UserRecord)
+
+    def update_last_login(self, values: Dict):
+        """
+        Batch update last_login with a single statement
+        :param values: dict of id_user: last_login
+        :return:
+        """
+        if not values:
+            return
+        sql = (
+            "UPDATE {table} SET {last_login} = v.last_login "
+            "FROM (VALUES {rows}) AS v(id_user, last_login) "
+            "WHERE {table}.{pk} = v.id_user"
+        ).format(
+            table=self.dialect.table(self.table_name, None, self.schema),
+            last_login=self.dialect.field(UserRecord.last_login),
+            pk=self.dialect.field(UserRecord.id),
+            rows=", ".join(["(%s, %s)"] * len(values)),
+        )
+        args = []
+        for id_user, last_login in values.items():
+            args.extend([id_user, last_login])
+        self.exec(sql, args, useCls=False)
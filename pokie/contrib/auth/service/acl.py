@@ -1,28 +1,92 @@
+import threading
+from time import monotonic
 from typing import List, Optional
 
 from rick.base import Di
 from rick.mixin.injectable import Injectable
 from rick.resource import CacheInterface
 
-from pokie.cache import DummyCache
-from pokie.contrib.auth.constants import CFG_AUTH_USE_CACHE
+from pokie.cache import DummyCache, LocalCache, MemoryCache
+from pokie.contrib.auth.acl import UserAcl, AclSnapshot
+from pokie.contrib.auth.constants import (
+    CFG_AUTH_USE_CACHE,
+    CFG_AUTH_ACL_CHECK_INTERVAL,
+    CFG_AUTH_ACL_LOCAL_TTL,
+    CFG_AUTH_ACL_LOCAL_SIZE,
+)
 from pokie.contrib.auth.dto import AclRoleRecord, AclResourceRecord
-from pokie.contrib.auth.repository.acl import AclRoleRepository, AclResourceRepository
+from pokie.contrib.auth.repository.acl import (
+    AclRoleRepository,
+    AclResourceRepository,
+    AclVersionRepository,
+)
 from pokie.constants import DI_DB, DI_CACHE, DI_CONFIG, TTL_1D
 
 
 class AclService(Injectable):
-    KEY_ROLE = "acl:role:{}"
-    KEY_ROLE_RESOURCE = "acl:role:{}:resources"
-    KEY_USER_ROLES = "user:{}:roles"
+    # generation counters; cache keys embed the current generation, so bumping a counter invalidates
+    # all derived keys at once
+    KEY_GEN = "acl:gen"
+    KEY_ROLE_GEN = "acl:role:{}:gen"
+
+    # change version, bumped by every mutator; used to validate in-process compiled ACLs
+    # if the cache is not shared between processes, the version is kept in the database
+    KEY_VERSION = "acl:version"
+    LOCAL_CACHES = (DummyCache, LocalCache, MemoryCache)
+
+    # cached entries, prefixed with the global generation
+    KEY_ROLE = "acl:{}:role:{}"
+    KEY_ROLE_RESOURCE = "acl:{}:role:{}:{}:resources"
+    KEY_USER_ROLES = "acl:{}:user:{}:roles"
     TTL = TTL_1D
 
+    # in-process compiled ACL defaults
+    CHECK_INTERVAL = 1
+    LOCAL_TTL = 300
+    LOCAL_SIZE = 10000
+
     def __init__(self, di: Di):
         super().__init__(di)
+        cfg = di.get(DI_CONFIG)
         self.cache = DummyCache(di)
-        if di.get(DI_CONFIG).get(CFG_AUTH_USE_CACHE, False):
+        if cfg.get(CFG_AUTH_USE_CACHE, False):
             if di.has(DI_CACHE):
                 self.cache = di.get(DI_CACHE)
+        self.db_version = isinstance(self.cache, self.LOCAL_CACHES)
+
+        # compiled per-user ACLs; entries are validated against the change version, and expire after the ttl
+        self.check_interval = float(
+            cfg.get(CFG_AUTH_ACL_CHECK_INTERVAL, self.CHECK_INTERVAL)
+        )
+        self.local_acl = LocalCache(
+            int(cfg.get(CFG_AUTH_ACL_LOCAL_SIZE, self.LOCAL_SIZE)),
+            float(cfg.get(CFG_AUTH_ACL_LOCAL_TTL, self.LOCAL_TTL)),
+        )
+        self._version = 0
+        self._version_expires = 0
+
+        # in-memory role->resource matrix
+        self._snapshot = None
+        self._snapshot_lock = threading.Lock()
+
+    def get_user_acl(self, id_user: int) -> UserAcl:
+        """
+        Retrieve the compiled ACL for a user
+        Compiled ACLs are kept in-process, and rebuilt only when the ACL change version moves
+        :param id_user:
+        :return: UserAcl
+        """
+        version = self.get_version()
+        acl = self.local_acl.get(id_user)
+        if acl is not None and acl.version == version:
+            return acl
+
+        id_roles = self.get_user_role_ids(id_user)
+        acl = UserAcl(
+            id_user, version, id_roles, self.get_snapshot().resource_ids(id_roles)
+        )
+        self.local_acl.set(id_user, acl)
+        return acl
 
     def get_user_roles(self, id_user: int) -> dict:
         """
@@ -30,7 +94,8 @@ class AclService(Injectable):
         :param id_user:
         :return: dict[int, AclRoleRecord]
         """
-        key = self.KEY_USER_ROLES.format(id_user)
+        gen = self.get_generation()
+        key = self.KEY_USER_ROLES.format(gen, id_user)
         id_roles = self.cache.get(key)
         if id_roles is not None:
             result = {}
@@ -52,28 +117,59 @@ class AclService(Injectable):
     def get_user_resources(self, id_user: int) -> dict:
         """
         Retrieve resources associated with the user
+        Resources are resolved from the in-memory ACL snapshot
         :param id_user:
         :return: dict[int, AclResourceRecord]
         """
-        resources = {}
-        key = self.KEY_USER_ROLES.format(id_user)
+        return self.get_snapshot().resolve(self.get_user_role_ids(id_user))
+
+    def get_user_role_ids(self, id_user: int) -> List[int]:
+        """
+        Retrieve the ids of the roles associated with the user
+        :param id_user:
+        :return:
+        """
+        key = self.KEY_USER_ROLES.format(self.get_generation(), id_user)
         id_roles = self.cache.get(key)
         if id_roles is not None:
-            for id_role in id_roles:
-                for res in self.list_role_resources(id_role):
-                    resources[res.id] = res
-            return resources
-
-        user_roles = []
-        for _, role in self.get_user_roles(id_user).items():
-            user_roles.append(role.id)
-            for res in self.list_role_resources(role.id):
-                resources[res.id] = res
+            return id_roles
 
-        if len(user_roles) > 0:
+        id_roles = [r.id for r in self.role_repository.find_user_roles(id_user)]
+        if len(id_roles) > 0:
             # only cache if it has data
-            self.cache.set(key, user_roles, self.TTL)
-        return resources
+            self.cache.set(key, id_roles, self.TTL)
+        return id_roles
+
+    def get_snapshot(self) -> AclSnapshot:
+        """
+        Retrieve the in-memory role->resource matrix
+        The snapshot is reloaded with a single query when the ACL change version moves, or when it expires
+        :return: AclSnapshot
+        """
+        version = self.get_version()
+        snapshot = self._snapshot
+        if (
+            snapshot is not None
+            and snapshot.version == version
+            and snapshot.expires > monotonic()
+        ):
+            return snapshot
+
+        with self._snapshot_lock:
+            # another thread may have reloaded it already
+            snapshot = self._snapshot
+            if (
+                snapshot is None
+                or snapshot.version != version
+                or snapshot.expires <= monotonic()
+            ):
+                snapshot = AclSnapshot(
+                    version,
+                    monotonic() + self.local_acl.ttl,
+                    self.resource_repository.find_role_resources(),
+                )
+                self._snapshot = snapshot
+            return snapshot
 
     def list_role_resources(self, id_role: int) -> List[AclResourceRecord]:
         """
@@ -81,7 +177,9 @@ class AclService(Injectable):
         :param id_role:
         :return:
         """
-        key = self.KEY_ROLE_RESOURCE.format(id_role)
+        key = self.KEY_ROLE_RESOURCE.format(
+            self.get_generation(), id_role, self.get_role_generation(id_role)
+        )
         resource_list = self.cache.get(key)
         if resource_list is not None:
             return resource_list
@@ -112,7 +210,7 @@ class AclService(Injectable):
         :param id_role:
         :return:
         """
-        key = self.KEY_ROLE.format(id_role)
+        key = self.KEY_ROLE.format(self.get_generation(), id_role)
         record = self.cache.get(key)
         if record is not None:
             return record
@@ -140,8 +238,9 @@ class AclService(Injectable):
         record = AclRoleRecord(description=description)
         record.id = self.role_repository.insert_pk(record)
         if record.id:
-            key = self.KEY_ROLE.format(record.id)
+            key = self.KEY_ROLE.format(self.get_generation(), record.id)
             self.cache.set(key, record, self.TTL)
+        self._changed()
         return record.id
 
     def add_role_resource(self, id_role: int, id_resource: int):
@@ -152,8 +251,8 @@ class AclService(Injectable):
         :return:
         """
         self.role_repository.add_role_resource(id_role, id_resource)
-        self.cache.remove(self.KEY_ROLE.format(id_role))
-        self.cache.remove(self.KEY_ROLE_RESOURCE.format(id_role))
+        self.invalidate_role(id_role)
+        self._changed()
 
     def list_role_user_id(self, id_role: int) -> List[int]:
         """
@@ -171,7 +270,8 @@ class AclService(Injectable):
         :return:
         """
         self.role_repository.add_user_role(id_user, id_role)
-        self.cache.remove(self.KEY_USER_ROLES.format(id_user))
+        self.cache.remove(self.KEY_USER_ROLES.format(self.get_generation(), id_user))
+        self._changed()
 
     def remove_user_role(self, id_user: int, id_role: int):
         """
@@ -181,7 +281,8 @@ class AclService(Injectable):
         :return:
         """
         self.role_repository.remove_user_role(id_user, id_role)
-        self.cache.remove(self.KEY_USER_ROLES.format(id_user))
+        self.cache.remove(self.KEY_USER_ROLES.format(self.get_generation(), id_user))
+        self._changed()
 
     def remove_role(self, id_role: int):
         """
@@ -191,8 +292,9 @@ class AclService(Injectable):
         :return:
         """
         self.role_repository.delete_pk(id_role)
-        self.cache.remove(self.KEY_ROLE.format(id_role))
-        self.cache.remove(self.KEY_ROLE_RESOURCE.format(id_role))
+        self.cache.remove(self.KEY_ROLE.format(self.get_generation(), id_role))
+        self.invalidate_role(id_role)
+        self._changed()
 
     def can_remove_role(self, id_role: int) -> bool:
         """
@@ -209,18 +311,19 @@ class AclService(Injectable):
         :return:
         """
         self.role_repository.truncate_resources(id_role)
-        self.cache.remove(self.KEY_ROLE_RESOURCE.format(id_role))
+        self.invalidate_role(id_role)
+        self._changed()
 
     def truncate_role_users(self, id_role: int):
         """
         Removes all users from role
+        User role lists are not tracked per role, so the whole ACL cache is invalidated
         :param id_role:
         :return:
         """
-        user_list = self.list_role_user_id(id_role)
         self.role_repository.truncate_users(id_role)
-        for id_user in user_list:
-            self.cache.remove(self.KEY_USER_ROLES.format(id_user))
+        self.invalidate_all()
+        self._changed()
 
     def remove_role_resource(self, id_role: int, id_resource: int):
         """
@@ -230,7 +333,85 @@ class AclService(Injectable):
         :return:
         """
         self.role_repository.remove_role_resource(id_role, id_resource)
-        self.cache.remove(self.KEY_ROLE_RESOURCE.format(id_role))
+        self.invalidate_role(id_role)
+        self._changed()
+
+    def get_version(self) -> int:
+        """
+        Current ACL change version
+        The shared counter (or the database version row, without a shared cache) is read at most once every
+        check_interval seconds
+        :return:
+        """
+        now = monotonic()
+        if now >= self._version_expires:
+            if self.db_version:
+                self._version = self.version_repository.get_version()
+            else:
+                self._version = self._get_counter(self.KEY_VERSION)
+            self._version_expires = now + self.check_interval
+        return self._version
+
+    def get_generation(self) -> int:
+        """
+        Current global ACL cache generation
+        :return:
+        """
+        return self._get_counter(self.KEY_GEN)
+
+    def get_role_generation(self, id_role: int) -> int:
+        """
+        Current cache generation for the given role
+        :param id_role:
+        :return:
+        """
+        return self._get_counter(self.KEY_ROLE_GEN.format(id_role))
+
+    def invalidate_role(self, id_role: int):
+        """
+        Invalidate cached resources for a role
+        :param id_role:
+        :return:
+        """
+        self._incr(self.KEY_ROLE_GEN.format(id_role))
+
+    def invalidate_all(self):
+        """
+        Invalidate all cached ACL entries
+        :return:
+        """
+        self._incr(self.KEY_GEN)
+
+    def _changed(self):
+        """
+        Signal an ACL change
+        Bumps the shared change version, and discards compiled ACLs and the ACL snapshot from the current process
+        :return:
+        """
+        if self.db_version:
+            self._version = self.version_repository.incr()
+        else:
+            self._version = self._incr(self.KEY_VERSION)
+        self._version_expires = monotonic() + self.check_interval
+        self.local_acl.purge()
+        self._snapshot = None
+
+    def _get_counter(self, key: str) -> int:
+        get_counter = getattr(self.cache, "get_counter", None)
+        if get_counter is not None:
+            return get_counter(key)
+        # generic CacheInterface fallback
+        value = self.cache.get(key)
+        return 0 if value is None else int(value)
+
+    def _incr(self, key: str) -> int:
+        incr = getattr(self.cache, "incr", None)
+        if incr is not None:
+            return incr(key)
+        # generic CacheInterface fallback; not atomic
+        value = self._get_counter(key) + 1
+        self.cache.set(key, value)
+        return value
 
     @property
     def role_repository(self):
@@ -239,3 +420,7 @@ class AclService(Injectable):
     @property
     def resource_repository(self):
         return AclResourceRepository(self.get_di().get(DI_DB))
+
+    @property
+    def version_repository(self):
+        return AclVersionRepository(self.get_di().get(DI_DB))
@@ -1,6 +1,8 @@
+import hashlib
+import logging
 import secrets
 from datetime import datetime, timezone
-from typing import Optional, List
+from typing import Optional, List, Tuple
 
 from rick.base import Di
 from rick.crypto.hasher import HasherInterface
@@ -8,10 +10,29 @@ from rick.crypto.hasher.bcrypt import BcryptHasher
 from rick.mixin import Injectable
 
 from pokie.cache import DummyCache
-from pokie.contrib.auth.constants import CFG_AUTH_USE_CACHE
+from pokie.contrib.auth.constants import (
+    CFG_AUTH_USE_CACHE,
+    CFG_AUTH_NEGATIVE_TTL,
+    CFG_AUTH_HASHER_WORKERS,
+    CFG_AUTH_HASHER_QUEUE_SIZE,
+    CFG_AUTH_LASTLOGIN_INTERVAL,
+    CFG_AUTH_LASTLOGIN_STALENESS,
+    METRIC_USERNAME_MISS,
+    METRIC_TOKEN_MISS,
+)
+from pokie.contrib.auth.hasher import PooledHasher
 from pokie.contrib.auth.repository import UserTokenRepository
 from pokie.contrib.auth.repository.user import UserRepository
-from pokie.constants import DI_DB, DI_CACHE, TTL_1D, DI_CONFIG
+from pokie.constants import (
+    DI_DB,
+    DI_CACHE,
+    TTL_1D,
+    DI_CONFIG,
+    DI_METRICS,
+    DI_SIGNAL,
+)
+from pokie.core.buffer import WriteBehindBuffer
+from pokie.core.metrics import MetricsRegistry
 from rick.util.datetime import iso8601_now
 from pokie.contrib.auth.dto import UserRecord, UserTokenRecord
 
@@ -21,13 +42,59 @@ class UserService(Injectable):
     KEY_USER = "user:{}"
     KEY_TOKEN = "user:token:{}"
     TTL = TTL_1D
+    NEGATIVE_TTL = 60
+    HASHER_WORKERS = 2
+    HASHER_QUEUE_SIZE = 32
+    LASTLOGIN_INTERVAL = 1
+    LASTLOGIN_STALENESS = 0
+
+    # value stored in cache for lookups that did not match any record
+    NEGATIVE_MARKER = False
 
     def __init__(self, di: Di):
         super().__init__(di)
+        cfg = di.get(DI_CONFIG)
         self.cache = DummyCache(di)
-        if di.get(DI_CONFIG).get(CFG_AUTH_USE_CACHE, False):
+        if cfg.get(CFG_AUTH_USE_CACHE, False):
             if di.has(DI_CACHE):
                 self.cache = di.get(DI_CACHE)
+        self.negative_ttl = int(cfg.get(CFG_AUTH_NEGATIVE_TTL, self.NEGATIVE_TTL))
+
+        metrics = di.get(DI_METRICS) if di.has(DI_METRICS) else MetricsRegistry()
+        self.username_miss = metrics.counter(
+            METRIC_USERNAME_MISS, "lookups for non-existing usernames"
+        )
+        self.token_miss = metrics.counter(
+            METRIC_TOKEN_MISS, "lookups for non-existing tokens"
+        )
+
+        # hasher is stateless; build it once
+        self._hasher = BcryptHasher()
+        workers = int(cfg.get(CFG_AUTH_HASHER_WORKERS, self.HASHER_WORKERS))
+        if workers > 0:
+            self._hasher = PooledHasher(
+                self._hasher,
+                workers,
+                int(cfg.get(CFG_AUTH_HASHER_QUEUE_SIZE, self.HASHER_QUEUE_SIZE)),
+                metrics,
+            )
+
+        # last_login write-behind buffer
+        self.lastlogin_buffer = None
+        staleness = float(
+            cfg.get(CFG_AUTH_LASTLOGIN_STALENESS, self.LASTLOGIN_STALENESS)
+        )
+        if staleness > 0:
+            self.lastlogin_buffer = WriteBehindBuffer(
+                self.write_lastlogin,
+                float(cfg.get(CFG_AUTH_LASTLOGIN_INTERVAL, self.LASTLOGIN_INTERVAL)),
+                staleness,
+                on_error=self._lastlogin_error,
+            )
+            if di.has(DI_SIGNAL):
+                di.get(DI_SIGNAL).add_shutdown_handler(
+                    lambda _di: self.flush_lastlogin()
+                )
 
     def authenticate(self, username: str, password: str) -> Optional[UserRecord]:
         """
@@ -50,8 +117,12 @@ class UserService(Injectable):
                 self.update_password(record.id, self.hasher.hash(password))
 
             # update lastlogin
-            self.update_lastlogin(record.id)
-            return self.load_id(record.id)
+            now = self.update_lastlogin(record.id)
+            record = self.load_id(record.id)
+            if record:
+                # last_login may not be persisted yet
+                record.last_login = now
+            return record
         return None
 
     def sanitize_record(self, record: UserRecord) -> UserRecord:
@@ -98,11 +169,16 @@ class UserService(Injectable):
         """
         key = self.KEY_USERNAME.format(username)
         id_user = self.cache.get(key)
+        if id_user is self.NEGATIVE_MARKER:
+            self.username_miss.inc()
+            return None
         if id_user is not None:
             return self.get_by_id(id_user)
 
         record = self.user_repository.find_by_username(username)
         if not record:
+            self.username_miss.inc()
+            self.set_negative(key)
             return None
 
         # store username -> id map
@@ -113,19 +189,46 @@ class UserService(Injectable):
         self.cache.set(key, record, self.TTL)
         return record
 
-    def update_lastlogin(self, id_user: int):
+    def update_lastlogin(self, id_user: int) -> datetime:
         """
         Update user last login timestamp
+        If write-behind is enabled, the update is buffered and persisted later in a batch
         :param id_user:
-        :return:
+        :return: the new last_login value
         """
         now = datetime.now(timezone.utc)
-        self.user_repository.update(UserRecord(id=id_user, last_login=now))
-        key = self.KEY_USER.format(id_user)
-        record = self.cache.get(key)
-        if record:
-            record.last_login = now
-            self.cache.set(key, record, self.TTL)
+        if self.lastlogin_buffer is not None:
+            self.lastlogin_buffer.add(id_user, now)
+        else:
+            self.write_lastlogin({id_user: now})
+        return now
+
+    def write_lastlogin(self, values: dict):
+        """
+        Persist last_login timestamps and update cached records
+        :param values: dict of id_user: last_login
+        :return:
+        """
+        self.user_repository.update_last_login(values)
+        for id_user, last_login in values.items():
+            key = self.KEY_USER.format(id_user)
+            record = self.cache.get(key)
+            if record:
+                record.last_login = last_login
+                self.cache.set(key, record, self.TTL)
+
+    def flush_lastlogin(self) -> int:
+        """
+        Persist buffered last_login updates
+        :return: number of updated users
+        """
+        if self.lastlogin_buffer is None:
+            return 0
+        return self.lastlogin_buffer.flush()
+
+    def _lastlogin_error(self, e: Exception):
+        # flush runs on a timer thread; don't let errors kill it
+        logging.getLogger(__name__).exception(e)
 
     def update_password(self, id_user: int, password_hash: str):
         """
@@ -143,7 +246,10 @@ class UserService(Injectable):
         :param record:
         :return:
         """
-        return self.user_repository.insert_pk(record)
+        id_user = self.user_repository.insert_pk(record)
+        # discard any cached negative lookup for the username
+        self.cache.remove(self.KEY_USERNAME.format(record.username))
+        return id_user
 
     def list_users(self, offset, limit, sort_field=None, sort_order=None) -> tuple:
         """
@@ -165,6 +271,9 @@ class UserService(Injectable):
         """
         self.user_repository.update(record)
         self.cache.remove(self.KEY_USER.format(record.id))
+        if record.username:
+            # username may have changed
+            self.cache.remove(self.KEY_USERNAME.format(record.username))
 
     def get_user_by_token(self, token: str) -> Optional[UserRecord]:
         """
@@ -175,11 +284,17 @@ class UserService(Injectable):
         :return:
         """
         now = datetime.now(timezone.utc)
+        token = self.hash_token(token)
         key = self.KEY_TOKEN.format(token)
         record = self.cache.get(key)
+        if record is self.NEGATIVE_MARKER:
+            self.token_miss.inc()
+            return None
         if not record:
             record = self.user_token_repository.find_by_token(token)
             if not record:
+                self.token_miss.inc()
+                self.set_negative(key)
                 return None
             self.cache.set(key, record, self.TTL)
 
@@ -197,24 +312,31 @@ class UserService(Injectable):
         :param token:
         :return:
         """
-        return self.user_token_repository.find_by_token(token)
+        return self.user_token_repository.find_by_token(self.hash_token(token))
 
-    def add_user_token(self, id_user: int, expires: datetime = None) -> UserTokenRecord:
+    def add_user_token(
+        self, id_user: int, expires: datetime = None
+    ) -> Tuple[UserTokenRecord, str]:
         """
         Creates a new Token for the given user
+        Only a hash of the token is stored, and the returned record holds the hash; the plain token is only
+        available as the second element of the returned tuple
         :param id_user:
         :param expires:
-        :return:
+        :return: (record, plain token)
         """
+        token = secrets.token_hex(64)
         record = UserTokenRecord(
             creation_date=iso8601_now(),
             active=True,
             user=id_user,
-            token=secrets.token_hex(64),
+            token=self.hash_token(token),
             expires=expires,
         )
         record.id = self.user_token_repository.insert_pk(record)
-        return record
+        # discard any cached negative lookup for the token
+        self.cache.remove(self.KEY_TOKEN.format(record.token))
+        return record, token
 
     def disable_user_token(self, id_user_token: int) -> bool:
         """
@@ -227,7 +349,7 @@ class UserService(Injectable):
             return False
         key = self.KEY_TOKEN.format(record.token)
         if record.expires:
-            if record.expires < datetime.now(timezone.utc).now():
+            if record.expires < datetime.now(timezone.utc):
                 self.cache.remove(key)
 
         if not record.active:
@@ -261,13 +383,40 @@ class UserService(Injectable):
         """
         return self.user_token_repository.find_by_user(id_user)
 
-    def prune_tokens(self):
+    def prune_tokens(self, batch_size: int = 1000) -> int:
         """
         Remove all expired tokens
-        :return:
+        Tokens are removed in batches of batch_size rows, to avoid long-running locks
+        :param batch_size:
+        :return: number of removed tokens
         """
         now = datetime.now(timezone.utc)
-        self.user_token_repository.prune(now)
+        total = 0
+        while True:
+            removed = self.user_token_repository.prune_batch(now, batch_size)
+            total += removed
+            if removed < batch_size:
+                return total
+
+    @staticmethod
+    def hash_token(token: str) -> str:
+        """
+        Hash a token for storage and lookup
+        Tokens are random, high-entropy values, so a plain SHA-256 digest is sufficient
+        :param token:
+        :return: hex digest
+        """
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def set_negative(self, key: str):
+        """
+        Cache a negative lookup result
+        Negative entries use a short, separate TTL; a TTL of 0 disables negative caching
+        :param key:
+        :return:
+        """
+        if self.negative_ttl > 0:
+            self.cache.set(key, self.NEGATIVE_MARKER, self.negative_ttl)
 
     @property
     def user_repository(self) -> UserRepository:
@@ -279,4 +428,4 @@ class UserService(Injectable):
 
     @property
     def hasher(self) -> HasherInterface:
-        return BcryptHasher()
+        return self._hasher
@@ -0,0 +1,2 @@
+-- user tokens are stored as SHA-256 hex digests
+UPDATE user_token SET token = encode(sha256(token::bytea), 'hex');
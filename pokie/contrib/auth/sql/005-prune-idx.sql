@@ -0,0 +1,3 @@
+-- support batched pruning of expired rows
+CREATE INDEX user_token_idx03 on user_token(expires);
+CREATE INDEX jwt_revoked_idx01 on jwt_revoked(expires);
@@ -0,0 +1,7 @@
+-- ACL change version, used when no shared cache is available
+CREATE TABLE acl_version(
+    id_acl_version INT NOT NULL PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0
+);
+
+INSERT INTO acl_version(id_acl_version, version) VALUES (1, 0);
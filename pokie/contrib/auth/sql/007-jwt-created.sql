@@ -0,0 +1,3 @@
+-- revocation time, used to load new revocations incrementally
+ALTER TABLE jwt_revoked ADD COLUMN created TIMESTAMP DEFAULT (NOW() AT TIME ZONE 'UTC');
+CREATE INDEX jwt_revoked_idx02 on jwt_revoked(created);
@@ -0,0 +1,3 @@
+-- a token id is revoked only once; refresh tokens rely on it to be single-use
+DELETE FROM jwt_revoked a USING jwt_revoked b WHERE a.jti = b.jti AND a.id_jwt_revoked > b.id_jwt_revoked;
+CREATE UNIQUE INDEX jwt_revoked_idx03 on jwt_revoked(jti);
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Any
+from typing import Any, Iterable
 
 
 class UserInterface(ABC):
@@ -47,20 +47,23 @@ class User(UserInterface):
         self,
         id_user: Any = None,
         record: object = None,
-        roles: list = None,
-        resources: list = None,
+        roles: Iterable = None,
+        resources: Iterable = None,
+        acl: Any = None,
         **kwargs
     ):
         self.id = id_user
         self.record = record
         if roles is None:
             roles = []
-        self.roles = roles
+        self.roles = list(roles)
         if resources is None:
             resources = []
-        self.resources = resources
+        self.resources = list(resources)
+        # optional compiled UserAcl; if present, permission checks use its sets instead of the lists
+        self.acl = acl
         # set custom parameters
-        for k, v in kwargs:
+        for k, v in kwargs.items():
             setattr(self, k, v)
 
     @property
@@ -79,9 +82,13 @@ class User(UserInterface):
         return self.id is not None
 
     def can_access(self, id_resource) -> bool:
+        if self.acl is not None:
+            return self.acl.can_access(id_resource)
         return id_resource in self.resources
 
     def has_role(self, id_role):
+        if self.acl is not None:
+            return self.acl.has_role(id_role)
         return id_role in self.roles
 
     def get_id(self):
@@ -96,4 +103,4 @@ class User(UserInterface):
         return self.roles
 
     def get_resources(self):
-        return self.roles
+        return self.resources
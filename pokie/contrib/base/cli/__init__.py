@@ -1,9 +1,45 @@
-from .base import ListCmd, HelpCmd, RunServerCmd, VersionCmd
-from .db import DbInitCmd, DbCheckCmd, DbUpdateCmd
-from .job import JobRunCmd, JobListCmd
-from .db_codegen import GenDtoCmd, GenRequestRecordCmd
-from .tpl_codegen import ModuleGenCmd, AppGenCmd
-from .fixture import RunFixtureCmd, CheckFixtureCmd
-from .pytest import PyTestCmd
-from .module import ModuleListCmd
-from .route import RouteListCmd
+import importlib
+
+# command classes are imported on first access, so running a command does not import all the others
+# class name: submodule
+_exports = {
+    "ListCmd": "base",
+    "HelpCmd": "base",
+    "RunServerCmd": "base",
+    "VersionCmd": "base",
+    "CompletionCmd": "completion",
+    "CompleteCmd": "completion",
+    "DbInitCmd": "db",
+    "DbCheckCmd": "db",
+    "DbUpdateCmd": "db",
+    "JobRunCmd": "job",
+    "JobListCmd": "job",
+    "JobStatusCmd": "job",
+    "GenDtoCmd": "db_codegen",
+    "GenRequestRecordCmd": "db_codegen",
+    "ModuleGenCmd": "tpl_codegen",
+    "AppGenCmd": "tpl_codegen",
+    "RunFixtureCmd": "fixture",
+    "CheckFixtureCmd": "fixture",
+    "PyTestCmd": "pytest",
+    "ModuleListCmd": "module",
+    "RouteListCmd": "route",
+    "MiddlewareListCmd": "middleware",
+    "CacheStatsCmd": "cache",
+    "TaskStatsCmd": "task",
+    "TaskDeadCmd": "task",
+    "TaskRetryCmd": "task",
+    "OutboxStatsCmd": "outbox",
+    "StartupReportCmd": "startup",
+}
+
+
+def __getattr__(name):
+    if name not in _exports:
+        raise AttributeError("module {} has no attribute {}".format(__name__, name))
+    module = importlib.import_module("." + _exports[name], __name__)
+    return getattr(module, name)
+
+
+def __dir__():
+    return list(globals().keys()) + list(_exports.keys())
@@ -1,14 +1,13 @@
 import os
+import signal
 import sys
 from argparse import ArgumentParser
 
 from rick.resource.console import AnsiColor
-from rick.util.loader import load_class
 
 import pokie
-from pokie.constants import DI_APP, DI_FLASK
+from pokie.constants import DI_APP, DI_FLASK, DI_SIGNAL
 from pokie.core import CliCommand
-from pokie.util.cli_args import ArgParser
 
 
 class BaseCommand(CliCommand):
@@ -22,27 +21,20 @@ class BaseCommand(CliCommand):
                 result[cmd] = cmd_class
         return result
 
+    def get_manifest(self) -> dict:
+        """
+        Get command details from the application command manifest
+        :return: dict of command name: details
+        """
+        return self.get_di().get(DI_APP).command_manifest().commands()
+
     def run(self, args) -> bool:
-        di = self.get_di()
         color = AnsiColor()
         self.tty.write("Available commands:\n")
-        for _, module in di.get(DI_APP).modules.items():
-            for cmd, cmd_path in module.cmd.items():
-                cls = load_class(cmd_path)
-                if not cls:
-                    raise RuntimeError(
-                        "Error: class '{}' not found while listing available CLI commands".format(
-                            cmd_path
-                        )
-                    )
-                if not issubclass(cls, CliCommand):
-                    raise RuntimeError(
-                        "Error: class '{}' does not extend CliCommand".format(cmd_path)
-                    )
-                obj = cls(di)
-                self.tty.write(
-                    "{} \t {}".format(color.green(cmd), color.white(obj.description))
-                )
+        for cmd, details in self.get_manifest().items():
+            self.tty.write(
+                "{} \t {}".format(color.green(cmd), color.white(details["description"]))
+            )
 
         return True
 
@@ -62,31 +54,26 @@ class HelpCmd(BaseCommand):
         parser.add_argument("command", type=str, help="Command to get usage details.")
 
     def run(self, args) -> bool:
-        map = self.get_cmd_map()
-        if args.command not in map.keys():
+        details = self.get_manifest().get(args.command, None)
+        if details is None:
             self.tty.error("Error: command '{}' not found".format(args.command))
             return False
 
-        cls = load_class(map[args.command])
-        handler = cls(self.get_di())  # type: CliCommand
-        self.show(args.command, handler)
+        self.show(args.command, details)
         return True
 
-    def show(self, cmd, cmd_object):
+    def show(self, cmd, details: dict):
         """
         Show command detail
         :param cmd: command
-        :param cmd_object: command object
+        :param details: command manifest entry
         :return:
         """
         program = os.path.basename(sys.argv[0])
 
-        self.tty.write("{}: {}\n".format(cmd, cmd_object.description))
+        self.tty.write("{}: {}\n".format(cmd, details["description"]))
         self.tty.write("usage: {} {} [OPTIONS...]\n".format(program, cmd))
-
-        parser = ArgParser(add_help=False)
-        cmd_object.arguments(parser)
-        self.tty.write(parser.format_parameters())
+        self.tty.write(details["usage"])
 
 
 class ListCmd(BaseCommand):
@@ -98,25 +85,10 @@ class ListCmd(BaseCommand):
             "\nusage: {} <command> [OPTIONS...]\n".format(os.path.basename(sys.argv[0]))
         )
         self.tty.write("available commands:")
-        for cmd, cmd_path in self.get_cmd_map().items():
-            cls = load_class(cmd_path)
-
-            if not cls:
-                raise RuntimeError(
-                    "Error: class '{}' not found while listing available CLI commands".format(
-                        cmd_path
-                    )
-                )
-
-            if not issubclass(cls, CliCommand):
-                raise RuntimeError(
-                    "Error: class '{}' does not extend CliCommand".format(cmd_path)
-                )
-
-            # show details
+        for cmd, details in self.get_manifest().items():
             self.tty.write(
                 "{} \t {}".format(
-                    color.green(cmd), color.white(cls.description)
+                    color.green(cmd), color.white(details["description"])
                 ).expandtabs(32)
             )
 
@@ -124,7 +96,7 @@ class ListCmd(BaseCommand):
 
 
 class RunServerCmd(CliCommand):
-    description = "run Flask webserver for development purposes"
+    description = "run Flask webserver; use --workers for the pre-fork production server"
 
     # flask_name: args_name
     flask_args = {
@@ -165,13 +137,60 @@ class RunServerCmd(CliCommand):
             action="store_true",
             default=False,
         )
+        parser.add_argument(
+            "-w",
+            "--workers",
+            help="Number of worker processes; if set, the pre-fork server is used instead of the development server",
+            required=False,
+            type=int,
+            default=0,
+        )
+        parser.add_argument(
+            "-t",
+            "--threads",
+            help="Number of request threads per worker process (default: 1)",
+            required=False,
+            type=int,
+            default=1,
+        )
+        parser.add_argument(
+            "--reuse-port",
+            help="Bind a socket per worker with SO_REUSEPORT, instead of sharing a single socket (default: false)",
+            required=False,
+            action="store_true",
+            default=False,
+        )
 
     def run(self, args) -> bool:
+        if args.workers > 0:
+            if args.debug or args.reload:
+                self.tty.error("error: --debug and --reload are not available with --workers")
+                return False
+            if args.threads < 1:
+                self.tty.error("error: --threads must be at least 1")
+                return False
+            return self.get_di().get(DI_APP).serve(
+                args.host, args.port, args.workers, args.threads, args.reuse_port
+            )
+
         kwargs = {}
         for a, b in self.flask_args.items():
             kwargs[a] = getattr(args, b)
 
+        # initialize before serving, so the first requests are not delayed; with --reload, only
+        # the child process serves requests, so the reloader monitor process skips warmup
+        if not args.reload or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+            self.get_di().get(DI_APP).warmup()
+
+        # exit cleanly on SIGTERM, so shutdown handlers run
+        self.get_di().get(DI_SIGNAL).add_handler(signal.SIGTERM, self.terminate)
+
         # run flask
         self.get_di().get(DI_FLASK).run(**kwargs)
 
         return True
+
+    @staticmethod
+    def terminate(di, signal_no, stack_frame):
+        # raise SystemExit; shutdown handlers run on interpreter exit
+        exit(0)
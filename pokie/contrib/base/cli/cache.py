@@ -0,0 +1,82 @@
+import json
+from argparse import ArgumentParser
+
+from tabulate import tabulate
+
+from pokie.constants import DI_REDIS, DI_METRICS
+from pokie.core import CliCommand
+from pokie.core.factories.redis import redis_pool_stats
+
+
+class CacheStatsCmd(CliCommand):
+    description = "show cache hit ratio and redis pool usage"
+
+    # redis INFO fields to report
+    info_fields = [
+        "connected_clients",
+        "blocked_clients",
+        "rejected_connections",
+        "evicted_keys",
+        "expired_keys",
+        "used_memory_human",
+    ]
+
+    def arguments(self, parser: ArgumentParser):
+        parser.add_argument(
+            "--json",
+            help="output JSON instead of tabular format",
+            action="store_true",
+            default=False,
+        )
+
+    def run(self, args) -> bool:
+        di = self.get_di()
+        if not di.has(DI_REDIS):
+            self.tty.error("error: no redis connection found in the application")
+            return False
+
+        client = di.get(DI_REDIS)
+        try:
+            info = client.info()
+        except Exception as e:
+            self.tty.error("error: cannot read redis stats: {}".format(str(e)))
+            return False
+
+        hits = int(info.get("keyspace_hits", 0))
+        misses = int(info.get("keyspace_misses", 0))
+        lookups = hits + misses
+        server = {
+            "keyspace_hits": hits,
+            "keyspace_misses": misses,
+            "hit_ratio": round(hits / lookups, 4) if lookups > 0 else None,
+        }
+        for name in self.info_fields:
+            server[name] = info.get(name, None)
+
+        pool = redis_pool_stats(client)
+        metrics = {}
+        if di.has(DI_METRICS):
+            metrics = di.get(DI_METRICS).snapshot()
+
+        if args.json:
+            self.tty.write(
+                json.dumps(
+                    {"server": server, "pool": pool, "metrics": metrics}, indent=2
+                )
+            )
+            return True
+
+        self.tty.write(tabulate(server.items(), headers=["Redis server", "Value"]))
+        self.tty.write("")
+        if pool:
+            self.tty.write(tabulate(pool.items(), headers=["Connection pool", "Value"]))
+        else:
+            self.tty.write("connection pool stats not available")
+
+        counters = [
+            [name, m["value"]] for name, m in metrics.items() if "value" in m.keys()
+        ]
+        if len(counters) > 0:
+            self.tty.write("")
+            self.tty.write(tabulate(counters, headers=["Process metric", "Value"]))
+        return True
@@ -0,0 +1,41 @@
+import os
+import sys
+
+from pokie.contrib.base.cli.base import BaseCommand
+
+BASH_COMPLETION = """_pokie_{name}() {{
+    local words
+    words=$("${{COMP_WORDS[0]}}" cli:complete "${{COMP_WORDS[@]:1:COMP_CWORD-1}}" 2>/dev/null)
+    COMPREPLY=( $(compgen -W "$words" -- "${{COMP_WORDS[COMP_CWORD]}}") )
+}}
+complete -F _pokie_{name} {program}"""
+
+
+class CompletionCmd(BaseCommand):
+    description = "output a bash completion script for this program"
+
+    def run(self, args) -> bool:
+        program = os.path.basename(sys.argv[0])
+        name = "".join([c if c.isalnum() else "_" for c in program])
+        self.tty.write(BASH_COMPLETION.format(name=name, program=program))
+        return True
+
+
+class CompleteCmd(BaseCommand):
+    description = "list completion candidates for the given command line words"
+    skipargs = True
+
+    def run(self, args) -> bool:
+        words = sys.argv[2:]
+        manifest = self.get_manifest()
+        if len(words) == 0:
+            candidates = manifest.keys()
+        else:
+            details = manifest.get(words[0], None)
+            if details is None:
+                return True
+            candidates = [opt for opt in details["options"] if opt not in words[1:]]
+
+        for candidate in candidates:
+            self.tty.write(candidate)
+        return True
@@ -1,26 +1,191 @@
-from pokie.constants import DI_APP
+import json
+from argparse import ArgumentParser
+from datetime import datetime
+from time import time
+
+from tabulate import tabulate
+
+from pokie.constants import (
+    DI_APP,
+    DI_CONFIG,
+    DI_REDIS,
+    CFG_JOB_STATE_FILE,
+    CFG_JOB_STATE_REDIS,
+    CFG_JOB_STALE_AFTER,
+)
 from pokie.contrib.base.cli.base import BaseCommand
+from pokie.core.scheduler import (
+    read_state_file,
+    read_state_files,
+    read_state_redis,
+    job_health,
+    JOB_OK,
+    JOB_RUNNING,
+)
 
 
 class JobListCmd(BaseCommand):
     description = "list registered job workers"
 
     def run(self, args) -> bool:
+        state = read_state_file(
+            self.get_di().get(DI_CONFIG).get(CFG_JOB_STATE_FILE, None)
+        )
         for name, jobs in self.get_di().get(DI_APP).get_jobs().items():
             self.tty.write("Worker Jobs for module {}:".format(name))
+            table = []
             for job in jobs:
-                self.tty.write(
-                    self.tty.colorizer.white("   {}".format(job), attr="bold")
+                info = state.get(job, {})
+                table.append(
+                    [
+                        self.tty.colorizer.white(job, attr="bold"),
+                        info.get("schedule", "-"),
+                        info.get("runs", "-"),
+                        self.format_duration(info.get("last_duration", None)),
+                        self.format_time(info.get("last_run", None)),
+                        self.format_time(info.get("next_run", None)),
+                    ]
                 )
+            self.tty.write(
+                tabulate(
+                    table,
+                    headers=[
+                        "Job",
+                        "Schedule",
+                        "Runs",
+                        "Last duration",
+                        "Last run",
+                        "Next run",
+                    ],
+                )
+            )
+            self.tty.write("")
 
         return True
 
+    @staticmethod
+    def format_time(value) -> str:
+        if value is None:
+            return "-"
+        return datetime.fromtimestamp(value).strftime("%Y-%m-%d %H:%M:%S")
+
+    @staticmethod
+    def format_duration(value) -> str:
+        if value is None:
+            return "-"
+        return "{:.3f}s".format(value)
+
 
 class JobRunCmd(BaseCommand):
     description = "run  all job workers"
 
+    def arguments(self, parser: ArgumentParser):
+        parser.add_argument(
+            "--workers",
+            help="number of worker processes (default: 1)",
+            type=int,
+            default=1,
+        )
+        parser.add_argument(
+            "--jobs",
+            help="comma-separated list of jobs to run (full class path or class name)",
+            default="",
+        )
+
     def run(self, args) -> bool:
         app = self.get_di().get(DI_APP)
+        jobs = [name.strip() for name in args.jobs.split(",") if name.strip()]
+        if args.workers < 1:
+            self.tty.error("Error: --workers must be at least 1")
+            return False
         # run in loop
-        app.job_runner()
-        return True
+        return app.job_runner(jobs=jobs, workers=args.workers) is not False
+
+
+class JobStatusCmd(JobListCmd):
+    description = "show job health and run statistics from running workers"
+
+    def arguments(self, parser: ArgumentParser):
+        parser.add_argument(
+            "--json",
+            help="output JSON instead of tabular format",
+            action="store_true",
+            default=False,
+        )
+        parser.add_argument(
+            "--check",
+            help="fail if any job is failing, overrun, late or stale",
+            action="store_true",
+            default=False,
+        )
+
+    def run(self, args) -> bool:
+        cfg = self.get_di().get(DI_CONFIG)
+        stale_after = float(cfg.get(CFG_JOB_STALE_AFTER, 60))
+        if cfg.get(CFG_JOB_STATE_REDIS, False):
+            states = read_state_redis(self.get_di().get(DI_REDIS))
+        else:
+            states = read_state_files(cfg.get(CFG_JOB_STATE_FILE, None))
+
+        now = time()
+        result = []
+        for state in states:
+            updated = state.get("updated", 0)
+            worker = state.get("worker", str(state.get("pid", "-")))
+            for name, info in sorted(state.get("jobs", {}).items()):
+                info = dict(info)
+                info["worker"] = worker
+                info["health"] = job_health(info, updated, now, stale_after)
+                result.append(info)
+
+        # no job state is reported as unhealthy, so --check fails if no worker is running
+        healthy = len(result) > 0 and all(
+            info["health"] in (JOB_OK, JOB_RUNNING) for info in result
+        )
+        if args.json:
+            self.tty.write(json.dumps(result, indent=2))
+            return healthy or not args.check
+
+        if len(result) == 0:
+            self.tty.write("No job state found; is job:run running?")
+            return healthy or not args.check
+
+        table = []
+        for info in result:
+            health = info["health"]
+            if health in (JOB_OK, JOB_RUNNING):
+                health = self.tty.colorizer.green(health)
+            else:
+                health = self.tty.colorizer.red(health, attr="bold")
+            duration = info.get("duration", None) or {}
+            count = duration.get("count", 0)
+            table.append(
+                [
+                    info["worker"],
+                    self.tty.colorizer.white(info["name"], attr="bold"),
+                    health,
+                    info.get("runs", 0),
+                    info.get("failures", 0),
+                    info.get("overruns", 0),
+                    self.format_duration(duration["sum"] / count if count else None),
+                    self.format_duration(duration.get("max", None) if count else None),
+                    self.format_time(info.get("last_success", None)),
+                ]
+            )
+        self.tty.write(
+            tabulate(
+                table,
+                headers=[
+                    "Worker",
+                    "Job",
+                    "Health",
+                    "Runs",
+                    "Failures",
+                    "Overruns",
+                    "Avg duration",
+                    "Max duration",
+                    "Last success",
+                ],
+            )
+        )
+        return healthy or not args.check
@@ -0,0 +1,37 @@
+import json
+from argparse import ArgumentParser
+
+from tabulate import tabulate
+
+from pokie.constants import DI_APP
+from pokie.core import CliCommand
+
+
+class MiddlewareListCmd(CliCommand):
+    description = "list module WSGI middlewares, from the outer to the inner stage"
+
+    def arguments(self, parser: ArgumentParser):
+        parser.add_argument(
+            "--json",
+            help="output JSON instead of tabular format",
+            action="store_true",
+            default=False,
+        )
+
+    def run(self, args) -> bool:
+        table = []
+        for priority, middleware in self.get_di().get(DI_APP).middlewares:
+            if type(middleware) is not str:
+                middleware = "{}.{}".format(
+                    middleware.__module__, middleware.__qualname__
+                )
+            table.append([priority, middleware])
+
+        if not args.json:
+            self.tty.write(tabulate(table, headers=["Priority", "Middleware"]))
+        else:
+            result = []
+            for row in table:
+                result.append({"priority": row[0], "middleware": row[1]})
+            self.tty.write(json.dumps(result, indent=2))
+        return True
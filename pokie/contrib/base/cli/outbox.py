@@ -0,0 +1,31 @@
+import json
+from argparse import ArgumentParser
+
+from tabulate import tabulate
+
+from pokie.constants import DI_SERVICES
+from pokie.contrib.base.constants import SVC_OUTBOX
+from pokie.core import CliCommand
+
+
+class OutboxStatsCmd(CliCommand):
+    description = "show pending outbox events and publishing lag"
+
+    def arguments(self, parser: ArgumentParser):
+        parser.add_argument(
+            "--json",
+            help="output JSON instead of tabular format",
+            action="store_true",
+            default=False,
+        )
+
+    def run(self, args) -> bool:
+        stats = self.get_di().get(DI_SERVICES).get(SVC_OUTBOX).stats()
+        if args.json:
+            self.tty.write(json.dumps(stats, indent=2))
+            return True
+
+        lag = stats["lag"]
+        stats["lag"] = "{:.3f}s".format(lag) if lag is not None else "-"
+        self.tty.write(tabulate(stats.items(), headers=["Outbox", "Value"]))
+        return True
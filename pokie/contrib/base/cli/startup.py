@@ -0,0 +1,93 @@
+from argparse import ArgumentParser
+
+from tabulate import tabulate
+
+from pokie.constants import DI_APP
+from pokie.core import CliCommand
+
+
+class StartupReportCmd(CliCommand):
+    description = "initialize and warm up the application, and show the duration of each startup step"
+
+    def arguments(self, parser: ArgumentParser):
+        parser.add_argument(
+            "--top",
+            help="show only the N slowest steps (default: all)",
+            type=int,
+            default=0,
+        )
+        parser.add_argument(
+            "--json",
+            help="output JSON instead of tabular format",
+            action="store_true",
+            default=False,
+        )
+        parser.add_argument(
+            "--output",
+            help="also write the JSON report to the given file",
+            required=False,
+            default=None,
+        )
+        parser.add_argument(
+            "--max-time",
+            help="fail if the total startup time exceeds the given number of seconds",
+            type=float,
+            default=0,
+        )
+
+    def run(self, args) -> bool:
+        report = self.get_di().get(DI_APP).warmup()
+        elapsed = report.elapsed()
+
+        if args.output:
+            with open(args.output, "w") as f:
+                f.write(report.to_json(indent=2))
+
+        if args.json:
+            self.tty.write(report.to_json(indent=2))
+        else:
+            self.write_table(report, args.top)
+            self.tty.write("\nTotal startup time: {:.3f} ms".format(elapsed * 1000))
+
+        if 0 < args.max_time < elapsed:
+            self.tty.error(
+                "error: startup time {:.3f}s exceeds {:.3f}s".format(
+                    elapsed, args.max_time
+                )
+            )
+            return False
+        return True
+
+    def write_table(self, report, top: int):
+        entries = report.entries
+        if top > 0:
+            entries = sorted(entries, key=lambda e: e.duration, reverse=True)[:top]
+
+        table = []
+        for step in entries:
+            error = report.errors.get((step.stage, step.name), None)
+            if error is not None:
+                error = self.tty.colorizer.red(error)
+            table.append(
+                [
+                    step.stage,
+                    step.name,
+                    "{:.3f}".format(step.duration * 1000),
+                    "{:.3f}".format(step.import_time * 1000),
+                    step.imports,
+                    error,
+                ]
+            )
+        self.tty.write(
+            tabulate(
+                table,
+                headers=["Stage", "Step", "Time (ms)", "Import (ms)", "Imports", "Error"],
+            )
+        )
+        self.tty.write("")
+
+        totals = [
+            [stage, "{:.3f}".format(duration * 1000)]
+            for stage, duration in report.totals().items()
+        ]
+        self.tty.write(tabulate(totals, headers=["Stage", "Total (ms)"]))
@@ -0,0 +1,113 @@
+import json
+from argparse import ArgumentParser
+
+from tabulate import tabulate
+
+from pokie.constants import DI_SERVICES
+from pokie.contrib.base.constants import SVC_TASK_QUEUE
+from pokie.contrib.base.repository.task import TASK_QUEUED, TASK_RUNNING, TASK_DEAD
+from pokie.contrib.base.service.task import TaskQueueService
+from pokie.core import CliCommand
+
+
+class TaskCmd(CliCommand):
+    @property
+    def svc_task(self) -> TaskQueueService:
+        return self.get_di().get(DI_SERVICES).get(SVC_TASK_QUEUE)
+
+
+class TaskStatsCmd(TaskCmd):
+    description = "show task queue depth and latency"
+
+    labels = {
+        TASK_QUEUED: "queued",
+        TASK_RUNNING: "running",
+        TASK_DEAD: "dead",
+    }
+
+    def arguments(self, parser: ArgumentParser):
+        parser.add_argument(
+            "--json",
+            help="output JSON instead of tabular format",
+            action="store_true",
+            default=False,
+        )
+
+    def run(self, args) -> bool:
+        stats = self.svc_task.stats()
+        result = {}
+        for status, label in self.labels.items():
+            result[label] = stats.get(status, {"total": 0, "due": 0, "latency": None})
+
+        queued = result["queued"]
+        summary = {
+            "queued": queued["total"],
+            "due": queued["due"],
+            # age of the oldest task waiting to run
+            "latency": queued["latency"],
+            "running": result["running"]["total"],
+            "dead": result["dead"]["total"],
+        }
+        if args.json:
+            self.tty.write(json.dumps(summary, indent=2))
+            return True
+
+        latency = summary["latency"]
+        summary["latency"] = "{:.3f}s".format(latency) if latency is not None else "-"
+        self.tty.write(tabulate(summary.items(), headers=["Task queue", "Value"]))
+        return True
+
+
+class TaskDeadCmd(TaskCmd):
+    description = "list tasks in the dead-letter state"
+
+    def arguments(self, parser: ArgumentParser):
+        parser.add_argument(
+            "--limit",
+            help="max number of tasks to list (default: 100)",
+            type=int,
+            default=100,
+        )
+
+    def run(self, args) -> bool:
+        table = []
+        for record in self.svc_task.list_dead(args.limit):
+            table.append(
+                [
+                    record.id,
+                    self.tty.colorizer.white(record.task, attr="bold"),
+                    record.attempts,
+                    record.created,
+                    record.last_error,
+                ]
+            )
+        if len(table) == 0:
+            self.tty.write("No dead tasks found")
+            return True
+
+        self.tty.write(
+            tabulate(table, headers=["Id", "Task", "Attempts", "Created", "Last error"])
+        )
+        return True
+
+
+class TaskRetryCmd(TaskCmd):
+    description = "queue dead tasks again"
+
+    def arguments(self, parser: ArgumentParser):
+        parser.add_argument(
+            "id",
+            type=int,
+            help="task id(s) to retry; if omitted, all dead tasks are retried",
+            nargs="*",
+        )
+
+    def run(self, args) -> bool:
+        if len(args.id) == 0:
+            count = self.svc_task.retry_dead()
+        else:
+            count = 0
+            for id_task in args.id:
+                count += self.svc_task.retry_dead(id_task)
+        self.tty.write("{} task(s) queued".format(count))
+        return True
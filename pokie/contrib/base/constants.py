@@ -2,3 +2,34 @@
 SVC_VALIDATOR = "svc_validator"
 SVC_SETTINGS = "svc_settings"
 SVC_FIXTURE = "svc_fixture"
+SVC_TASK_QUEUE = "svc_task_queue"
+SVC_OUTBOX = "svc_outbox"
+
+# task queue configuration
+CFG_TASK_QUEUE_JOB = "task_queue_job"
+CFG_TASK_POLL_INTERVAL = "task_poll_interval"
+CFG_TASK_BATCH_SIZE = "task_batch_size"
+CFG_TASK_LEASE = "task_lease"
+CFG_TASK_MAX_ATTEMPTS = "task_max_attempts"
+CFG_TASK_RETRY_DELAY = "task_retry_delay"
+CFG_TASK_RETRY_MAX_DELAY = "task_retry_max_delay"
+
+# task queue metrics
+METRIC_TASK_LATENCY = "task_latency"
+METRIC_TASK_DURATION = "task_duration"
+METRIC_TASK_FAILED = "task_failed"
+METRIC_TASK_DEAD = "task_dead"
+
+# outbox configuration
+CFG_OUTBOX_RELAY_JOB = "outbox_relay_job"
+CFG_OUTBOX_POLL_INTERVAL = "outbox_poll_interval"
+CFG_OUTBOX_BATCH_SIZE = "outbox_batch_size"
+CFG_OUTBOX_MAX_ATTEMPTS = "outbox_max_attempts"
+CFG_OUTBOX_RETENTION = "outbox_retention"
+CFG_OUTBOX_RETRY_DELAY = "outbox_retry_delay"
+CFG_OUTBOX_RETRY_MAX_DELAY = "outbox_retry_max_delay"
+
+# outbox metrics
+METRIC_OUTBOX_PUBLISHED = "outbox_published"
+METRIC_OUTBOX_FAILED = "outbox_failed"
+METRIC_OUTBOX_LAG = "outbox_lag"
@@ -1 +1 @@
-from .records import SettingsRecord, FixtureRecord
+from .records import SettingsRecord, FixtureRecord, TaskRecord, OutboxRecord
@@ -14,3 +14,33 @@ class FixtureRecord:
     id = "id_fixture"
     applied = "applied"
     name = "name"
+
+
+@fieldmapper(tablename="_task_queue", pk="id_task")
+class TaskRecord:
+    id = "id_task"
+    task = "task"
+    payload = "payload"
+    priority = "priority"
+    status = "status"
+    attempts = "attempts"
+    max_attempts = "max_attempts"
+    created = "created"
+    run_at = "run_at"
+    started = "started"
+    locked_until = "locked_until"
+    last_error = "last_error"
+    next_attempt = "next_attempt"
+
+
+@fieldmapper(tablename="_outbox", pk="id_outbox")
+class OutboxRecord:
+    id = "id_outbox"
+    event = "event"
+    payload = "payload"
+    idempotency_key = "idempotency_key"
+    created = "created"
+    published = "published"
+    attempts = "attempts"
+    dead = "dead"
+    last_error = "last_error"
@@ -1 +1,3 @@
 from .idle import IdleJob
+from .task import TaskQueueJob
+from .outbox import OutboxRelayJob
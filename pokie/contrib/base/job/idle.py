@@ -1,9 +1,7 @@
-from time import sleep
-
 from rick.base import Di
 from rick.mixin import Injectable, Runnable
 
-from pokie.constants import DI_CONFIG
+from pokie.constants import DI_CONFIG, CFG_JOB_IDLE_INTERVAL
 
 
 class IdleJob(Injectable, Runnable):
@@ -12,7 +10,9 @@ class IdleJob(Injectable, Runnable):
     def __init__(self, di: Di):
         super().__init__(di)
         cfg = di.get(DI_CONFIG)
-        self.interval = int(cfg.get("job_idle_interval", self.DEFAULT_IDLE_INTERVAL))
+        self.interval = int(cfg.get(CFG_JOB_IDLE_INTERVAL, self.DEFAULT_IDLE_INTERVAL))
+        # scheduled as an interval job; the scheduler handles the wait between runs
+        self.schedule = self.interval
 
     def run(self, di: Di):
-        sleep(self.interval)
+        pass
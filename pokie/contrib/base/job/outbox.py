@@ -0,0 +1,53 @@
+from time import monotonic
+
+from rick.base import Di
+from rick.mixin import Injectable, Runnable
+
+from pokie.constants import DI_CONFIG, DI_SERVICES
+from pokie.contrib.base.constants import (
+    SVC_OUTBOX,
+    CFG_OUTBOX_POLL_INTERVAL,
+    CFG_OUTBOX_BATCH_SIZE,
+)
+
+
+class OutboxRelayJob(Injectable, Runnable):
+    """
+    Publishes outbox events
+
+    Pending events are dispatched in batches of OUTBOX_BATCH_SIZE; while full batches are published, further
+    batches are processed for at most MAX_RUN_TIME seconds before returning to the scheduler. The job runs on a
+    single node, to preserve event ordering; published events are pruned every PRUNE_INTERVAL seconds
+    """
+
+    DEFAULT_POLL_INTERVAL = 1
+    DEFAULT_BATCH_SIZE = 100
+    MAX_RUN_TIME = 30
+    PRUNE_INTERVAL = 300
+
+    singleton = True
+
+    def __init__(self, di: Di):
+        super().__init__(di)
+        cfg = di.get(DI_CONFIG)
+        self.batch_size = int(
+            cfg.get(CFG_OUTBOX_BATCH_SIZE, self.DEFAULT_BATCH_SIZE)
+        )
+        # scheduler interval
+        self.schedule = float(
+            cfg.get(CFG_OUTBOX_POLL_INTERVAL, self.DEFAULT_POLL_INTERVAL)
+        )
+        self._last_prune = None
+
+    def run(self, di: Di):
+        svc = di.get(DI_SERVICES).get(SVC_OUTBOX)
+        start = monotonic()
+        if self._last_prune is None or start - self._last_prune > self.PRUNE_INTERVAL:
+            self._last_prune = start
+            svc.prune()
+
+        while True:
+            if svc.relay(self.batch_size) < self.batch_size:
+                return
+            if monotonic() - start > self.MAX_RUN_TIME:
+                return
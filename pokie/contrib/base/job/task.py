@@ -0,0 +1,50 @@
+from time import monotonic
+
+from rick.base import Di
+from rick.mixin import Injectable, Runnable
+
+from pokie.constants import DI_CONFIG, DI_SERVICES
+from pokie.contrib.base.constants import (
+    SVC_TASK_QUEUE,
+    CFG_TASK_POLL_INTERVAL,
+    CFG_TASK_BATCH_SIZE,
+)
+from pokie.core.supervisor import JOB_REPLICATE
+
+
+class TaskQueueJob(Injectable, Runnable):
+    """
+    Executes queued tasks
+
+    Due tasks are claimed in batches of TASK_BATCH_SIZE with FOR UPDATE SKIP LOCKED, so any number of workers
+    (threads, processes or hosts) can consume the queue concurrently; while full batches are found, further
+    batches are claimed for at most MAX_RUN_TIME seconds before returning to the scheduler
+    """
+
+    DEFAULT_POLL_INTERVAL = 1
+    DEFAULT_BATCH_SIZE = 10
+    MAX_RUN_TIME = 30
+
+    # the queue is safe to consume from every worker process
+    policy = JOB_REPLICATE
+
+    def __init__(self, di: Di):
+        super().__init__(di)
+        cfg = di.get(DI_CONFIG)
+        self.batch_size = int(cfg.get(CFG_TASK_BATCH_SIZE, self.DEFAULT_BATCH_SIZE))
+        # scheduler interval
+        self.schedule = float(
+            cfg.get(CFG_TASK_POLL_INTERVAL, self.DEFAULT_POLL_INTERVAL)
+        )
+
+    def run(self, di: Di):
+        svc = di.get(DI_SERVICES).get(SVC_TASK_QUEUE)
+        start = monotonic()
+        while True:
+            batch = svc.claim(self.batch_size)
+            for record in batch:
+                svc.execute(record)
+            if len(batch) < self.batch_size:
+                return
+            if monotonic() - start > self.MAX_RUN_TIME:
+                return
@@ -1,4 +1,13 @@
-from pokie.contrib.base.constants import SVC_VALIDATOR, SVC_SETTINGS, SVC_FIXTURE
+from pokie.constants import DI_CONFIG
+from pokie.contrib.base.constants import (
+    CFG_TASK_QUEUE_JOB,
+    CFG_OUTBOX_RELAY_JOB,
+    SVC_VALIDATOR,
+    SVC_SETTINGS,
+    SVC_FIXTURE,
+    SVC_TASK_QUEUE,
+    SVC_OUTBOX,
+)
 from pokie.contrib.base.validators import init_validators
 from pokie.core import BaseModule
 
@@ -15,13 +24,26 @@ class Module(BaseModule):
         "runserver": "pokie.contrib.base.cli.RunServerCmd",
         "module:list": "pokie.contrib.base.cli.ModuleListCmd",
         "route:list": "pokie.contrib.base.cli.RouteListCmd",
+        "middleware:list": "pokie.contrib.base.cli.MiddlewareListCmd",
+        "startup:report": "pokie.contrib.base.cli.StartupReportCmd",
+        "cli:completion": "pokie.contrib.base.cli.CompletionCmd",
+        "cli:complete": "pokie.contrib.base.cli.CompleteCmd",
         # database-related commands
         "db:init": "pokie.contrib.base.cli.DbInitCmd",
         "db:check": "pokie.contrib.base.cli.DbCheckCmd",
         "db:update": "pokie.contrib.base.cli.DbUpdateCmd",
+        # cache commands
+        "cache:stats": "pokie.contrib.base.cli.CacheStatsCmd",
         # worker job commands
         "job:list": "pokie.contrib.base.cli.JobListCmd",
         "job:run": "pokie.contrib.base.cli.JobRunCmd",
+        "job:status": "pokie.contrib.base.cli.JobStatusCmd",
+        # task queue commands
+        "task:stats": "pokie.contrib.base.cli.TaskStatsCmd",
+        "task:dead": "pokie.contrib.base.cli.TaskDeadCmd",
+        "task:retry": "pokie.contrib.base.cli.TaskRetryCmd",
+        # outbox commands
+        "outbox:stats": "pokie.contrib.base.cli.OutboxStatsCmd",
         # code generation
         "codegen:dto": "pokie.contrib.base.cli.GenDtoCmd",
         "codegen:request": "pokie.contrib.base.cli.GenRequestRecordCmd",
@@ -41,13 +63,24 @@ class Module(BaseModule):
         SVC_SETTINGS: "pokie.contrib.base.service.SettingsService",
         # fixture service
         SVC_FIXTURE: "pokie.contrib.base.service.FixtureService",
+        # task queue service
+        SVC_TASK_QUEUE: "pokie.contrib.base.service.TaskQueueService",
+        # event outbox service
+        SVC_OUTBOX: "pokie.contrib.base.service.OutboxService",
     }
 
-    jobs = [
-        "pokie.contrib.base.job.IdleJob",
-    ]
-
     fixtures = []
 
+    @property
+    def jobs(self) -> list:
+        # database polling jobs are opt-in
+        cfg = self.get_di().get(DI_CONFIG)
+        jobs = ["pokie.contrib.base.job.IdleJob"]
+        if cfg.get(CFG_TASK_QUEUE_JOB, False):
+            jobs.append("pokie.contrib.base.job.TaskQueueJob")
+        if cfg.get(CFG_OUTBOX_RELAY_JOB, False):
+            jobs.append("pokie.contrib.base.job.OutboxRelayJob")
+        return jobs
+
     def build(self, parent=None):
         init_validators(self.get_di())
@@ -0,0 +1,152 @@
+from datetime import datetime
+from typing import List, Optional
+
+from rick_db import Repository
+
+from pokie.contrib.base.dto import OutboxRecord
+
+
+class OutboxRepository(Repository):
+    def __init__(self, db):
+        super().__init__(db, OutboxRecord)
+
+    def _fields(self) -> dict:
+        fields = {
+            name: self.dialect.field(field)
+            for name, field in OutboxRecord._fieldmap.items()
+        }
+        fields["table"] = self.dialect.table(self.table_name, None, self.schema)
+        return fields
+
+    def add(self, event: str, payload: str, key: Optional[str] = None) -> Optional[int]:
+        """
+        Add an event to the outbox
+        :param event: event name
+        :param payload: JSON-encoded payload
+        :param key: optional idempotency key; events with an existing key are ignored
+        :return: outbox id, or None if the key already exists
+        """
+        sql = self.query_cache.get("add")
+        if not sql:
+            sql = (
+                "INSERT INTO {table} ({event}, {payload}, {idempotency_key}) VALUES (%s, %s, %s) "
+                "ON CONFLICT ({idempotency_key}) DO NOTHING RETURNING {id}"
+            ).format(**self._fields())
+            self.query_cache.set("add", sql)
+        result = self.exec(sql, [event, payload, key], useCls=False)
+        if len(result) == 0:
+            return None
+        return result[0][0]
+
+    def fetch_pending(self, limit: int) -> List[OutboxRecord]:
+        """
+        Lock and fetch the oldest pending events
+        Must be called within a transaction; rows locked by another relay are skipped. Events waiting for a retry,
+        and all events after them, are not fetched, to keep ordering
+        :param limit:
+        :return:
+        """
+        sql = self.query_cache.get("fetch_pending")
+        if not sql:
+            sql = (
+                "SELECT * FROM {table} WHERE {published} IS NULL AND NOT {dead} "
+                "AND {id} < COALESCE(("
+                "SELECT MIN({id}) FROM {table} WHERE {published} IS NULL AND NOT {dead} "
+                "AND {next_attempt} IS NOT NULL AND {next_attempt} > NOW()"
+                "), 9223372036854775807) "
+                "ORDER BY {id} LIMIT %s FOR UPDATE SKIP LOCKED"
+            ).format(**self._fields())
+            self.query_cache.set("fetch_pending", sql)
+        return self.exec(sql, [limit])
+
+    def savepoint(self, name: str):
+        self.exec("SAVEPOINT {}".format(name), useCls=False)
+
+    def rollback_savepoint(self, name: str):
+        self.exec("ROLLBACK TO SAVEPOINT {}".format(name), useCls=False)
+
+    def release_savepoint(self, name: str):
+        self.exec("RELEASE SAVEPOINT {}".format(name), useCls=False)
+
+    def mark_published(self, ids: list):
+        if len(ids) == 0:
+            return
+        sql = self.query_cache.get("mark_published")
+        if not sql:
+            sql = "UPDATE {table} SET {published} = NOW() WHERE {id} = ANY(%s)".format(
+                **self._fields()
+            )
+            self.query_cache.set("mark_published", sql)
+        self.exec(sql, [ids], useCls=False)
+
+    def mark_failed(
+        self,
+        id_outbox: int,
+        error: str,
+        max_attempts: int,
+        retry_delay: float,
+        retry_max_delay: float,
+    ):
+        """
+        Record a failed delivery; after max_attempts the event is marked as dead
+        The event is retried after retry_delay * 2^(attempts - 1) seconds, up to retry_max_delay
+        :param id_outbox:
+        :param error:
+        :param max_attempts:
+        :param retry_delay: base retry delay, in seconds
+        :param retry_max_delay: max retry delay, in seconds
+        :return:
+        """
+        sql = self.query_cache.get("mark_failed")
+        if not sql:
+            sql = (
+                "UPDATE {table} SET {attempts} = {attempts} + 1, {last_error} = %s, "
+                "{dead} = ({attempts} + 1 >= %s), "
+                "{next_attempt} = NOW() + LEAST(%s, %s * POWER(2, {attempts})) * INTERVAL '1 second' "
+                "WHERE {id} = %s"
+            ).format(**self._fields())
+            self.query_cache.set("mark_failed", sql)
+        self.exec(
+            sql,
+            [error, max_attempts, retry_max_delay, retry_delay, id_outbox],
+            useCls=False,
+        )
+
+    def prune_batch(self, before: datetime, limit: int) -> int:
+        """
+        Remove up to limit events published before the given time
+        :param before:
+        :param limit:
+        :return: number of removed rows
+        """
+        sql = self.query_cache.get("prune_batch")
+        if not sql:
+            sql = (
+                "DELETE FROM {table} WHERE {id} IN ("
+                "SELECT {id} FROM {table} WHERE {published} < %s "
+                "ORDER BY {id} LIMIT %s FOR UPDATE SKIP LOCKED"
+                ") RETURNING {id}"
+            ).format(**self._fields())
+            self.query_cache.set("prune_batch", sql)
+        return len(self.exec(sql, [before, limit], useCls=False))
+
+    def stats(self) -> dict:
+        """
+        Outbox statistics
+        :return: dict with pending and dead counts, and the age in seconds of the oldest pending event
+        """
+        sql = self.query_cache.get("stats")
+        if not sql:
+            sql = (
+                "SELECT COUNT(*) FILTER (WHERE {published} IS NULL AND NOT {dead}) AS pending, "
+                "COUNT(*) FILTER (WHERE {dead}) AS dead, "
+                "EXTRACT(EPOCH FROM NOW() - MIN({created}) FILTER (WHERE {published} IS NULL AND NOT {dead})) AS lag "
+                "FROM {table}"
+            ).format(**self._fields())
+            self.query_cache.set("stats", sql)
+        row = self.exec(sql, useCls=False)[0]
+        return {
+            "pending": row["pending"],
+            "dead": row["dead"],
+            "lag": float(row["lag"]) if row["lag"] is not None else None,
+        }
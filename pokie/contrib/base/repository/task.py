@@ -0,0 +1,178 @@
+from datetime import datetime
+from typing import List, Optional
+
+from rick_db import Repository
+
+from pokie.contrib.base.dto import TaskRecord
+
+# task status
+TASK_QUEUED = "Q"
+TASK_RUNNING = "R"
+TASK_DEAD = "X"
+
+
+class TaskRepository(Repository):
+    def __init__(self, db):
+        super().__init__(db, TaskRecord)
+
+    def _sql(self, key: str, template: str) -> str:
+        # build and cache a raw query, replacing {table} and record field names
+        sql = self.query_cache.get(key)
+        if not sql:
+            fields = {
+                name: self.dialect.field(field)
+                for name, field in TaskRecord._fieldmap.items()
+            }
+            sql = template.format(
+                table=self.dialect.table(self.table_name, None, self.schema), **fields
+            )
+            self.query_cache.set(key, sql)
+        return sql
+
+    def claim(self, limit: int, lease: int) -> List[TaskRecord]:
+        """
+        Claim up to limit due tasks, highest priority first
+        Tasks still running after their lease expires are considered abandoned (eg. the worker died) and are
+        claimed again; rows locked by other workers are skipped, so concurrent workers never wait on each other
+        :param limit: max number of tasks
+        :param lease: seconds a claimed task is reserved to the caller
+        :return: list of claimed tasks
+        """
+        sql = self._sql(
+            "claim",
+            "UPDATE {table} SET {status} = '" + TASK_RUNNING + "', {attempts} = {attempts} + 1, "
+            "{started} = NOW(), {locked_until} = NOW() + %s * INTERVAL '1 second' "
+            "WHERE {id} IN ("
+            "SELECT {id} FROM {table} "
+            "WHERE ({status} = '" + TASK_QUEUED + "' AND {run_at} <= NOW()) "
+            "OR ({status} = '" + TASK_RUNNING + "' AND {locked_until} <= NOW()) "
+            "ORDER BY {priority} DESC, {run_at}, {id} LIMIT %s FOR UPDATE SKIP LOCKED"
+            ") RETURNING *",
+        )
+        result = self.exec(sql, [lease, limit])
+        result.sort(key=lambda r: (-r.priority, r.run_at, r.id))
+        return result
+
+    def renew(
+        self, id_task: int, locked_until: datetime, lease: int
+    ) -> Optional[datetime]:
+        """
+        Extend the lease of a claimed task
+        Claims are identified by their locked_until value; if the task was claimed again by another worker, the
+        lease is not renewed
+        :param id_task:
+        :param locked_until: locked_until value of the current claim
+        :param lease: seconds the task is reserved to the caller, from now
+        :return: new locked_until value, or None if the claim was lost
+        """
+        sql = self._sql(
+            "renew",
+            "UPDATE {table} SET {locked_until} = NOW() + %s * INTERVAL '1 second' "
+            "WHERE {id} = %s AND {status} = '" + TASK_RUNNING + "' AND {locked_until} = %s "
+            "RETURNING {locked_until}",
+        )
+        result = self.exec(sql, [lease, id_task, locked_until], useCls=False)
+        if len(result) == 0:
+            return None
+        return result[0][0]
+
+    def complete(self, id_task: int, locked_until: datetime) -> bool:
+        """
+        Remove a finished task
+        :param id_task:
+        :param locked_until: locked_until value of the current claim
+        :return: False if the claim was lost
+        """
+        sql = self._sql(
+            "complete",
+            "DELETE FROM {table} WHERE {id} = %s AND {locked_until} = %s RETURNING {id}",
+        )
+        return len(self.exec(sql, [id_task, locked_until], useCls=False)) > 0
+
+    def retry(
+        self, id_task: int, locked_until: datetime, delay: float, error: str
+    ) -> bool:
+        """
+        Queue a failed task again, to run after delay seconds
+        :param id_task:
+        :param locked_until: locked_until value of the current claim
+        :param delay:
+        :param error:
+        :return: False if the claim was lost
+        """
+        sql = self._sql(
+            "retry",
+            "UPDATE {table} SET {status} = '" + TASK_QUEUED + "', "
+            "{run_at} = NOW() + %s * INTERVAL '1 second', {locked_until} = NULL, {last_error} = %s "
+            "WHERE {id} = %s AND {locked_until} = %s RETURNING {id}",
+        )
+        result = self.exec(sql, [delay, error, id_task, locked_until], useCls=False)
+        return len(result) > 0
+
+    def bury(self, id_task: int, locked_until: datetime, error: str) -> bool:
+        """
+        Move a task to the dead-letter state
+        :param id_task:
+        :param locked_until: locked_until value of the current claim
+        :param error:
+        :return: False if the claim was lost
+        """
+        sql = self._sql(
+            "bury",
+            "UPDATE {table} SET {status} = '" + TASK_DEAD + "', {locked_until} = NULL, {last_error} = %s "
+            "WHERE {id} = %s AND {locked_until} = %s RETURNING {id}",
+        )
+        return len(self.exec(sql, [error, id_task, locked_until], useCls=False)) > 0
+
+    def requeue_dead(self, id_task: Optional[int] = None) -> int:
+        """
+        Queue dead tasks again, with a new set of attempts
+        :param id_task: optional task id; if None, all dead tasks are queued
+        :return: number of queued tasks
+        """
+        sql = (
+            "UPDATE {table} SET {status} = '" + TASK_QUEUED + "', {attempts} = 0, {run_at} = NOW() "
+            "WHERE {status} = '" + TASK_DEAD + "'"
+        )
+        values = []
+        key = "requeue_dead"
+        if id_task is not None:
+            sql += " AND {id} = %s"
+            values.append(id_task)
+            key = "requeue_dead_id"
+        sql = self._sql(key, sql + " RETURNING {id}")
+        return len(self.exec(sql, values, useCls=False))
+
+    def list_dead(self, limit: int = 100) -> List[TaskRecord]:
+        """
+        List dead tasks, most recent first
+        :param limit:
+        :return:
+        """
+        sql = self._sql(
+            "list_dead",
+            "SELECT * FROM {table} WHERE {status} = '" + TASK_DEAD + "' ORDER BY {id} DESC LIMIT %s",
+        )
+        return self.exec(sql, [limit])
+
+    def stats(self) -> dict:
+        """
+        Queue statistics per status
+        latency is the age in seconds of the oldest task that is due to run
+        :return: dict of status: {"total": int, "due": int, "latency": float}
+        """
+        sql = self._sql(
+            "stats",
+            "SELECT {status}, COUNT(*) AS total, COUNT(*) FILTER (WHERE {run_at} <= NOW()) AS due, "
+            "EXTRACT(EPOCH FROM NOW() - MIN({run_at}) FILTER (WHERE {run_at} <= NOW())) AS latency "
+            "FROM {table} GROUP BY {status}",
+        )
+        result = {}
+        for row in self.exec(sql, useCls=False):
+            latency = row["latency"]
+            result[row["status"]] = {
+                "total": row["total"],
+                "due": row["due"],
+                "latency": float(latency) if latency is not None else None,
+            }
+        return result
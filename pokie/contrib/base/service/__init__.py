@@ -1,3 +1,5 @@
 from .validator import ValidatorService
 from .settings import SettingsService
 from .fixture import FixtureService, FixtureError
+from .task import TaskQueueService, TaskError
+from .outbox import OutboxService
@@ -0,0 +1,191 @@
+import json
+import logging
+import traceback
+from contextlib import contextmanager
+from datetime import datetime, timezone, timedelta
+
+from rick.base import Di
+from rick.mixin import Injectable
+from rick_db import Connection
+
+from pokie.constants import DI_DB, DI_CONFIG, DI_EVENTS, DI_METRICS, DI_SERVICES
+from pokie.contrib.base.constants import (
+    CFG_OUTBOX_MAX_ATTEMPTS,
+    CFG_OUTBOX_RETENTION,
+    CFG_OUTBOX_RETRY_DELAY,
+    CFG_OUTBOX_RETRY_MAX_DELAY,
+    METRIC_OUTBOX_PUBLISHED,
+    METRIC_OUTBOX_FAILED,
+    METRIC_OUTBOX_LAG,
+    SVC_TASK_QUEUE,
+)
+from pokie.contrib.base.dto import OutboxRecord
+from pokie.contrib.base.repository.outbox import OutboxRepository
+from pokie.core.metrics import MetricsRegistry
+
+
+class OutboxService(Injectable):
+    """
+    Transactional outbox for events
+
+    Events are written to the outbox table using the same connection (and transaction) as the business change, so
+    they are only published if the transaction commits; OutboxRelayJob then dispatches them in order through the
+    event manager. Delivery is at-least-once: handlers receive an idempotency_key argument, and should use it to
+    discard duplicates. Handlers with deferred = "queue" are added to the durable task queue within the relay
+    transaction, so they are only queued if the event is published; deferred thread handlers are not durable, and
+    should not be used for outbox events
+    """
+
+    DEFAULT_MAX_ATTEMPTS = 10
+    DEFAULT_RETRY_DELAY = 5
+    DEFAULT_RETRY_MAX_DELAY = 3600
+    DEFAULT_RETENTION = 604800
+    PRUNE_BATCH = 1000
+    SAVEPOINT = "outbox_event"
+
+    def __init__(self, di: Di):
+        super().__init__(di)
+        cfg = di.get(DI_CONFIG)
+        self.db = di.get(DI_DB)
+        self.max_attempts = int(
+            cfg.get(CFG_OUTBOX_MAX_ATTEMPTS, self.DEFAULT_MAX_ATTEMPTS)
+        )
+        self.retry_delay = float(
+            cfg.get(CFG_OUTBOX_RETRY_DELAY, self.DEFAULT_RETRY_DELAY)
+        )
+        self.retry_max_delay = float(
+            cfg.get(CFG_OUTBOX_RETRY_MAX_DELAY, self.DEFAULT_RETRY_MAX_DELAY)
+        )
+        self.retention = int(cfg.get(CFG_OUTBOX_RETENTION, self.DEFAULT_RETENTION))
+        self.logger = logging.getLogger(__name__)
+
+        metrics = di.get(DI_METRICS) if di.has(DI_METRICS) else MetricsRegistry()
+        self.published = metrics.counter(METRIC_OUTBOX_PUBLISHED, "published events")
+        self.failed = metrics.counter(METRIC_OUTBOX_FAILED, "failed event deliveries")
+        self.lag = metrics.histogram(
+            METRIC_OUTBOX_LAG, "time between an event being stored and being published"
+        )
+
+    @contextmanager
+    def transaction(self) -> Connection:
+        """
+        ContextManager for a database transaction
+        Repositories built with the yielded connection, and publish() calls using it, share the transaction;
+        it is committed on exit, or rolled back if an exception is raised
+        :return: Connection
+        """
+        conn = self.db.getconn()
+        try:
+            conn.begin()
+            try:
+                yield conn
+            except BaseException:
+                conn.rollback()
+                raise
+            conn.commit()
+        finally:
+            self.db.putconn(conn)
+
+    def publish(
+        self, conn: Connection, event_name: str, payload: dict = None, key: str = None
+    ):
+        """
+        Store an event in the outbox
+        :param conn: connection holding the business transaction
+        :param event_name: event to dispatch
+        :param payload: JSON-serializable dict, passed to the handlers as keyword arguments
+        :param key: optional idempotency key; an event with an existing key is ignored
+        :return: outbox id, or None if an event with the same key exists
+        """
+        return OutboxRepository(conn).add(
+            event_name, json.dumps(payload if payload is not None else {}), key
+        )
+
+    def relay(self, limit: int) -> int:
+        """
+        Dispatch a batch of pending events, in order
+        The batch is locked until the transaction ends, so concurrent relays never publish the same event; if an
+        event fails, its queued tasks are rolled back and delivery stops at that event, to keep ordering; the event
+        is retried with exponential backoff
+        :param limit: max number of events to dispatch
+        :return: number of published events
+        """
+        di = self.get_di()
+        evt_mgr = di.get(DI_EVENTS)
+        with self.transaction() as conn:
+            repo = OutboxRepository(conn)
+            records = repo.fetch_pending(limit)
+            delivered = []
+            for record in records:
+                repo.savepoint(self.SAVEPOINT)
+                try:
+                    self.deliver(evt_mgr, record, conn)
+                except Exception as e:
+                    repo.rollback_savepoint(self.SAVEPOINT)
+                    self.fail(repo, record, e)
+                    break
+                repo.release_savepoint(self.SAVEPOINT)
+                delivered.append(record.id)
+
+            repo.mark_published(delivered)
+            return len(delivered)
+
+    def fail(self, repo: OutboxRepository, record: OutboxRecord, e: Exception):
+        self.failed.inc()
+        self.logger.exception(
+            "outbox event {} '{}' failed".format(record.id, record.event)
+        )
+        error = "".join(traceback.format_exception_only(type(e), e)).strip()
+        repo.mark_failed(
+            record.id, error, self.max_attempts, self.retry_delay, self.retry_max_delay
+        )
+        if record.attempts + 1 >= self.max_attempts:
+            self.logger.error(
+                "outbox event {} '{}' marked as dead".format(record.id, record.event)
+            )
+
+    def deliver(self, evt_mgr, record: OutboxRecord, conn: Connection):
+        """
+        Dispatch a single outbox event
+        Queued handlers are added to the task queue using conn; enqueue errors are raised, so the event is retried
+        :param evt_mgr: event manager
+        :param record:
+        :param conn: relay connection
+        :return:
+        """
+        task_queue = self.get_di().get(DI_SERVICES).get(SVC_TASK_QUEUE)
+
+        def enqueue(task_path: str, task_payload: dict):
+            task_queue.enqueue(task_path, task_payload, conn=conn)
+
+        kwargs = dict(record.payload) if record.payload is not None else {}
+        key = record.idempotency_key
+        if key is None:
+            key = "outbox:{}".format(record.id)
+        kwargs["idempotency_key"] = key
+        evt_mgr.dispatch_durable(self.get_di(), record.event, enqueue, kwargs)
+        self.published.inc()
+        if record.created is not None:
+            self.lag.observe(
+                max(
+                    0.0,
+                    (datetime.now(timezone.utc) - record.created).total_seconds(),
+                )
+            )
+
+    def prune(self) -> int:
+        """
+        Remove published events older than OUTBOX_RETENTION seconds
+        :return: number of removed events
+        """
+        before = datetime.now(timezone.utc) - timedelta(seconds=self.retention)
+        repo = OutboxRepository(self.db)
+        total = 0
+        while True:
+            count = repo.prune_batch(before, self.PRUNE_BATCH)
+            total += count
+            if count < self.PRUNE_BATCH:
+                return total
+
+    def stats(self) -> dict:
+        return OutboxRepository(self.db).stats()
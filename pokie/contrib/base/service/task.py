@@ -0,0 +1,232 @@
+import json
+import logging
+import traceback
+from datetime import datetime
+from time import monotonic
+from typing import List, Optional
+
+from rick.base import Di
+from rick.mixin import Injectable
+from rick.util.loader import load_class
+from rick_db import Connection
+
+from pokie.constants import DI_DB, DI_CONFIG, DI_METRICS
+from pokie.contrib.base.constants import (
+    CFG_TASK_LEASE,
+    CFG_TASK_MAX_ATTEMPTS,
+    CFG_TASK_RETRY_DELAY,
+    CFG_TASK_RETRY_MAX_DELAY,
+    METRIC_TASK_LATENCY,
+    METRIC_TASK_DURATION,
+    METRIC_TASK_FAILED,
+    METRIC_TASK_DEAD,
+)
+from pokie.contrib.base.dto import TaskRecord
+from pokie.contrib.base.repository.task import TaskRepository
+from pokie.core.metrics import MetricsRegistry
+
+
+class TaskError(Exception):
+    pass
+
+
+class TaskQueueService(Injectable):
+    """
+    Durable task queue, stored in the database
+
+    A task is a class extending Injectable with a run(payload: dict) method; tasks are enqueued by class path
+    and executed by TaskQueueJob workers. Delivery is at-least-once: a task that fails is retried with exponential
+    backoff, and moves to the dead-letter state after max_attempts; a task whose worker dies is claimed again
+    once its lease expires, so tasks should be idempotent. The lease of a claimed task is renewed when it starts,
+    and its outcome is only recorded if it was not claimed again meanwhile
+    """
+
+    DEFAULT_LEASE = 300
+    DEFAULT_MAX_ATTEMPTS = 5
+    DEFAULT_RETRY_DELAY = 5
+    DEFAULT_RETRY_MAX_DELAY = 3600
+
+    def __init__(self, di: Di):
+        super().__init__(di)
+        cfg = di.get(DI_CONFIG)
+        self.db = di.get(DI_DB)
+        self.lease = int(cfg.get(CFG_TASK_LEASE, self.DEFAULT_LEASE))
+        self.max_attempts = int(
+            cfg.get(CFG_TASK_MAX_ATTEMPTS, self.DEFAULT_MAX_ATTEMPTS)
+        )
+        self.retry_delay = float(
+            cfg.get(CFG_TASK_RETRY_DELAY, self.DEFAULT_RETRY_DELAY)
+        )
+        self.retry_max_delay = float(
+            cfg.get(CFG_TASK_RETRY_MAX_DELAY, self.DEFAULT_RETRY_MAX_DELAY)
+        )
+        self._classes = {}
+        self.logger = logging.getLogger(__name__)
+
+        metrics = di.get(DI_METRICS) if di.has(DI_METRICS) else MetricsRegistry()
+        self.latency = metrics.histogram(
+            METRIC_TASK_LATENCY, "time between a task being due and being started"
+        )
+        self.duration = metrics.histogram(METRIC_TASK_DURATION, "task run time")
+        self.failed = metrics.counter(METRIC_TASK_FAILED, "failed task runs")
+        self.dead = metrics.counter(METRIC_TASK_DEAD, "tasks moved to dead-letter")
+
+    def enqueue(
+        self,
+        task_path: str,
+        payload: dict = None,
+        run_at: datetime = None,
+        priority: int = 0,
+        max_attempts: int = None,
+        conn: Connection = None,
+    ) -> int:
+        """
+        Add a task to the queue
+        :param task_path: full path to the task class
+        :param payload: JSON-serializable dict passed to the task
+        :param run_at: optional timezone-aware datetime; if None, the task is due immediately
+        :param priority: among due tasks, higher priority tasks are run first
+        :param max_attempts: optional max number of attempts; if None, TASK_MAX_ATTEMPTS is used
+        :param conn: optional connection; if set, the task is added within its transaction
+        :return: task id
+        """
+        # fail early on typos, instead of on the worker
+        self.load_task(task_path)
+        record = TaskRecord(
+            task=task_path,
+            payload=json.dumps(payload if payload is not None else {}),
+            priority=priority,
+            max_attempts=max_attempts if max_attempts else self.max_attempts,
+        )
+        if run_at is not None:
+            record.run_at = run_at
+        repo = self.repo_task if conn is None else TaskRepository(conn)
+        return repo.insert_pk(record)
+
+    def load_task(self, task_path: str):
+        """
+        Resolve a task class
+        :param task_path:
+        :return: task class
+        """
+        cls = self._classes.get(task_path, None)
+        if cls is not None:
+            return cls
+
+        cls = load_class(task_path)
+        if cls is None:
+            raise TaskError(
+                "TaskQueueService: cannot locate task class '{}'".format(task_path)
+            )
+        if not issubclass(cls, Injectable) or not callable(
+            getattr(cls, "run", None)
+        ):
+            raise TaskError(
+                "TaskQueueService: class '{}' must implement Injectable mixin and run()".format(
+                    task_path
+                )
+            )
+        self._classes[task_path] = cls
+        return cls
+
+    def claim(self, limit: int) -> List[TaskRecord]:
+        """
+        Claim due tasks for execution
+        :param limit:
+        :return:
+        """
+        return self.repo_task.claim(limit, self.lease)
+
+    def execute(self, record: TaskRecord) -> bool:
+        """
+        Run a claimed task, and complete, retry or bury it
+        :param record:
+        :return: True if the task was successful
+        """
+        repo = self.repo_task
+        # tasks of a batch wait for the previous ones; renew the lease before starting
+        locked_until = repo.renew(record.id, record.locked_until, self.lease)
+        if locked_until is None:
+            self.lost(record)
+            return False
+        record.locked_until = locked_until
+
+        if record.attempts > record.max_attempts:
+            # lease expired on every attempt, most likely the task is killing or hanging the worker
+            self.bury(
+                record, "lease expired after {} attempts".format(record.max_attempts)
+            )
+            return False
+
+        if record.started is not None and record.run_at is not None:
+            self.latency.observe(
+                max(0.0, (record.started - record.run_at).total_seconds())
+            )
+
+        start = monotonic()
+        try:
+            task = self.load_task(record.task)(self.get_di())
+            task.run(record.payload if record.payload is not None else {})
+        except Exception as e:
+            self.duration.observe(monotonic() - start)
+            self.failed.inc()
+            self.logger.exception(
+                "task {} '{}' failed".format(record.id, record.task)
+            )
+            error = "".join(traceback.format_exception_only(type(e), e)).strip()
+            if record.attempts >= record.max_attempts:
+                self.bury(record, error)
+            elif not repo.retry(
+                record.id, record.locked_until, self.backoff(record.attempts), error
+            ):
+                self.lost(record)
+            return False
+
+        self.duration.observe(monotonic() - start)
+        if not repo.complete(record.id, record.locked_until):
+            self.lost(record)
+        return True
+
+    def bury(self, record: TaskRecord, error: str):
+        if not self.repo_task.bury(record.id, record.locked_until, error):
+            self.lost(record)
+            return
+        self.dead.inc()
+        self.logger.error(
+            "task {} '{}' moved to dead-letter".format(record.id, record.task)
+        )
+
+    def lost(self, record: TaskRecord):
+        self.logger.warning(
+            "task {} '{}' lease expired, and the task was claimed again".format(
+                record.id, record.task
+            )
+        )
+
+    def backoff(self, attempts: int) -> float:
+        """
+        Delay before retrying a task that failed the given number of times
+        :param attempts:
+        :return: seconds
+        """
+        return min(
+            self.retry_max_delay, self.retry_delay * 2 ** max(0, attempts - 1)
+        )
+
+    def retry_dead(self, id_task: Optional[int] = None) -> int:
+        """
+        Queue dead tasks again
+        :param id_task: optional task id; if None, all dead tasks are queued
+        :return: number of queued tasks
+        """
+        return self.repo_task.requeue_dead(id_task)
+
+    def list_dead(self, limit: int = 100) -> List[TaskRecord]:
+        return self.repo_task.list_dead(limit)
+
+    def stats(self) -> dict:
+        return self.repo_task.stats()
+
+    @property
+    def repo_task(self) -> TaskRepository:
+        return TaskRepository(self.db)
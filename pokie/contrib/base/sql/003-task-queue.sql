@@ -0,0 +1,18 @@
+CREATE TABLE _task_queue (
+    id_task BIGSERIAL NOT NULL PRIMARY KEY,
+    task TEXT NOT NULL,
+    payload JSONB DEFAULT '{}',
+    priority INT NOT NULL DEFAULT 0,
+    -- Q: queued, R: running, X: dead (failed max_attempts times)
+    status CHAR(1) NOT NULL DEFAULT 'Q',
+    attempts INT NOT NULL DEFAULT 0,
+    max_attempts INT NOT NULL DEFAULT 5,
+    created TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    run_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    started TIMESTAMP WITH TIME ZONE DEFAULT NULL,
+    locked_until TIMESTAMP WITH TIME ZONE DEFAULT NULL,
+    last_error TEXT DEFAULT NULL
+);
+
+CREATE INDEX _task_queue_idx01 ON _task_queue(priority DESC, run_at) WHERE status = 'Q';
+CREATE INDEX _task_queue_idx02 ON _task_queue(locked_until) WHERE status = 'R';
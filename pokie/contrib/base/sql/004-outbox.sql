@@ -0,0 +1,14 @@
+CREATE TABLE _outbox (
+    id_outbox BIGSERIAL NOT NULL PRIMARY KEY,
+    event TEXT NOT NULL,
+    payload JSONB DEFAULT '{}',
+    idempotency_key TEXT DEFAULT NULL UNIQUE,
+    created TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    published TIMESTAMP WITH TIME ZONE DEFAULT NULL,
+    attempts INT NOT NULL DEFAULT 0,
+    dead BOOL NOT NULL DEFAULT FALSE,
+    last_error TEXT DEFAULT NULL
+);
+
+CREATE INDEX _outbox_idx01 ON _outbox(id_outbox) WHERE published IS NULL AND NOT dead;
+CREATE INDEX _outbox_idx02 ON _outbox(published) WHERE published IS NOT NULL;
@@ -0,0 +1,4 @@
+-- earliest retry time of failed outbox events
+ALTER TABLE _outbox ADD COLUMN next_attempt TIMESTAMP WITH TIME ZONE DEFAULT NULL;
+
+CREATE INDEX _outbox_idx03 ON _outbox(id_outbox) WHERE published IS NULL AND NOT dead AND next_attempt IS NOT NULL;
@@ -3,6 +3,8 @@ from rick.mixin import Injectable, Runnable
 
 
 #class SampleJob(Injectable, Runnable):
+#    # run every 60 seconds; use None to run continuously, or a cron expression such as "*/5 * * * *"
+#    schedule = 60
 #
 #    def run(self, di: Di):
 #        # your job code goes here
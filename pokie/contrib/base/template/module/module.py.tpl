@@ -34,7 +34,9 @@ class Module(BaseModule):
     #
     # Pokie has a concept similar to signals in other framework., but with different capabilities, called Events. Events
     # are classes that extend from EventHandler, and implement a method with the name of the event. Event handler objects
-    # are short-lived - they are created upon dispatched of a given event, and de-referenced afterwards.
+    # are short-lived - they are created upon dispatched of a given event, and de-referenced afterwards; handlers that
+    # declare stateless = True are created once and reused. Handlers are resolved and validated when the application is
+    # built, so invalid handler paths fail at startup.
     #
     # Events have a priority number - handler execution follows the priority number in descending order (lower numbers get
     # executed first)
@@ -42,6 +44,12 @@ class Module(BaseModule):
     # Events also have optional in and out objects, typically used for dictionary composition. A common use case is to add
     # extra information to the response generated on a given information, such as login
     #
+    # Handlers may declare a 'deferred' attribute to run outside the dispatching thread: deferred = True runs the handler
+    # on a background thread pool (EVENT_WORKERS), in dispatch order per event name; deferred = "queue" runs it as a task
+    # on the durable task queue, and requires JSON-serializable arguments. Deferred handlers run after all synchronous
+    # handlers, and their errors are logged, but never reach the caller. Function handlers use the
+    # pokie.core.events.deferred() decorator instead.
+    #
     # Event names are unique strings that identify the event; there is no specific requirements for naming, but common
     # convention suggests the usage of snakecase (eg. some_event).
     #
@@ -71,6 +79,22 @@ class Module(BaseModule):
         # 'full.path.to.job.class'
     ]
 
+    # WSGI middleware map
+    #
+    # middlewares wrap the Flask WSGI application, eg. for compression, request ids or load shedding. Middlewares from
+    # all modules are assembled into a single chain when the application is built, ordered by priority; lower numbers
+    # are outer stages, and see requests first. Middleware classes extending PokieMiddleware receive the wrapped
+    # application and the Di object; other classes receive only the wrapped application, so generic WSGI middlewares
+    # (eg. werkzeug ProxyFix) can also be used. The time spent in each stage is recorded on the
+    # http_middleware:<name> metrics; see the middleware:list command for the assembled chain
+    #
+    # middlewares = {
+    #   numeric_priority: [path_to_middleware_class, ...]
+    # }
+    #
+    middlewares = {
+    }
+
     fixtures = [
     ]
 
@@ -99,3 +123,9 @@ class Module(BaseModule):
         # create an automatic endpoint in /catalog/brand for the table product_brand:
         # view = Auto.view(app, "product_brand")
         # AutoRouter.resource(app, "catalog/brand", view)
+
+    def warmup(self, parent=None):
+        # This method is called once per process, before serving requests, after services have been instantiated and
+        # database/redis pools have been opened; use it to prime caches or preload data, so the first requests are not
+        # delayed. See the startup:report command for warmup timings
+        pass
@@ -2,4 +2,6 @@ from .application import FlaskApplication
 from .module import BaseModule
 from .command import CliCommand
 from .signal_manager import SignalManager
-from .middleware import ModuleRunnerMiddleware
+from .middleware import ModuleRunnerMiddleware, PokieMiddleware
+from .metrics import MetricsRegistry
+from .buffer import WriteBehindBuffer
@@ -2,11 +2,11 @@ import os
 import sys
 import threading
 from argparse import ArgumentParser
+from inspect import isclass
 from typing import List
 
 from flask import Flask
 from rick.base import Di, Container, MapLoader
-from rick.event import EventManager
 from rick.mixin import Injectable, Runnable
 from rick.util.loader import load_class
 from rick.resource.console import ConsoleWriter
@@ -19,17 +19,88 @@ from pokie.constants import (
     DI_EVENTS,
     DI_TTY,
     DI_SIGNAL,
+    DI_METRICS,
+    DI_REDIS,
+    DI_DB,
     CFG_HTTP_ERROR_HANDLER,
+    CFG_HTTP_MIDDLEWARE_TIMING,
+    CFG_JOB_WORKERS,
+    CFG_JOB_IDLE_INTERVAL,
+    CFG_JOB_STATE_FILE,
+    CFG_JOB_LOCK_TTL,
+    CFG_JOB_STATE_REDIS,
+    CFG_EVENT_WORKERS,
+    CFG_EVENT_QUEUE_SIZE,
+    CFG_CLI_MANIFEST,
+    CFG_CLI_MANIFEST_FILE,
     DI_HTTP_ERROR_HANDLER,
 )
 import signal
 from .signal_manager import SignalManager
-from .middleware import ModuleRunnerMiddleware
+from .metrics import MetricsRegistry
+from .scheduler import JobScheduler
+from .lock import job_lock_factory
+from .events import PokieEventManager, DeferredDispatcher
+from .supervisor import WorkerSupervisor
+from .server import HttpSupervisor
+from .startup import (
+    StartupReport,
+    BOOT_FACTORIES,
+    BOOT_LOAD,
+    BOOT_BUILD,
+    BOOT_INIT,
+    WARMUP_STAGES,
+    WARMUP_SERVICES,
+    WARMUP_POOLS,
+    WARMUP_ROUTES,
+    WARMUP_MODULES,
+)
+from .manifest import CommandManifest, default_manifest_file
+from .middleware import (
+    ModuleRunnerMiddleware,
+    PokieMiddleware,
+    MiddlewareTimer,
+    MIDDLEWARE_BUCKETS,
+)
 from .module import BaseModule
 from .command import CliCommand
 from pokie.util.cli_args import ArgParser
 
 
+class _ReplacingDi:
+    """
+    Di proxy that replaces existing entries on register() and add()
+    """
+
+    def __init__(self, di: Di):
+        self._di = di
+
+    def register(self, name: str):
+        return self._di.override(name)
+
+    def add(self, name: str, item, replace=True):
+        self._di.add(name, item, True)
+
+    def __getattr__(self, name):
+        return getattr(self._di, name)
+
+
+class _ServiceLoader(MapLoader):
+    """
+    MapLoader that can retry services that failed to build
+    """
+
+    def get(self, name: str):
+        try:
+            return super().get(name)
+        except Exception:
+            # MapLoader keeps the name in the dependency stack, reporting further attempts as circular dependencies
+            with self._lock:
+                if name in self._stack:
+                    self._stack.remove(name)
+            raise
+
+
 class FlaskApplication:
     CLI_CMD_SUCCESS = 0
     CLI_CMD_FAILED = 1
@@ -46,13 +117,19 @@ class FlaskApplication:
         self.di = Di()
         self.app = None
         self.modules = {}  # app module list
+        self.factories = []  # factory callables
+        self.service_map = {}  # service map from all modules
+        self.startup = StartupReport()  # startup step durations
+        self.manifest = None  # CommandManifest, created on first use
+        self.middlewares = []  # list of (priority, middleware), from outer to inner stage
 
         self.di.add(DI_CONFIG, cfg)
         self.di.add(DI_APP, self)
         self.cfg = cfg
         self.lock = threading.Lock()
         self.tty = ConsoleWriter()
-        self.initialized = False
+        self.initialized = False  # True when modules are built
+        self.ready = False  # True when init() is complete
 
         self.pre_http_hooks = (
             []
@@ -76,6 +153,7 @@ class FlaskApplication:
         if not factories:
             factories = []
 
+        self.startup.start()
         self.app = Flask(type(self).__name__, static_folder=None)
 
         self.app.di = self.di
@@ -84,27 +162,39 @@ class FlaskApplication:
         # initialize signal manager
         self.di.add(DI_SIGNAL, SignalManager(self.di))
 
+        # initialize metrics registry
+        self.di.add(DI_METRICS, MetricsRegistry())
+
         # initialize TTY
         self.di.add(DI_TTY, self.tty)
 
         # run factories
+        self.factories = []
         for factory in factories:
-            if type(factory) is str:
-                # if factory is string, assume it is a path to a callable
-                factory = load_class(factory, raise_exception=True)
-            if not callable(factory):
-                raise RuntimeError("build(): non-callable or non-existing factory")
-            else:
-                factory(self.di)
+            name = factory if type(factory) is str else self._callable_name(factory)
+            with self.startup.measure(BOOT_FACTORIES, name):
+                if type(factory) is str:
+                    # if factory is string, assume it is a path to a callable
+                    factory = load_class(factory, raise_exception=True)
+                if not callable(factory):
+                    raise RuntimeError(
+                        "build(): non-callable or non-existing factory"
+                    )
+                else:
+                    factory(self.di)
+                    self.factories.append(factory)
 
         # load modules
         self.modules = {}
         module_list = [*self.system_modules, *module_list]
         for name in module_list:
-            cls = load_class(
-                "{}.{}.{}".format(name, self.module_file_name, self.module_class_name),
-                raise_exception=True,
-            )
+            with self.startup.measure(BOOT_LOAD, name):
+                cls = load_class(
+                    "{}.{}.{}".format(
+                        name, self.module_file_name, self.module_class_name
+                    ),
+                    raise_exception=True,
+                )
             if cls is None:
                 raise RuntimeError(
                     "build(): cannot load module '{}' - Module() class not found".format(
@@ -122,31 +212,44 @@ class FlaskApplication:
             self.modules[name] = cls(self.di)
 
         # build service map
-        svc_map = {}
-        for name, m in self.modules.items():
-            services = getattr(m, "services", {})
-            if type(services) is dict:
-                svc_map.update(services)
-            else:
-                raise RuntimeError(
-                    "build(): cannot load service map from module '{}'; attribute must be of type dict".format(
-                        name
+        with self.startup.measure(BOOT_BUILD, "services"):
+            svc_map = {}
+            for name, m in self.modules.items():
+                services = getattr(m, "services", {})
+                if type(services) is dict:
+                    svc_map.update(services)
+                else:
+                    raise RuntimeError(
+                        "build(): cannot load service map from module '{}'; attribute must be of type dict".format(
+                            name
+                        )
                     )
-                )
-        # register service mapper
-        self.di.add(DI_SERVICES, MapLoader(self.di, svc_map))
+            # register service mapper
+            self.service_map = svc_map
+            self.di.add(DI_SERVICES, _ServiceLoader(self.di, svc_map))
 
         # parse events from modules
-        evt_mgr = EventManager()
-        for _, module in self.modules.items():
-            module_events = getattr(module, "events", None)
-            if isinstance(module_events, dict):
-                for evt_name, evt_details in module_events.items():
-                    for priority, handlers in evt_details.items():
-                        for handler in handlers:
-                            evt_mgr.add_handler(evt_name, handler, int(priority))
-
-        self.di.add(DI_EVENTS, evt_mgr)
+        with self.startup.measure(BOOT_BUILD, "events"):
+            evt_mgr = PokieEventManager(
+                DeferredDispatcher(
+                    int(self.cfg.get(CFG_EVENT_WORKERS, 2)),
+                    int(self.cfg.get(CFG_EVENT_QUEUE_SIZE, 1000)),
+                    self.di.get(DI_METRICS),
+                )
+            )
+            for _, module in self.modules.items():
+                module_events = getattr(module, "events", None)
+                if isinstance(module_events, dict):
+                    for evt_name, evt_details in module_events.items():
+                        for priority, handlers in evt_details.items():
+                            for handler in handlers:
+                                evt_mgr.add_handler(
+                                    evt_name, handler, int(priority)
+                                )
+
+            # resolve and validate all handlers at build time
+            evt_mgr.compile(self.di)
+            self.di.add(DI_EVENTS, evt_mgr)
 
         # register exception handler
         if self.cfg.has(CFG_HTTP_ERROR_HANDLER):
@@ -161,9 +264,75 @@ class FlaskApplication:
             handler = handler(self.di)
             self.di.add(DI_HTTP_ERROR_HANDLER, handler)
 
+        # assemble module middlewares
+        with self.startup.measure(BOOT_BUILD, "middlewares"):
+            self.app.wsgi_app = self._build_middlewares(self.app.wsgi_app)
+
         self.app.wsgi_app = ModuleRunnerMiddleware(self.app.wsgi_app, self)
         return self.app
 
+    def _build_middlewares(self, wsgi_app):
+        """
+        Wrap the WSGI application with the middlewares declared by modules
+        Middlewares are sorted by priority; lower priorities are outer stages. If HTTP_MIDDLEWARE_TIMING is enabled,
+        the time spent in each stage, excluding inner stages, is recorded on the http_middleware:<name> histogram;
+        the Flask application is the innermost stage
+        :param wsgi_app: Flask WSGI application
+        :return: WSGI application
+        """
+        stages = {}
+        for name, module in self.modules.items():
+            middlewares = getattr(module, "middlewares", {})
+            if type(middlewares) is not dict:
+                raise RuntimeError(
+                    "build(): cannot load middlewares from module '{}'; attribute must be of type dict".format(
+                        name
+                    )
+                )
+            for priority, items in middlewares.items():
+                stages.setdefault(int(priority), []).extend(items)
+
+        self.middlewares = []
+        for priority in sorted(stages.keys()):
+            for item in stages[priority]:
+                self.middlewares.append((priority, item))
+        if len(self.middlewares) == 0:
+            return wsgi_app
+
+        timing = self.cfg.get(CFG_HTTP_MIDDLEWARE_TIMING, True)
+        metrics = self.di.get(DI_METRICS)
+        local = threading.local()
+
+        def timed(app, name):
+            if not timing:
+                return app
+            histogram = metrics.histogram(
+                "http_middleware:{}".format(name),
+                "time spent in {}".format(name),
+                buckets=MIDDLEWARE_BUCKETS,
+            )
+            return MiddlewareTimer(app, histogram, local)
+
+        wsgi_app = timed(wsgi_app, "flask")
+        for _, item in reversed(self.middlewares):
+            name = item if type(item) is str else self._callable_name(item)
+            with self.startup.measure(BOOT_BUILD, name):
+                cls = item
+                if type(item) is str:
+                    cls = load_class(item, raise_exception=True)
+                if not callable(cls):
+                    raise RuntimeError(
+                        "build(): non-callable or non-existing middleware '{}'".format(
+                            name
+                        )
+                    )
+                if isclass(cls) and issubclass(cls, PokieMiddleware):
+                    middleware = cls(wsgi_app, self.di)
+                else:
+                    middleware = cls(wsgi_app)
+            wsgi_app = timed(middleware, name)
+        return wsgi_app
+
     def register_pre_http_hook(self, f):
         """
         Register a hook to be executed during the init() of the webserver
@@ -191,26 +360,152 @@ class FlaskApplication:
         self.pre_cli_hooks.append(f)
 
     def init(self):
+        """
+        Initialize modules and run pre-http hooks
+        Runs once; if not called explicitly (eg. by runserver or warmup()), it is called on the first request. Once
+        initialized, the initialization middleware is removed from the WSGI entrypoint
+        :return:
+        """
+        if self.ready:
+            return
         with self.lock:
+            if self.ready:
+                return
             if not self.initialized:
                 # initialize modules
-                for _, module in self.modules.items():
-                    module.build(self)
+                for name, module in self.modules.items():
+                    with self.startup.measure(BOOT_INIT, name):
+                        module.build(self)
                 self.initialized = True
 
-                # call pre-http hooks
-                for fn in self.pre_http_hooks:
+            # call pre-http hooks
+            for fn in self.pre_http_hooks:
+                with self.startup.measure(BOOT_INIT, self._callable_name(fn)):
                     fn(self)
 
-            def stub(**kwargs):
-                pass
+            # requests no longer need the initialization check
+            if self.app is not None and isinstance(
+                self.app.wsgi_app, ModuleRunnerMiddleware
+            ):
+                self.app.wsgi_app = self.app.wsgi_app.app
+            self.ready = True
+
+    def warmup(self, stages: list = None) -> StartupReport:
+        """
+        Prepare the application to serve requests, so the first requests do not pay for lazy initialization
 
-            # instead of flag, we empty the method
-            setattr(self, "init", stub)
+        Warmup initializes the application if required, and runs the following stages, recording their duration:
+        pools (open database and redis connections), services (instantiate declared services), routes (compile the
+        url map and call warmup() on routed view classes) and modules (call module warmup() hooks).
+        Failed steps are logged and reported, but do not stop the application, as the affected resources are still
+        initialized lazily. Warmup should run once per process; in pre-fork mode, it runs in each worker after fork
+
+        :param stages: optional list of stages to run; defaults to all stages
+        :return: StartupReport
+        """
+        self.init()
+        if stages is None:
+            stages = WARMUP_STAGES
+        handlers = {
+            WARMUP_POOLS: self._warmup_pools,
+            WARMUP_SERVICES: self._warmup_services,
+            WARMUP_ROUTES: self._warmup_routes,
+            WARMUP_MODULES: self._warmup_modules,
+        }
+        for stage in stages:
+            if stage not in handlers.keys():
+                raise ValueError("warmup(): invalid stage '{}'".format(stage))
+            handlers[stage]()
+        return self.startup
+
+    def _warmup_step(self, stage: str, name: str, fn, *args):
+        with self.startup.measure(stage, name):
+            try:
+                fn(*args)
+            except Exception as e:
+                self.startup.error(stage, name, str(e))
+                self.app.logger.warning(
+                    "warmup(): %s '%s' failed: %s", stage, name, e
+                )
+
+    def _warmup_pools(self):
+        # the database pool opens its minimum number of connections when created
+        if self.di.has(DI_DB):
+            self._warmup_step(WARMUP_POOLS, DI_DB, self.di.get, DI_DB)
+        if self.di.has(DI_REDIS):
+            self._warmup_step(
+                WARMUP_POOLS, DI_REDIS, lambda: self.di.get(DI_REDIS).ping()
+            )
+
+    def _warmup_services(self):
+        mgr = self.di.get(DI_SERVICES)
+        for name in self.service_map.keys():
+            self._warmup_step(WARMUP_SERVICES, name, mgr.get, name)
+
+    def _warmup_routes(self):
+        self._warmup_step(WARMUP_ROUTES, "url_map", self.app.url_map.update)
+
+        views = set()
+        with self.app.app_context():
+            for view in self.app.view_functions.values():
+                view_class = getattr(view, "view_class", None)
+                if view_class is None or view_class in views:
+                    continue
+                views.add(view_class)
+                warmup = getattr(view_class, "warmup", None)
+                if callable(warmup):
+                    name = "{}.{}".format(view_class.__module__, view_class.__name__)
+                    self._warmup_step(WARMUP_ROUTES, name, warmup, self.di)
+
+    def _warmup_modules(self):
+        for name, module in self.modules.items():
+            self._warmup_step(WARMUP_MODULES, name, module.warmup, self)
 
     def http(self, **kwargs):
         self.app.run(**kwargs)
 
+    def serve(
+        self,
+        host: str,
+        port: int,
+        workers: int,
+        threads: int = 1,
+        reuse_port: bool = False,
+        silent: bool = False,
+    ) -> bool:
+        """
+        Run a pre-fork HTTP server
+        The application is initialized before workers are forked; each worker rebuilds factory resources and
+        runs warmup() before accepting connections
+        :param host: interface to bind to
+        :param port: port to bind to
+        :param workers: number of worker processes
+        :param threads: number of request threads per worker
+        :param reuse_port: if True, each worker binds its own socket with SO_REUSEPORT
+        :param silent:
+        :return:
+        """
+        self.init()
+        supervisor = HttpSupervisor(
+            self, host, port, workers, threads, reuse_port, silent
+        )
+        return supervisor.run()
+
+    def command_manifest(self) -> CommandManifest:
+        """
+        Get the CLI command manifest
+        If CLI_MANIFEST is disabled, the manifest is built on each run, and not cached
+        :return:
+        """
+        if self.manifest is None:
+            path = None
+            if self.cfg.get(CFG_CLI_MANIFEST, True):
+                path = self.cfg.get(CFG_CLI_MANIFEST_FILE, None)
+                if not path:
+                    path = default_manifest_file()
+            self.manifest = CommandManifest(self.di, self.modules, path)
+        return self.manifest
+
     def cli_runner(self, command: str, args: list = None, **kwargs) -> int:
         # run pre-cli hooks
         for fn in self.pre_cli_hooks:
@@ -298,11 +593,21 @@ class FlaskApplication:
                 result[module_name] = jobs
         return result
 
-    def job_runner(self, single_run=False, silent=False):
+    def job_runner(self, single_run=False, silent=False, jobs=None, workers=1):
+        """
+        Run module jobs
+        :param single_run: if True, run each job once, sequentially
+        :param silent: if True, do not write to the console and return False on invalid jobs
+        :param jobs: optional list of job names to run; names may be full class paths or class names
+        :param workers: number of worker processes; if > 1, jobs are distributed by a process supervisor
+        :return:
+        """
         # prepare job list
         job_list = []
-        for module_name, jobs in self.get_jobs().items():
-            for job_name in jobs:
+        for module_name, job_names in self.get_jobs().items():
+            for job_name in job_names:
+                if jobs and not self._match_job(job_name, jobs):
+                    continue
                 if not silent:
                     self.tty.write("Preparing job  '{}'...".format(job_name))
                 job = load_class(job_name)
@@ -324,29 +629,104 @@ class FlaskApplication:
                         )
                     else:
                         return False
-                job_list.append(job(self.di))
+                job_list.append((job_name, job))
 
         # run job list
         job_list.reverse()
 
+        if not single_run and workers > 1:
+            # multi-process mode; jobs are instantiated in each worker, after fork
+            supervisor = WorkerSupervisor(self, job_list, workers, silent)
+            return supervisor.run()
+
+        job_list = [(name, job(self.di)) for name, job in job_list]
         if single_run:
             # single run, runs all jobs once
-            for job in job_list:
+            for _, job in job_list:
                 job.run(self.di)
         else:
-            # continuous run, run jobs in loop
-            # abort method
-            def abort_jobs(di, signal_no, stack_trace):
-                if not silent:
-                    di.get(DI_TTY).write("\nCtrl+C pressed, exiting...")
-                exit(0)
+            # continuous run, jobs are run concurrently according to their schedule
+            self.run_scheduler(job_list, silent)
+        return True
 
+    def run_scheduler(self, job_list: list, silent=False, state_file: str = None):
+        """
+        Run a job scheduler until interrupted
+        :param job_list: list of (name, job object)
+        :param silent:
+        :param state_file: optional state file; defaults to the JOB_STATE_FILE setting
+        :return:
+        """
+        if state_file is None:
+            state_file = self.cfg.get(CFG_JOB_STATE_FILE, None)
+        # locks are renewed well within the lease time
+        lock_renew = min(5.0, float(self.cfg.get(CFG_JOB_LOCK_TTL, 30)) / 3)
+        redis = None
+        if self.cfg.get(CFG_JOB_STATE_REDIS, False):
+            redis = self.di.get(DI_REDIS)
+        scheduler = JobScheduler(
+            self.di,
+            job_list,
+            int(self.cfg.get(CFG_JOB_WORKERS, 4)),
+            state_file,
+            self.di.get(DI_METRICS),
+            job_lock_factory(self.di),
+            lock_renew,
+            redis,
+            float(self.cfg.get(CFG_JOB_IDLE_INTERVAL, 15)),
+        )
+
+        # abort method
+        def abort_jobs(di, signal_no, stack_trace):
+            if scheduler.stopping:
+                # second signal, exit without waiting
+                exit(0)
             if not silent:
-                self.tty.write("\nRunning jobs, press CTRL+C to abort...")
-
-            # register clean shutdown
-            self.di.get(DI_SIGNAL).add_handler(signal.SIGINT, abort_jobs)
+                di.get(DI_TTY).write(
+                    "\nSignal received, waiting for running jobs to finish..."
+                )
+            scheduler.stop()
+
+        if not silent:
+            self.tty.write("\nRunning jobs, press CTRL+C to abort...")
+
+        # register clean shutdown
+        signal_manager = self.di.get(DI_SIGNAL)
+        signal_manager.add_handler(signal.SIGINT, abort_jobs)
+        signal_manager.add_handler(signal.SIGTERM, abort_jobs)
+        try:
+            scheduler.run()
+        finally:
+            # flush write-behind buffers and other shutdown handlers once jobs are drained
+            signal_manager.shutdown()
+
+    def rebuild_factories(self):
+        """
+        Re-run factories, replacing the resources they provide (eg. database and redis pools)
 
-            while True:
-                for job in job_list:
-                    job.run(self.di)
+        Used after fork(), so child processes do not share connections with the parent; resources are registered
+        again as lazy factories, and existing objects are discarded without being closed, as closing them would
+        also close the parent connections
+        :return:
+        """
+        di = _ReplacingDi(self.di)
+        for factory in self.factories:
+            factory(di)
+        # services may hold references to the previous resources
+        self.di.add(
+            DI_SERVICES, _ServiceLoader(self.di, self.service_map), replace=True
+        )
+
+    @staticmethod
+    def _callable_name(fn) -> str:
+        return "{}.{}".format(
+            getattr(fn, "__module__", ""),
+            getattr(fn, "__qualname__", type(fn).__name__),
+        )
+
+    @staticmethod
+    def _match_job(job_name: str, names: list) -> bool:
+        for name in names:
+            if job_name == name or job_name.endswith("." + name):
+                return True
+        return False
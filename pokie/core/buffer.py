@@ -0,0 +1,124 @@
+import os
+import threading
+from time import monotonic
+from typing import Callable, Optional
+
+
+class WriteBehindBuffer:
+    """
+    In-process write-behind buffer
+
+    Pending writes are kept in a dict, so repeated writes to the same key are coalesced and only the last value is
+    flushed. A background timer checks the buffer every interval seconds and flushes it once the oldest pending
+    write is max_staleness seconds old, so writes are batched and persisted within max_staleness + interval seconds.
+    Writes still buffered when the process dies abruptly are lost, so this is only meant for values that are not
+    critical, such as activity timestamps
+    """
+
+    def __init__(
+        self,
+        flush_fn: Callable[[dict], None],
+        interval: float = 5,
+        max_staleness: float = 30,
+        max_size: int = 1000,
+        on_error: Optional[Callable[[Exception], None]] = None,
+    ):
+        """
+        :param flush_fn: callable that receives a dict of key: value to persist
+        :param interval: timer check interval, in seconds
+        :param max_staleness: age of the oldest pending write that triggers a flush, in seconds
+        :param max_size: flush as soon as the buffer holds this many keys
+        :param on_error: optional callable to handle flush exceptions
+        """
+        self.flush_fn = flush_fn
+        self.interval = interval
+        self.max_staleness = max_staleness
+        self.max_size = max_size
+        self.on_error = on_error
+        self._pending = {}
+        self._oldest = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._timer = None
+        self._pid = os.getpid()
+
+    def add(self, key, value):
+        """
+        Buffer a write
+        :param key:
+        :param value:
+        :return:
+        """
+        with self._lock:
+            self._check_pid()
+            if not self._pending:
+                self._oldest = monotonic()
+            self._pending[key] = value
+            full = len(self._pending) >= self.max_size
+            self._start_timer()
+
+        if full:
+            self.flush()
+
+    def get(self, key, default=None):
+        """
+        Pending value for key, if any
+        :param key:
+        :param default:
+        :return:
+        """
+        return self._pending.get(key, default)
+
+    def flush(self) -> int:
+        """
+        Persist all pending writes
+        :return: number of flushed keys
+        """
+        with self._flush_lock:
+            with self._lock:
+                self._check_pid()
+                pending = self._pending
+                self._pending = {}
+                self._oldest = None
+
+            if not pending:
+                return 0
+            try:
+                self.flush_fn(pending)
+            except Exception as e:
+                if self.on_error is None:
+                    raise
+                self.on_error(e)
+            return len(pending)
+
+    def __len__(self):
+        return len(self._pending)
+
+    def _tick(self):
+        with self._lock:
+            self._timer = None
+            due = (
+                self._oldest is not None
+                and monotonic() - self._oldest >= self.max_staleness
+            )
+        if due:
+            self.flush()
+        with self._lock:
+            if self._pending:
+                self._start_timer()
+
+    def _start_timer(self):
+        # caller must hold the lock
+        if self._timer is None:
+            self._timer = threading.Timer(self.interval, self._tick)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _check_pid(self):
+        # caller must hold the lock; after fork(), pending writes belong to the parent and timers are gone
+        pid = os.getpid()
+        if pid != self._pid:
+            self._pid = pid
+            self._pending = {}
+            self._oldest = None
+            self._timer = None
@@ -0,0 +1,456 @@
+import importlib
+import logging
+import os
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from inspect import isclass
+from time import monotonic
+
+from rick.base import Di
+from rick.event import EventManager, EventHandler
+from rick.mixin import Injectable
+
+from pokie.constants import DI_SERVICES
+from pokie.core.metrics import MetricsRegistry
+
+# deferred delivery modes, declared by handlers in the 'deferred' attribute
+DEFERRED_THREAD = "thread"  # run on the event thread pool, in dispatch order per event name
+DEFERRED_QUEUE = "queue"  # enqueue on the durable task queue
+
+# task used to deliver DEFERRED_QUEUE handlers
+EVENT_TASK = "pokie.core.events.EventHandlerTask"
+
+
+def deferred(mode: str = DEFERRED_THREAD):
+    """
+    Decorator to declare a function event handler as deferred
+    Event handler classes declare the 'deferred' class attribute instead
+    :param mode: DEFERRED_THREAD or DEFERRED_QUEUE
+    :return:
+    """
+
+    def decorator(fn):
+        fn.deferred = mode
+        return fn
+
+    return decorator
+
+
+def deferred_mode(target) -> str:
+    """
+    Delivery mode of an event handler class or function
+    :param target:
+    :return: DEFERRED_THREAD, DEFERRED_QUEUE or None for synchronous handlers
+    """
+    mode = getattr(target, "deferred", False)
+    if mode is True:
+        return DEFERRED_THREAD
+    if not mode:
+        return None
+    if mode not in (DEFERRED_THREAD, DEFERRED_QUEUE):
+        raise RuntimeError("invalid deferred mode '{}' in '{}'".format(mode, target))
+    return mode
+
+
+def resolve_handler(handler: str):
+    """
+    Locate an event handler class or function
+    :param handler: full path to class or function
+    :return:
+    """
+    module_path, cls_name = handler.rsplit(".", 1)
+    try:
+        module = importlib.import_module(module_path)
+    except ModuleNotFoundError:
+        raise RuntimeError(
+            "dispatch(): mapped module '%s' not found when discovering path '%s'"
+            % (module_path, handler)
+        )
+    cls = getattr(module, cls_name, None)
+    if cls is None:
+        raise RuntimeError(
+            "dispatch(): cannot find class or function '%s' in module '%s'"
+            % (cls_name, module_path)
+        )
+    return cls
+
+
+def call_handler(di: Di, target, handler: str, event_name: str, kwargs: dict):
+    """
+    Invoke a resolved event handler
+    :param di:
+    :param target: handler class or function
+    :param handler: handler path, for error messages
+    :param event_name:
+    :param kwargs:
+    :return:
+    """
+    if isclass(target) and issubclass(target, EventHandler):
+        obj_handler = getattr(target(di), event_name, None)
+        if obj_handler is None:
+            raise RuntimeError(
+                "dispatch(): event handler for '%s' not found in '%s'"
+                % (event_name, handler)
+            )
+        obj_handler(**kwargs)
+
+    elif callable(target) and not isclass(target):
+        target(event_name=event_name, **kwargs)
+
+    else:
+        raise RuntimeError(
+            "dispatch(): handler '%s' for event '%s' invalid or incompatible"
+            % (handler, event_name)
+        )
+
+
+class DeferredDispatcher:
+    """
+    Runs deferred event handlers on a bounded thread pool
+
+    Each event name has its own FIFO queue, drained by at most one pool thread at a time, so deferred handlers
+    for the same event run in dispatch order, while different events run concurrently; when queue_size handler
+    runs are pending, new ones are dropped (and counted), instead of growing memory without bound
+    """
+
+    def __init__(self, workers: int = 2, queue_size: int = 1000, metrics=None):
+        self.workers = max(1, workers)
+        self.queue_size = queue_size
+        self.logger = logging.getLogger(__name__)
+        self._queues = {}  # event name: deque of (queued, handler, callable)
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+
+        if metrics is None:
+            metrics = MetricsRegistry()
+        self.queue_depth = metrics.gauge(
+            "event_deferred_queue", "pending deferred handler runs"
+        )
+        self.latency = metrics.histogram(
+            "event_deferred_latency", "time between dispatch and deferred handler start"
+        )
+        self.duration = metrics.histogram(
+            "event_deferred_duration", "deferred handler run time"
+        )
+        self.failed = metrics.counter(
+            "event_deferred_failed", "failed deferred handler runs"
+        )
+        self.dropped = metrics.counter(
+            "event_deferred_dropped", "deferred handler runs dropped with a full queue"
+        )
+
+    def submit(self, event_name: str, handler: str, fn) -> bool:
+        """
+        Queue a handler run
+        :param event_name:
+        :param handler: handler path, for logging
+        :param fn: callable without arguments
+        :return: False if the queue is full
+        """
+        with self._lock:
+            self._check_fork()
+            if self._pending >= self.queue_size:
+                self.dropped.inc()
+                self.logger.error(
+                    "deferred event queue full, dropping '%s' for event '%s'",
+                    handler,
+                    event_name,
+                )
+                return False
+            self._pending += 1
+            self.queue_depth.set(self._pending)
+            queue = self._queues.get(event_name, None)
+            start = queue is None
+            if start:
+                queue = self._queues[event_name] = deque()
+            queue.append((monotonic(), handler, fn))
+            if start:
+                self._get_executor().submit(self._drain, event_name)
+        return True
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def shutdown(self, wait: bool = True):
+        """
+        Stop the thread pool
+        :param wait: if True, wait for pending handlers to run
+        :return:
+        """
+        with self._lock:
+            executor = self._executor
+            self._executor = None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+    def _drain(self, event_name: str):
+        while True:
+            with self._lock:
+                queue = self._queues.get(event_name, None)
+                if not queue:
+                    self._queues.pop(event_name, None)
+                    return
+                queued, handler, fn = queue.popleft()
+
+            start = monotonic()
+            self.latency.observe(start - queued)
+            try:
+                fn()
+            except Exception:
+                # deferred handlers never affect the dispatcher or other handlers
+                self.failed.inc()
+                self.logger.exception(
+                    "deferred handler '%s' for event '%s' failed", handler, event_name
+                )
+            self.duration.observe(monotonic() - start)
+
+            with self._lock:
+                self._pending -= 1
+                self.queue_depth.set(self._pending)
+
+    def _check_fork(self):
+        # caller must hold the lock; pool threads and pending runs do not survive fork()
+        pid = os.getpid()
+        if self._pid != pid:
+            self._executor = None
+            self._queues = {}
+            self._pending = 0
+            self._pid = pid
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        # caller must hold the lock
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="event"
+            )
+        return self._executor
+
+
+# compiled handler kinds
+_HANDLER_OBJECT = 0  # bound method of a stateless handler singleton
+_HANDLER_CLASS = 1  # handler class, instantiated on each dispatch
+_HANDLER_FUNCTION = 2  # handler function
+
+
+class PokieEventManager(EventManager):
+    """
+    EventManager with a precompiled dispatch table and deferred handlers
+
+    compile() resolves and validates every handler once, and builds a per-event tuple of handlers sorted by
+    priority; handler classes declaring stateless = True are instantiated once and reused. Dispatching then runs
+    without imports or locks; the table is rebuilt on the next dispatch if handlers are changed.
+
+    Synchronous handlers run on the dispatching thread, in priority order, and may compose the objects passed
+    as arguments, as with EventManager. Handlers declaring a 'deferred' attribute (see deferred()) run after all
+    synchronous handlers finish, either on the DeferredDispatcher thread pool (DEFERRED_THREAD), or as tasks on the
+    durable task queue (DEFERRED_QUEUE); errors in deferred handlers are logged and counted, and never reach the
+    caller. Queued handlers receive their arguments as JSON, so these must be serializable
+    """
+
+    def __init__(self, dispatcher: DeferredDispatcher = None):
+        super().__init__()
+        if dispatcher is None:
+            dispatcher = DeferredDispatcher()
+        self.dispatcher = dispatcher
+        self.logger = logging.getLogger(__name__)
+        self._table = None
+        # dispatch stack, for circular dependency detection, is per thread
+        self._local = threading.local()
+
+    def compile(self, di: Di):
+        """
+        Resolve and validate all handlers, and build the dispatch table
+        :param di: Di instance used to build stateless handler singletons
+        :return:
+        """
+        table = {}
+        with self._handler_lock:
+            for event_name, evt in self._handlers.items():
+                priorities = [p for p in evt.keys() if p != "handlers"]
+                handlers = []
+                deferred_handlers = []
+                for p in sorted(priorities):
+                    for handler in evt[p]:
+                        target = resolve_handler(handler)
+                        kind, fn = self._compile_handler(
+                            di, handler, target, event_name
+                        )
+                        mode = deferred_mode(target)
+                        if mode is None:
+                            handlers.append((kind, fn))
+                        else:
+                            deferred_handlers.append((handler, mode, kind, fn))
+                table[event_name] = (tuple(handlers), tuple(deferred_handlers))
+            self._table = table
+
+    def add_handler(self, event_name: str, handler: str, priority: int = 100):
+        super().add_handler(event_name, handler, priority)
+        self._table = None
+
+    def remove_handler(self, event_name: str, handler: str) -> bool:
+        result = super().remove_handler(event_name, handler)
+        self._table = None
+        return result
+
+    def purge(self):
+        super().purge()
+        self._table = None
+
+    def wakeup(self, src):
+        super().wakeup(src)
+        self._table = None
+
+    def dispatch(self, di: Di, event_name: str, **kwargs):
+        """
+        Dispatches an Event by name
+        Returns True if dispatched, False if not
+        :param di: Di instance
+        :param event_name: event name to dispatch
+        :param kwargs:
+        :return: bool
+        """
+        return self._dispatch(di, event_name, kwargs, None)
+
+    def dispatch_durable(self, di: Di, event_name: str, enqueue, kwargs: dict):
+        """
+        Dispatches an Event by name, adding queued handlers with a custom enqueue function
+
+        Unlike dispatch(), errors adding DEFERRED_QUEUE handlers to the task queue propagate to the caller, so the
+        event can be retried; enqueue may write to the caller transaction
+        :param di: Di instance
+        :param event_name: event name to dispatch
+        :param enqueue: callable(task_path, payload), eg. TaskQueueService.enqueue
+        :param kwargs: handler arguments
+        :return: bool
+        """
+        return self._dispatch(di, event_name, kwargs, enqueue)
+
+    def _dispatch(self, di: Di, event_name: str, kwargs: dict, enqueue):
+        table = self._table
+        if table is None:
+            self.compile(di)
+            table = self._table
+
+        entry = table.get(event_name, None)
+        if entry is None:
+            return False
+
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        if event_name in stack:
+            raise RuntimeError(
+                "dispatch(): circular event dependency when performing '{}'".format(
+                    event_name
+                )
+            )
+
+        handlers, deferred_handlers = entry
+        stack.append(event_name)
+        try:
+            for kind, fn in handlers:
+                if kind == _HANDLER_OBJECT:
+                    fn(**kwargs)
+                elif kind == _HANDLER_CLASS:
+                    getattr(fn(di), event_name)(**kwargs)
+                else:
+                    fn(event_name=event_name, **kwargs)
+        finally:
+            stack.pop()
+
+        for handler, mode, kind, fn in deferred_handlers:
+            self.defer(di, handler, mode, kind, fn, event_name, dict(kwargs), enqueue)
+        return True
+
+    def defer(
+        self,
+        di: Di,
+        handler: str,
+        mode: str,
+        kind: int,
+        fn,
+        event_name: str,
+        kwargs,
+        enqueue=None,
+    ):
+        """
+        Schedule a deferred handler run
+        :param di:
+        :param handler: handler path
+        :param mode: DEFERRED_THREAD or DEFERRED_QUEUE
+        :param kind: compiled handler kind
+        :param fn: compiled handler
+        :param event_name:
+        :param kwargs:
+        :param enqueue: optional callable(task_path, payload) for queued handlers; if set, errors propagate
+        :return:
+        """
+        if mode == DEFERRED_THREAD:
+
+            def run():
+                if kind == _HANDLER_OBJECT:
+                    fn(**kwargs)
+                elif kind == _HANDLER_CLASS:
+                    getattr(fn(di), event_name)(**kwargs)
+                else:
+                    fn(event_name=event_name, **kwargs)
+
+            self.dispatcher.submit(event_name, handler, run)
+            return
+
+        payload = {"event": event_name, "handler": handler, "kwargs": kwargs}
+        if enqueue is not None:
+            enqueue(EVENT_TASK, payload)
+            return
+
+        # imported here, as the task queue lives in the base module
+        from pokie.contrib.base.constants import SVC_TASK_QUEUE
+
+        try:
+            di.get(DI_SERVICES).get(SVC_TASK_QUEUE).enqueue(EVENT_TASK, payload)
+        except Exception:
+            self.dispatcher.failed.inc()
+            self.logger.exception(
+                "cannot enqueue handler '%s' for event '%s'", handler, event_name
+            )
+
+    @staticmethod
+    def _compile_handler(di: Di, handler: str, target, event_name: str):
+        if isclass(target) and issubclass(target, EventHandler):
+            if not callable(getattr(target, event_name, None)):
+                raise RuntimeError(
+                    "dispatch(): event handler for '%s' not found in '%s'"
+                    % (event_name, handler)
+                )
+            if getattr(target, "stateless", False):
+                return _HANDLER_OBJECT, getattr(target(di), event_name)
+            return _HANDLER_CLASS, target
+
+        if callable(target) and not isclass(target):
+            return _HANDLER_FUNCTION, target
+
+        raise RuntimeError(
+            "dispatch(): handler '%s' for event '%s' invalid or incompatible"
+            % (handler, event_name)
+        )
+
+
+class EventHandlerTask(Injectable):
+    """
+    Task queue entry point for DEFERRED_QUEUE event handlers
+    Failures propagate, so the task queue retries the handler
+    """
+
+    def run(self, payload: dict):
+        handler = payload["handler"]
+        call_handler(
+            self.get_di(),
+            resolve_handler(handler),
+            handler,
+            payload["event"],
+            payload.get("kwargs", {}),
+        )
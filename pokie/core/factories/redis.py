@@ -1,16 +1,91 @@
+from time import perf_counter
+
 from rick.base import Di
 import redis
 
+from pokie.config import PokieConfig
 from pokie.constants import (
     CFG_REDIS_HOST,
     DI_CONFIG,
     CFG_REDIS_PORT,
     DI_REDIS,
+    DI_METRICS,
     CFG_REDIS_PASSWORD,
     CFG_REDIS_DB,
     CFG_REDIS_SSL,
+    CFG_REDIS_MAX_CONNECTIONS,
+    CFG_REDIS_POOL_TIMEOUT,
+    CFG_REDIS_SOCKET_TIMEOUT,
+    CFG_REDIS_CONNECT_TIMEOUT,
+    CFG_REDIS_HEALTH_CHECK_INTERVAL,
+    CFG_REDIS_KEEPALIVE,
 )
 
+METRIC_REDIS_POOL_WAIT = "redis_pool_wait"
+METRIC_REDIS_POOL_EXHAUSTED = "redis_pool_exhausted"
+
+
+def parse_bool(value) -> bool:
+    """
+    Parse a boolean config value; environment values are strings, so "0" and "false" are False
+    :param value:
+    :return:
+    """
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    return bool(value)
+
+
+class RedisConnectionPool(redis.BlockingConnectionPool):
+    """
+    Bounded blocking connection pool with usage stats
+
+    When all connections are in use, callers wait up to `timeout` seconds for a free connection and then fail
+    with ConnectionError, instead of opening new connections
+    """
+
+    def __init__(self, metrics=None, **kwargs):
+        super().__init__(**kwargs)
+        self.wait_time = None
+        self.exhausted = None
+        if metrics is not None:
+            self.wait_time = metrics.histogram(
+                METRIC_REDIS_POOL_WAIT, "time waiting for a redis pool connection"
+            )
+            self.exhausted = metrics.counter(
+                METRIC_REDIS_POOL_EXHAUSTED, "redis pool connection wait timeouts"
+            )
+
+    def get_connection(self, command_name=None, *keys, **options):
+        start = perf_counter()
+        try:
+            return super().get_connection(command_name, *keys, **options)
+        except redis.ConnectionError as e:
+            # pool timeout is reported by redis-py as a generic ConnectionError
+            if self.exhausted is not None and str(e) == "No connection available.":
+                self.exhausted.inc()
+            raise
+        finally:
+            if self.wait_time is not None:
+                self.wait_time.observe(perf_counter() - start)
+
+    def stats(self) -> dict:
+        """
+        Pool usage statistics
+        :return: dict
+        """
+        # the pool queue holds idle connections and placeholders for not-yet-created connections
+        free = self.pool.qsize()
+        in_use = self.max_connections - free
+        return {
+            "max_connections": self.max_connections,
+            "created": len(self._connections),
+            "in_use": in_use,
+            "idle": len(self._connections) - in_use,
+            "saturation": in_use / self.max_connections,
+            "timeout": self.timeout,
+        }
+
 
 def RedisFactory(_di: Di):
     """
@@ -23,11 +98,47 @@ def RedisFactory(_di: Di):
     @_di.register(DI_REDIS)
     def _factory(_di: Di):
         cfg = _di.get(DI_CONFIG)
+        use_ssl = True if cfg.get(CFG_REDIS_SSL, None) == "1" else False
         redis_cfg = {
             "host": cfg.get(CFG_REDIS_HOST, "localhost"),
             "port": int(cfg.get(CFG_REDIS_PORT, 6379)),
             "password": cfg.get(CFG_REDIS_PASSWORD, ""),
             "db": int(cfg.get(CFG_REDIS_DB, 0)),
-            "ssl": True if cfg.get(CFG_REDIS_SSL, None) == "1" else False,
+            "connection_class": redis.SSLConnection if use_ssl else redis.Connection,
+            "max_connections": int(
+                cfg.get(CFG_REDIS_MAX_CONNECTIONS, PokieConfig.REDIS_MAX_CONNECTIONS)
+            ),
+            "timeout": float(
+                cfg.get(CFG_REDIS_POOL_TIMEOUT, PokieConfig.REDIS_POOL_TIMEOUT)
+            ),
+            "socket_timeout": float(
+                cfg.get(CFG_REDIS_SOCKET_TIMEOUT, PokieConfig.REDIS_SOCKET_TIMEOUT)
+            ),
+            "socket_connect_timeout": float(
+                cfg.get(CFG_REDIS_CONNECT_TIMEOUT, PokieConfig.REDIS_CONNECT_TIMEOUT)
+            ),
+            "health_check_interval": int(
+                cfg.get(
+                    CFG_REDIS_HEALTH_CHECK_INTERVAL,
+                    PokieConfig.REDIS_HEALTH_CHECK_INTERVAL,
+                )
+            ),
+            "socket_keepalive": parse_bool(
+                cfg.get(CFG_REDIS_KEEPALIVE, PokieConfig.REDIS_KEEPALIVE)
+            ),
         }
-        return redis.Redis(**redis_cfg)
+        metrics = _di.get(DI_METRICS) if _di.has(DI_METRICS) else None
+        pool = RedisConnectionPool(metrics=metrics, **redis_cfg)
+        return redis.Redis(connection_pool=pool)
+
+
+def redis_pool_stats(client: redis.Redis) -> dict:
+    """
+    Retrieve pool usage statistics from a redis client
+    :param client:
+    :return: dict; empty if the client does not use RedisConnectionPool
+    """
+    pool = client.connection_pool
+    if isinstance(pool, RedisConnectionPool):
+        return pool.stats()
+    return {}
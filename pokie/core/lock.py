@@ -0,0 +1,182 @@
+import hashlib
+import uuid
+
+from rick.base import Di
+
+from pokie.constants import (
+    DI_CONFIG,
+    DI_DB,
+    DI_REDIS,
+    CFG_JOB_LOCK_BACKEND,
+    CFG_JOB_LOCK_TTL,
+)
+
+# job lock backends
+LOCK_BACKEND_DB = "db"
+LOCK_BACKEND_REDIS = "redis"
+
+
+class AdvisoryLock:
+    """
+    PostgreSQL session-level advisory lock
+
+    The lock is held by a dedicated pool connection until released; if the process dies, the database closes the
+    connection and the lock is released, so another node can take over
+    """
+
+    def __init__(self, db, key: str):
+        """
+        :param db: connection pool
+        :param key: lock name
+        """
+        self.db = db
+        self.key = key
+        # advisory locks use a bigint key
+        self.lock_id = int.from_bytes(
+            hashlib.sha1(key.encode("utf-8")).digest()[:8], "big", signed=True
+        )
+        self._conn = None
+
+    @property
+    def held(self) -> bool:
+        return self._conn is not None
+
+    def acquire(self) -> bool:
+        """
+        Try to acquire the lock, without waiting
+        :return: True if the lock is held
+        """
+        if self._conn is not None:
+            return True
+        conn = self.db.getconn()
+        try:
+            with conn.cursor() as c:
+                row = c.fetchone(
+                    "SELECT pg_try_advisory_lock(%s) AS locked", [self.lock_id]
+                )
+        except Exception:
+            self.db.putconn(conn)
+            raise
+        if not row["locked"]:
+            self.db.putconn(conn)
+            return False
+        self._conn = conn
+        return True
+
+    def renew(self) -> bool:
+        """
+        Check the lock is still held
+        Advisory locks do not expire, but are lost if the connection holding them is closed
+        :return: True if the lock is still held
+        """
+        if self._conn is None:
+            return False
+        try:
+            with self._conn.cursor() as c:
+                c.exec("SELECT 1")
+            return True
+        except Exception:
+            self._discard()
+            return False
+
+    def release(self):
+        if self._conn is None:
+            return
+        try:
+            with self._conn.cursor() as c:
+                c.exec("SELECT pg_advisory_unlock(%s)", [self.lock_id])
+        except Exception:
+            # if the connection is broken, the lock is already gone
+            pass
+        self._discard()
+
+    def _discard(self):
+        conn = self._conn
+        self._conn = None
+        try:
+            self.db.putconn(conn)
+        except Exception:
+            pass
+
+
+class RedisLease:
+    """
+    Redis lock with a lease time
+
+    The lease expires after ttl seconds unless renewed, so a lock held by a dead process is released after at most
+    ttl seconds; renew() must be called more frequently than ttl
+    """
+
+    KEY_PREFIX = "pokie:lock:"
+
+    # only renew or delete the key if it still holds our token
+    RENEW_SCRIPT = (
+        "if redis.call('get', KEYS[1]) == ARGV[1] then "
+        "return redis.call('pexpire', KEYS[1], ARGV[2]) else return 0 end"
+    )
+    RELEASE_SCRIPT = (
+        "if redis.call('get', KEYS[1]) == ARGV[1] then "
+        "return redis.call('del', KEYS[1]) else return 0 end"
+    )
+
+    def __init__(self, redis, key: str, ttl: float):
+        """
+        :param redis: redis client
+        :param key: lock name
+        :param ttl: lease time, in seconds
+        """
+        self.redis = redis
+        self.key = self.KEY_PREFIX + key
+        self.ttl_ms = int(ttl * 1000)
+        self.token = uuid.uuid4().hex
+        self._held = False
+
+    @property
+    def held(self) -> bool:
+        return self._held
+
+    def acquire(self) -> bool:
+        if self._held:
+            return self.renew()
+        self._held = bool(
+            self.redis.set(self.key, self.token, nx=True, px=self.ttl_ms)
+        )
+        return self._held
+
+    def renew(self) -> bool:
+        if not self._held:
+            return False
+        try:
+            result = self.redis.eval(
+                self.RENEW_SCRIPT, 1, self.key, self.token, self.ttl_ms
+            )
+            self._held = bool(result)
+        except Exception:
+            self._held = False
+        return self._held
+
+    def release(self):
+        if not self._held:
+            return
+        self._held = False
+        try:
+            self.redis.eval(self.RELEASE_SCRIPT, 1, self.key, self.token)
+        except Exception:
+            # the lease expires on its own
+            pass
+
+
+def job_lock_factory(di: Di):
+    """
+    Build a lock factory for singleton jobs, according to the JOB_LOCK_BACKEND setting
+    :param di:
+    :return: callable(key: str) that returns a new lock object
+    """
+    cfg = di.get(DI_CONFIG)
+    backend = cfg.get(CFG_JOB_LOCK_BACKEND, LOCK_BACKEND_DB)
+    if backend == LOCK_BACKEND_DB:
+        return lambda key: AdvisoryLock(di.get(DI_DB), key)
+    if backend == LOCK_BACKEND_REDIS:
+        ttl = float(cfg.get(CFG_JOB_LOCK_TTL, 30))
+        return lambda key: RedisLease(di.get(DI_REDIS), key, ttl)
+    raise ValueError("job lock: invalid backend '{}'".format(backend))
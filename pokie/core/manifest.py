@@ -0,0 +1,188 @@
+import hashlib
+import json
+import os
+import sys
+import tempfile
+from typing import Optional
+
+from rick.util.loader import load_class
+
+import pokie
+from pokie.core.command import CliCommand
+from pokie.util.cli_args import ArgParser
+
+
+def default_manifest_file() -> Optional[str]:
+    """
+    Default command manifest file, unique per application entrypoint
+    The file is kept in the per-user cache dir ($XDG_CACHE_HOME/pokie or ~/.cache/pokie); if the directory cannot
+    be created, None is returned and the manifest is not cached
+    :return:
+    """
+    cache_dir = os.environ.get("XDG_CACHE_HOME", None) or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    cache_dir = os.path.join(cache_dir, "pokie")
+    try:
+        os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+    except OSError:
+        return None
+    digest = hashlib.md5(os.path.abspath(sys.argv[0]).encode("utf-8")).hexdigest()
+    name = "cli-{}.json".format(digest[:8])
+    return os.path.join(cache_dir, name)
+
+
+class CommandManifest:
+    """
+    Cached description of the CLI commands of all modules
+
+    Listing commands requires importing every command class; the manifest stores their descriptions, usage and
+    options in a file, so list, help and shell completion do not import them. The manifest is rebuilt when its key
+    changes; the key covers the pokie and python versions, the module command maps and versions, and the
+    modification times of the module source files
+    """
+
+    FORMAT = 1
+
+    def __init__(self, di, modules: dict, path: Optional[str] = None):
+        """
+        :param di:
+        :param modules: dict of module name: module object
+        :param path: manifest file; if None, the manifest is not cached
+        """
+        self.di = di
+        self.modules = modules
+        self.path = path
+        self._commands = None
+
+    def commands(self) -> dict:
+        """
+        Command details, by command name
+        Each entry is a dict with the keys path, module, description, usage and options
+        :return:
+        """
+        if self._commands is not None:
+            return self._commands
+
+        key = self.key()
+        commands = self.read(key)
+        if commands is None:
+            commands = self.build()
+            self.write(key, commands)
+        self._commands = commands
+        return commands
+
+    def get(self, name: str) -> Optional[dict]:
+        return self.commands().get(name, None)
+
+    def key(self) -> str:
+        modules = {}
+        for name, module in self.modules.items():
+            modules[name] = {
+                "cmd": getattr(module, "cmd", {}),
+                "version": getattr(module, "version", None),
+                "files": self._source_stamp(module),
+            }
+        data = {
+            "format": self.FORMAT,
+            "pokie": pokie.get_version(),
+            "python": sys.version,
+            "modules": modules,
+        }
+        return hashlib.sha1(
+            json.dumps(data, sort_keys=True, default=str).encode("utf-8")
+        ).hexdigest()
+
+    def build(self) -> dict:
+        """
+        Build the manifest, importing all command classes
+        :return:
+        """
+        result = {}
+        for module_name, module in self.modules.items():
+            for cmd, cmd_path in module.cmd.items():
+                cls = load_class(cmd_path)
+                if not cls:
+                    raise RuntimeError(
+                        "Error: class '{}' not found while listing available CLI commands".format(
+                            cmd_path
+                        )
+                    )
+                if not issubclass(cls, CliCommand):
+                    raise RuntimeError(
+                        "Error: class '{}' does not extend CliCommand".format(cmd_path)
+                    )
+
+                parser = ArgParser(add_help=False)
+                if not cls.skipargs:
+                    cls(self.di).arguments(parser)
+                options = []
+                for action in parser._actions:
+                    options.extend(action.option_strings)
+
+                result[cmd] = {
+                    "path": cmd_path,
+                    "module": module_name,
+                    "description": cls.description,
+                    "usage": parser.format_parameters(),
+                    "options": options,
+                }
+        return result
+
+    def read(self, key: str) -> Optional[dict]:
+        if not self.path:
+            return None
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(data, dict) or data.get("key", None) != key:
+            return None
+        return data.get("commands", None)
+
+    def write(self, key: str, commands: dict):
+        if not self.path:
+            return
+        try:
+            # mkstemp creates the file with a unique name and 0600 permissions
+            fd, tmp_file = tempfile.mkstemp(
+                prefix=os.path.basename(self.path) + ".",
+                suffix=".tmp",
+                dir=os.path.dirname(os.path.abspath(self.path)),
+            )
+        except OSError:
+            # the manifest is only a cache
+            return
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump({"key": key, "commands": commands}, f)
+            os.replace(tmp_file, self.path)
+        except OSError:
+            try:
+                os.unlink(tmp_file)
+            except OSError:
+                pass
+
+    @staticmethod
+    def _source_stamp(module) -> list:
+        """
+        Number of source files and latest modification time of the module package
+        :param module:
+        :return:
+        """
+        source = getattr(sys.modules.get(type(module).__module__, None), "__file__", None)
+        if not source:
+            return [0, 0]
+        count = 0
+        mtime = 0
+        for root, dirs, files in os.walk(os.path.dirname(source)):
+            dirs[:] = [d for d in dirs if d != "__pycache__"]
+            for name in files:
+                if name.endswith(".py"):
+                    count += 1
+                    try:
+                        mtime = max(mtime, os.stat(os.path.join(root, name)).st_mtime_ns)
+                    except OSError:
+                        pass
+        return [count, mtime]
@@ -0,0 +1,178 @@
+import threading
+from bisect import bisect_left
+from typing import Optional, Union
+
+
+class Counter:
+    """
+    Monotonic counter
+    """
+
+    def __init__(self, name: str, description: str = ""):
+        self.name = name
+        self.description = description
+        self._value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: Union[int, float] = 1):
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self):
+        return self._value
+
+    def asdict(self) -> dict:
+        return {"type": "counter", "value": self._value}
+
+
+class Gauge:
+    """
+    Value that can go up and down
+    """
+
+    def __init__(self, name: str, description: str = ""):
+        self.name = name
+        self.description = description
+        self._value = 0
+        self._lock = threading.Lock()
+
+    def set(self, value: Union[int, float]):
+        with self._lock:
+            self._value = value
+
+    def inc(self, amount: Union[int, float] = 1):
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: Union[int, float] = 1):
+        with self._lock:
+            self._value -= amount
+
+    @property
+    def value(self):
+        return self._value
+
+    def asdict(self) -> dict:
+        return {"type": "gauge", "value": self._value}
+
+
+class Histogram:
+    """
+    Bucketed distribution of observed values (typically durations in seconds)
+    """
+
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self, name: str, description: str = "", buckets: tuple = None):
+        self.name = name
+        self.description = description
+        if buckets is None:
+            buckets = self.DEFAULT_BUCKETS
+        self.buckets = tuple(sorted(buckets))
+        # last slot counts values above the highest bucket
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._count = 0
+        self._sum = 0.0
+        self._max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: Union[int, float]):
+        idx = bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[idx] += 1
+            self._count += 1
+            self._sum += value
+            if value > self._max:
+                self._max = value
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    @property
+    def sum(self) -> float:
+        return self._sum
+
+    @property
+    def max(self) -> float:
+        return self._max
+
+    def asdict(self) -> dict:
+        with self._lock:
+            buckets = {}
+            total = 0
+            for limit, count in zip(self.buckets, self._counts):
+                total += count
+                buckets[str(limit)] = total
+            buckets["+Inf"] = self._count
+            return {
+                "type": "histogram",
+                "count": self._count,
+                "sum": self._sum,
+                "max": self._max,
+                "buckets": buckets,
+            }
+
+
+class MetricsRegistry:
+    """
+    In-process metrics registry
+
+    Metrics are created on first access and shared by name; requesting an existing name with a different
+    metric type raises TypeError
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, description: str = "") -> Counter:
+        return self._get_or_create(Counter, name, description=description)
+
+    def gauge(self, name: str, description: str = "") -> Gauge:
+        return self._get_or_create(Gauge, name, description=description)
+
+    def histogram(
+        self, name: str, description: str = "", buckets: tuple = None
+    ) -> Histogram:
+        return self._get_or_create(
+            Histogram, name, description=description, buckets=buckets
+        )
+
+    def get(self, name: str) -> Optional[Union[Counter, Gauge, Histogram]]:
+        return self._metrics.get(name, None)
+
+    def names(self) -> list:
+        with self._lock:
+            return sorted(self._metrics.keys())
+
+    def snapshot(self) -> dict:
+        """
+        Dump all metrics into a dict
+        :return: dict of name:metric_dict
+        """
+        with self._lock:
+            metrics = list(self._metrics.items())
+        result = {}
+        for name, metric in sorted(metrics):
+            result[name] = metric.asdict()
+        return result
+
+    def purge(self):
+        with self._lock:
+            self._metrics = {}
+
+    def _get_or_create(self, cls, name: str, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name, None)
+            if metric is None:
+                metric = cls(name, **kwargs)
+                self._metrics[name] = metric
+            elif not isinstance(metric, cls):
+                raise TypeError(
+                    "metrics: '{}' is already registered as {}".format(
+                        name, type(metric).__name__
+                    )
+                )
+            return metric
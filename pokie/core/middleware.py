@@ -1,11 +1,89 @@
-from threading import Lock
+import threading
+from time import perf_counter
+
+from rick.base import Di
+from rick.mixin import Injectable
+
+# middleware stage durations are usually well below the default histogram buckets
+MIDDLEWARE_BUCKETS = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    1.0,
+)
+
+
+class PokieMiddleware(Injectable):
+    """
+    Base class for module WSGI middlewares
+
+    Modules declare middlewares in the 'middlewares' attribute; FlaskApplication.build() wraps the Flask wsgi_app
+    with them. Middleware classes not extending PokieMiddleware are built with the wrapped application as the only
+    argument, so generic WSGI middlewares (eg. werkzeug ProxyFix) can also be used
+    """
+
+    def __init__(self, app, di: Di):
+        """
+        :param app: wrapped WSGI application
+        :param di:
+        """
+        self.app = app
+        self.set_di(di)
+
+    def __call__(self, environ, start_response):
+        return self.app(environ, start_response)
+
+
+class MiddlewareTimer:
+    """
+    Records the time spent in a middleware stage, excluding the inner stages, on a histogram
+
+    Only the WSGI call is measured; response bodies iterated after the call returns are not included
+    """
+
+    def __init__(self, app, histogram, local: threading.local):
+        """
+        :param app: middleware stage
+        :param histogram: Histogram
+        :param local: thread-local state shared by all timers of the chain
+        """
+        self.app = app
+        self.histogram = histogram
+        self.local = local
+
+    def __call__(self, environ, start_response):
+        local = self.local
+        outer = getattr(local, "inner", 0.0)
+        local.inner = 0.0
+        start = perf_counter()
+        try:
+            return self.app(environ, start_response)
+        finally:
+            elapsed = perf_counter() - start
+            self.histogram.observe(elapsed - local.inner)
+            # the enclosing stage excludes the total time of this stage
+            local.inner = outer + elapsed
 
 
 class ModuleRunnerMiddleware:
+    """
+    WSGI middleware that initializes the application on the first request
+
+    FlaskApplication.init() removes this middleware from the Flask wsgi_app chain, so once the application is
+    initialized, requests are dispatched without any initialization check
+    """
+
     def __init__(self, app, pokie_app):
         self.app = app
         self.pokie_app = pokie_app
-        self.lock = Lock()
 
     def __call__(self, environ, start_response):
         self.pokie_app.init()
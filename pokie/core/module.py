@@ -19,6 +19,10 @@ class BaseModule(Injectable, abc.ABC):
     # jobs
     jobs = []
 
+    # WSGI middlewares, as {priority: [middleware class path, ...]}
+    # lower priorities are outer stages, and see requests first
+    middlewares = {}
+
     def build(self, parent=None):
         """
         Initialize module internals
@@ -26,3 +30,12 @@ class BaseModule(Injectable, abc.ABC):
         :return:
         """
         pass
+
+    def warmup(self, parent=None):
+        """
+        Prepare the module to serve requests, eg. prime caches
+        Called once per process, after build() and after services and pools are initialized
+        :param parent: FlaskApplication instance
+        :return:
+        """
+        pass
@@ -0,0 +1,614 @@
+import glob
+import hashlib
+import heapq
+import json
+import logging
+import os
+import socket
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from time import monotonic, time
+from typing import List, Tuple
+
+from pokie.core.metrics import MetricsRegistry
+
+# job scheduling modes
+JOB_CONTINUOUS = "continuous"
+JOB_INTERVAL = "interval"
+JOB_CRON = "cron"
+
+# job health, as reported by job_health()
+JOB_OK = "ok"
+JOB_RUNNING = "running"
+JOB_FAILING = "failing"
+JOB_OVERRUN = "overrun"
+JOB_LATE = "late"
+JOB_STALE = "stale"
+
+# redis hash holding the state of every running scheduler, by host:pid
+JOB_STATE_KEY = "pokie:job_state"
+
+
+class CronSchedule:
+    """
+    Minimal 5-field cron expression (minute hour day-of-month month day-of-week)
+
+    Each field accepts '*', single values, ranges ('a-b'), steps ('*/n', 'a-b/n') and comma-separated lists; day of
+    week is 0-6, starting on Sunday (7 is also accepted as Sunday). As in cron, if both day fields are restricted,
+    a day matches if either field matches
+    """
+
+    FIELDS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+    def __init__(self, expr: str):
+        parts = expr.split()
+        if len(parts) != 5:
+            raise ValueError("cron: invalid expression '{}'".format(expr))
+        self.expr = expr
+        values = []
+        for part, (lo, hi) in zip(parts, self.FIELDS):
+            values.append(self._parse(part, lo, hi))
+        self.minutes, self.hours, self.days, self.months, dow = values
+        # 7 is Sunday
+        if 7 in dow:
+            dow = (dow - {7}) | {0}
+        self.weekdays = dow
+        self.any_day = parts[2] == "*"
+        self.any_weekday = parts[4] == "*"
+
+    @staticmethod
+    def _parse(field: str, lo: int, hi: int) -> frozenset:
+        result = set()
+        for item in field.split(","):
+            step = 1
+            if "/" in item:
+                item, step = item.split("/", 1)
+                step = int(step)
+                if step < 1:
+                    raise ValueError("cron: invalid step in '{}'".format(field))
+            if item == "*":
+                start, end = lo, hi
+            elif "-" in item:
+                start, end = [int(v) for v in item.split("-", 1)]
+            else:
+                start = end = int(item)
+            if start < lo or end > hi or start > end:
+                raise ValueError("cron: value out of range in '{}'".format(field))
+            result.update(range(start, end + 1, step))
+        return frozenset(result)
+
+    def _day_matches(self, dt: datetime) -> bool:
+        dom = dt.day in self.days
+        # python weekday(): Monday is 0; cron: Sunday is 0
+        dow = (dt.weekday() + 1) % 7 in self.weekdays
+        if self.any_day:
+            return dow
+        if self.any_weekday:
+            return dom
+        return dom or dow
+
+    def next(self, after: datetime) -> datetime:
+        """
+        Next matching time strictly after the given datetime
+        :param after:
+        :return:
+        """
+        dt = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = dt + timedelta(days=366 * 5)
+        while dt < limit:
+            if dt.month not in self.months:
+                # skip to the first day of next month
+                dt = dt.replace(day=1, hour=0, minute=0) + timedelta(days=32)
+                dt = dt.replace(day=1)
+                continue
+            if not self._day_matches(dt):
+                dt = dt.replace(hour=0, minute=0) + timedelta(days=1)
+                continue
+            if dt.hour not in self.hours:
+                dt = dt.replace(minute=0) + timedelta(hours=1)
+                continue
+            if dt.minute not in self.minutes:
+                dt += timedelta(minutes=1)
+                continue
+            return dt
+        raise ValueError("cron: expression '{}' never matches".format(self.expr))
+
+
+class ScheduledJob:
+    """
+    Scheduling state for a job object
+
+    Jobs may declare the following (optional) attributes:
+        schedule: None (run continuously, idle_interval seconds after the previous run finishes), number of seconds
+         between runs, or a cron expression string
+        max_runtime: run time budget, in seconds; longer runs are reported as overrun
+        priority: among jobs due at the same time, higher priority jobs are submitted first
+        singleton: if True, the job only runs on the node holding the job lock (see JobScheduler)
+        lock_key: optional lock name for singleton jobs; defaults to the job name
+
+    After a failed run, the next run is delayed by at least BACKOFF_MIN * 2^(consecutive failures - 1) seconds, up
+    to BACKOFF_MAX
+    """
+
+    DEFAULT_IDLE_INTERVAL = 15.0
+    BACKOFF_MIN = 1.0
+    BACKOFF_MAX = 300.0
+
+    def __init__(self, name: str, job, idle_interval: float = DEFAULT_IDLE_INTERVAL):
+        """
+        :param name: job name
+        :param job: job object
+        :param idle_interval: seconds between the end of a run and the start of the next, for continuous jobs
+        """
+        self.name = name
+        self.job = job
+        schedule = getattr(job, "schedule", None)
+        self.cron = None
+        self.interval = 0.0
+        if schedule is None:
+            self.mode = JOB_CONTINUOUS
+            self.interval = float(idle_interval)
+        elif isinstance(schedule, str):
+            self.mode = JOB_CRON
+            self.cron = CronSchedule(schedule)
+        else:
+            self.mode = JOB_INTERVAL
+            self.interval = float(schedule)
+        self.max_runtime = getattr(job, "max_runtime", None)
+        self.priority = int(getattr(job, "priority", 0))
+        self.lock_key = getattr(job, "lock_key", None)
+        self.singleton = bool(getattr(job, "singleton", False) or self.lock_key)
+        if not self.lock_key:
+            self.lock_key = name
+        self.lock = None
+
+        self.running = False
+        self.overrun = False
+        self.started = None  # monotonic start of the current run
+        self.runs = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.overruns = 0
+        self.skipped = 0  # runs skipped because the job lock is held elsewhere
+        self.last_run = None  # epoch
+        self.last_duration = None
+        self.last_error = None
+        self.last_success = None  # epoch
+        self.next_run = None  # epoch
+        self.duration = None  # optional duration Histogram
+
+    def describe(self) -> str:
+        if self.mode == JOB_CRON:
+            return self.cron.expr
+        if self.mode == JOB_INTERVAL:
+            return "every {}s".format(self.interval)
+        return "{} ({}s idle)".format(JOB_CONTINUOUS, self.interval)
+
+    def next_delay(self, now: float) -> float:
+        """
+        Seconds until the next run, counted from now (epoch)
+        :param now:
+        :return:
+        """
+        return max(self._schedule_delay(now), self.backoff())
+
+    def backoff(self) -> float:
+        """
+        Minimum delay after failed runs
+        :return:
+        """
+        if self.consecutive_failures == 0:
+            return 0.0
+        return min(
+            self.BACKOFF_MAX, self.BACKOFF_MIN * 2 ** (self.consecutive_failures - 1)
+        )
+
+    def _schedule_delay(self, now: float) -> float:
+        if self.mode == JOB_CRON:
+            after = datetime.fromtimestamp(now)
+            return max(0.0, self.cron.next(after).timestamp() - now)
+        if self.last_run is None:
+            return 0.0
+        if self.mode == JOB_INTERVAL:
+            # fixed rate, without catching up on missed runs
+            return max(0.0, self.last_run + self.interval - now)
+        # continuous jobs are rescheduled when a run finishes
+        return self.interval
+
+    def asdict(self) -> dict:
+        return {
+            "name": self.name,
+            "schedule": self.describe(),
+            "max_runtime": self.max_runtime,
+            "priority": self.priority,
+            "running": self.running,
+            "runs": self.runs,
+            "failures": self.failures,
+            "consecutive_failures": self.consecutive_failures,
+            "overruns": self.overruns,
+            "singleton": self.singleton,
+            "lock_held": self.lock is not None and self.lock.held,
+            "skipped": self.skipped,
+            "last_run": self.last_run,
+            "last_duration": self.last_duration,
+            "last_error": self.last_error,
+            "last_success": self.last_success,
+            "next_run": self.next_run,
+            "duration": self.duration.asdict() if self.duration is not None else None,
+        }
+
+
+def default_state_file() -> str:
+    """
+    Default scheduler state file, unique per application entrypoint
+    :return:
+    """
+    digest = hashlib.md5(os.path.abspath(sys.argv[0]).encode("utf-8")).hexdigest()
+    name = "pokie-jobs-{}.json".format(digest[:8])
+    return os.path.join(tempfile.gettempdir(), name)
+
+
+def worker_state_file(path: str, idx: int) -> str:
+    """
+    State file for a given worker process
+    :param path: base state file; if empty, default_state_file() is used
+    :param idx: worker index
+    :return:
+    """
+    if not path:
+        path = default_state_file()
+    root, ext = os.path.splitext(path)
+    return "{}.{}{}".format(root, idx, ext)
+
+
+def read_state_files(path: str = None) -> list:
+    """
+    Read the scheduler state file and any worker state files
+    :param path:
+    :return: list of scheduler state dicts
+    """
+    if not path:
+        path = default_state_file()
+    root, ext = os.path.splitext(path)
+    result = []
+    for name in [path, *sorted(glob.glob("{}.*{}".format(glob.escape(root), ext)))]:
+        try:
+            with open(name, "r") as f:
+                result.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return result
+
+
+def read_state_redis(redis) -> list:
+    """
+    Read the state of all schedulers publishing to redis
+    :param redis: redis client
+    :return: list of scheduler state dicts
+    """
+    result = []
+    for value in redis.hgetall(JOB_STATE_KEY).values():
+        try:
+            result.append(json.loads(value))
+        except ValueError:
+            continue
+    return result
+
+
+def job_health(info: dict, updated: float, now: float, stale_after: float) -> str:
+    """
+    Evaluate the health of a job from its state
+    :param info: job state dict
+    :param updated: epoch of the last state update of the scheduler running the job
+    :param now: epoch
+    :param stale_after: seconds without state updates after which the scheduler is considered dead or hung
+    :return: one of the JOB_* health constants
+    """
+    if now - updated > stale_after:
+        return JOB_STALE
+    max_runtime = info.get("max_runtime", None)
+    if info.get("running", False):
+        started = info.get("last_run") or now
+        if max_runtime is not None and now - started > max_runtime:
+            return JOB_OVERRUN
+        return JOB_RUNNING
+    if info.get("last_error", None) is not None:
+        return JOB_FAILING
+    next_run = info.get("next_run", None)
+    if next_run is not None and now - next_run > stale_after:
+        # due, but not started; all scheduler workers are busy
+        return JOB_LATE
+    return JOB_OK
+
+
+def read_state_file(path: str = None) -> dict:
+    """
+    Read the scheduler state file, merged with any worker state files
+    If a job runs in several workers, the most recent run is reported
+    :param path:
+    :return: dict of job name: job state dict; empty if not available
+    """
+    result = {}
+    for state in read_state_files(path):
+        for job_name, info in state.get("jobs", {}).items():
+            current = result.get(job_name, None)
+            if current is None or (info.get("last_run") or 0) > (
+                current.get("last_run") or 0
+            ):
+                result[job_name] = info
+    return result
+
+
+class JobScheduler:
+    """
+    Runs jobs concurrently on a bounded thread pool
+
+    Pending runs are kept in a heap ordered by next run time; a job is only rescheduled after its current run
+    finishes, so the same job never overlaps with itself. Job state is written to a JSON state file (and optionally
+    to a redis hash shared by all nodes) at most every STATE_INTERVAL seconds, and is used by the job:list and
+    job:status commands; per-job run, failure and overrun counters and duration histograms are kept in the
+    metrics registry
+
+    Singleton jobs only run while the scheduler holds their job lock; once acquired, the lock is kept (and renewed
+    every lock_renew seconds) until the scheduler stops, so other nodes keep retrying and take over when the
+    holder exits or loses the lock
+    """
+
+    STATE_INTERVAL = 1.0
+
+    def __init__(
+        self,
+        di,
+        jobs: List[Tuple[str, object]],
+        workers: int = 4,
+        state_file: str = None,
+        metrics: MetricsRegistry = None,
+        lock_factory=None,
+        lock_renew: float = 5.0,
+        redis=None,
+        idle_interval: float = ScheduledJob.DEFAULT_IDLE_INTERVAL,
+    ):
+        """
+        :param di:
+        :param jobs: list of (name, job object)
+        :param workers: max number of concurrently running jobs
+        :param state_file: optional state file path; if empty, default_state_file() is used
+        :param metrics:
+        :param lock_factory: optional callable(key) returning a lock object for singleton jobs; if None, singleton
+         jobs run without locking
+        :param lock_renew: interval, in seconds, between lock renewals and acquisition retries
+        :param redis: optional redis client; if set, job state is also published to the JOB_STATE_KEY hash
+        :param idle_interval: seconds between runs of continuous jobs (jobs without schedule)
+        """
+        self.di = di
+        self.jobs = [ScheduledJob(name, job, idle_interval) for name, job in jobs]
+        self.workers = max(1, workers)
+        self.state_file = state_file if state_file else default_state_file()
+        self.logger = logging.getLogger(__name__)
+        self.lock_factory = lock_factory
+        self.lock_renew = lock_renew
+        self.redis = redis
+        self.worker_id = "{}:{}".format(socket.gethostname(), os.getpid())
+
+        self._heap = []
+        self._seq = 0
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._executor = None
+        self._state_written = 0.0
+        self._lock_renewed = monotonic()
+
+        if metrics is None:
+            metrics = MetricsRegistry()
+        self.duration = metrics.histogram("job_duration", "job run time")
+        self.failed = metrics.counter("job_failed", "failed job runs")
+        self.overrun = metrics.counter("job_overrun", "job runs exceeding max_runtime")
+
+        # per-job metrics
+        self._job_metrics = {}
+        for job in self.jobs:
+            job.duration = metrics.histogram(
+                "job_duration:{}".format(job.name), "run time of {}".format(job.name)
+            )
+            self._job_metrics[job.name] = (
+                metrics.counter("job_runs:{}".format(job.name)),
+                metrics.counter("job_failed:{}".format(job.name)),
+                metrics.counter("job_overrun:{}".format(job.name)),
+            )
+
+    def run(self):
+        """
+        Scheduler loop; returns after stop() is called and running jobs finish
+        :return:
+        """
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="job"
+        )
+        now = time()
+        with self._cond:
+            for job in self.jobs:
+                self._push(job, now)
+        self.write_state()
+
+        try:
+            while not self._stop.is_set():
+                with self._cond:
+                    due = self._pop_due()
+                    if not due:
+                        self._cond.wait(self._wait_time())
+                for job in sorted(due, key=lambda j: -j.priority):
+                    if self._acquire(job):
+                        self._submit(job)
+                    else:
+                        job.skipped += 1
+                        with self._cond:
+                            self._push(job, time(), self.lock_renew)
+                self._check_overrun()
+                if monotonic() - self._lock_renewed >= self.lock_renew:
+                    self._renew_locks()
+                if monotonic() - self._state_written >= self.STATE_INTERVAL:
+                    self.write_state()
+        finally:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+            self._release_locks()
+            self.write_state()
+            self._remove_redis_state()
+
+    @property
+    def stopping(self) -> bool:
+        return self._stop.is_set()
+
+    def stop(self):
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+
+    def write_state(self):
+        """
+        Write job state to the state file
+        :return:
+        """
+        data = {
+            "worker": self.worker_id,
+            "pid": os.getpid(),
+            "updated": time(),
+            "jobs": {job.name: job.asdict() for job in self.jobs},
+        }
+        self._state_written = monotonic()
+        tmp = "{}.{}.tmp".format(self.state_file, os.getpid())
+        try:
+            with open(tmp, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp, self.state_file)
+        except OSError as e:
+            self.logger.warning("job scheduler: cannot write state file: %s", e)
+
+        if self.redis is not None:
+            try:
+                self.redis.hset(JOB_STATE_KEY, self.worker_id, json.dumps(data))
+            except Exception as e:
+                self.logger.warning("job scheduler: cannot publish state: %s", e)
+
+    def _remove_redis_state(self):
+        # on clean exit; entries left by dead workers are reported as stale
+        if self.redis is None:
+            return
+        try:
+            self.redis.hdel(JOB_STATE_KEY, self.worker_id)
+        except Exception as e:
+            self.logger.warning("job scheduler: cannot remove state: %s", e)
+
+    def _push(self, job: ScheduledJob, now: float, min_delay: float = 0.0):
+        # caller must hold the lock
+        delay = max(min_delay, job.next_delay(now))
+        job.next_run = now + delay
+        self._seq += 1
+        heapq.heappush(self._heap, (monotonic() + delay, self._seq, job))
+        self._cond.notify_all()
+
+    def _pop_due(self) -> list:
+        # caller must hold the lock
+        due = []
+        now = monotonic()
+        while self._heap and self._heap[0][0] <= now:
+            _, _, job = heapq.heappop(self._heap)
+            due.append(job)
+        return due
+
+    def _wait_time(self) -> float:
+        # caller must hold the lock; wake up at least every second to check overruns and stop requests
+        if not self._heap:
+            return 1.0
+        return min(1.0, max(0.0, self._heap[0][0] - monotonic()))
+
+    def _acquire(self, job: ScheduledJob) -> bool:
+        if not job.singleton or self.lock_factory is None:
+            return True
+        if job.lock is not None and job.lock.held:
+            return True
+        try:
+            if job.lock is None:
+                job.lock = self.lock_factory(job.lock_key)
+            if job.lock.acquire():
+                self.logger.info("job '%s': lock acquired", job.name)
+                return True
+        except Exception as e:
+            self.logger.warning("job '%s': cannot acquire lock: %s", job.name, e)
+        return False
+
+    def _renew_locks(self):
+        self._lock_renewed = monotonic()
+        for job in self.jobs:
+            if job.lock is not None and job.lock.held:
+                if not job.lock.renew():
+                    # a running job cannot be stopped; the lock is reacquired before the next run
+                    self.logger.warning("job '%s': lock lost", job.name)
+
+    def _release_locks(self):
+        for job in self.jobs:
+            if job.lock is not None and job.lock.held:
+                try:
+                    job.lock.release()
+                except Exception as e:
+                    self.logger.warning(
+                        "job '%s': cannot release lock: %s", job.name, e
+                    )
+
+    def _submit(self, job: ScheduledJob):
+        job.running = True
+        job.overrun = False
+        job.started = monotonic()
+        job.last_run = time()
+        self._executor.submit(self._execute, job)
+
+    def _execute(self, job: ScheduledJob):
+        error = None
+        try:
+            job.job.run(self.di)
+        except Exception as e:
+            error = e
+            self.logger.exception("job '%s' failed", job.name)
+
+        duration = monotonic() - job.started
+        runs, failed, _ = self._job_metrics[job.name]
+        self.duration.observe(duration)
+        job.duration.observe(duration)
+        runs.inc()
+        with self._cond:
+            job.running = False
+            job.runs += 1
+            job.last_duration = duration
+            if error is not None:
+                job.failures += 1
+                job.consecutive_failures += 1
+                job.last_error = str(error)
+                self.failed.inc()
+                failed.inc()
+            else:
+                job.consecutive_failures = 0
+                job.last_error = None
+                job.last_success = time()
+            if not self._stop.is_set():
+                self._push(job, time())
+
+    def _check_overrun(self):
+        # python threads cannot be interrupted; overruns are reported, not killed
+        now = monotonic()
+        for job in self.jobs:
+            if (
+                job.running
+                and not job.overrun
+                and job.max_runtime is not None
+                and now - job.started > job.max_runtime
+            ):
+                job.overrun = True
+                job.overruns += 1
+                self.overrun.inc()
+                self._job_metrics[job.name][2].inc()
+                self.logger.warning(
+                    "job '%s' exceeded max runtime of %ss", job.name, job.max_runtime
+                )
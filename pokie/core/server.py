@@ -0,0 +1,171 @@
+import signal
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+from pokie.constants import DI_FLASK, DI_SIGNAL
+from pokie.core.supervisor import ProcessSupervisor
+
+
+class PoolRequestHandler(WSGIRequestHandler):
+    # idle keep-alive connections are closed after this many seconds, so workers can drain
+    timeout = 5
+
+
+class PoolWSGIServer(BaseWSGIServer):
+    """
+    WSGI server with a fixed-size request thread pool
+
+    When all threads are busy, no further connections are accepted by this process, so other workers sharing the
+    listening socket pick them up
+    """
+
+    multithread = True
+    multiprocess = True
+
+    def __init__(self, host: str, port: int, app, threads: int, fd: int):
+        """
+        :param host:
+        :param port:
+        :param app: WSGI application
+        :param threads: number of request threads
+        :param fd: listening socket file descriptor
+        """
+        super().__init__(host, port, app, PoolRequestHandler, fd=fd)
+        # with a shared socket, another worker may accept the connection first
+        self.socket.setblocking(False)
+        self.threads = threads
+        self._slots = threading.BoundedSemaphore(threads)
+        self._pool = ThreadPoolExecutor(threads, thread_name_prefix="http")
+
+    def get_request(self):
+        self._slots.acquire()
+        try:
+            return super().get_request()
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def process_request(self, request, client_address):
+        self._pool.submit(self._process, request, client_address)
+
+    def _process(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self._slots.release()
+
+    def drain(self):
+        """
+        Stop accepting connections, and wait for running requests to finish
+        Must not be called from the thread running serve_forever()
+        :return:
+        """
+        self.shutdown()
+        self._pool.shutdown(wait=True)
+
+
+def bind_socket(host: str, port: int, reuse_port: bool = False) -> socket.socket:
+    """
+    Create a listening socket
+    :param host:
+    :param port:
+    :param reuse_port: if True, SO_REUSEPORT is set, so each worker can bind its own socket
+    :return:
+    """
+    info = socket.getaddrinfo(
+        host, port, socket.AF_UNSPEC, socket.SOCK_STREAM, 0, socket.AI_PASSIVE
+    )
+    family, socktype, proto, _, address = info[0]
+    sock = socket.socket(family, socktype, proto)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuse_port:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind(address)
+    sock.listen(PoolWSGIServer.request_queue_size)
+    sock.set_inheritable(True)
+    return sock
+
+
+class HttpSupervisor(ProcessSupervisor):
+    """
+    Pre-fork HTTP server
+
+    The application is initialized once in the supervisor process; each forked worker rebuilds factory resources
+    (database and redis pools), runs the application warmup, and serves requests with a pool of threads. Workers
+    either share a single listening socket, or bind their own with SO_REUSEPORT. On SIGTERM/SIGINT, workers stop
+    accepting connections and finish running requests; on SIGHUP, new workers are started and the old ones are drained
+    """
+
+    rolling = True
+
+    def __init__(
+        self,
+        app,
+        host: str,
+        port: int,
+        workers: int,
+        threads: int,
+        reuse_port: bool = False,
+        silent: bool = False,
+    ):
+        """
+        :param app: FlaskApplication
+        :param host: interface to bind to
+        :param port: port to bind to
+        :param workers: number of worker processes
+        :param threads: number of request threads per worker
+        :param reuse_port: if True, each worker binds its own socket with SO_REUSEPORT
+        :param silent:
+        """
+        super().__init__(app, workers, silent)
+        self.host = host
+        self.port = int(port)
+        self.threads = threads
+        self.reuse_port = reuse_port
+        self.socket = None
+
+    def start_message(self) -> str:
+        return "\nServing on http://{}:{} with {} worker(s) of {} thread(s), press CTRL+C to abort...".format(
+            self.host, self.port, self.workers, self.threads
+        )
+
+    def run(self) -> bool:
+        if not self.reuse_port:
+            self.socket = bind_socket(self.host, self.port)
+        try:
+            return super().run()
+        finally:
+            if self.socket is not None:
+                self.socket.close()
+                self.socket = None
+
+    def worker(self, idx: int):
+        di = self.app.di
+        self.app.rebuild_factories()
+        self.app.warmup()
+
+        sock = self.socket
+        if sock is None:
+            sock = bind_socket(self.host, self.port, reuse_port=True)
+        server = PoolWSGIServer(
+            self.host, self.port, di.get(DI_FLASK), self.threads, sock.fileno()
+        )
+
+        def stop(di, signal_no, stack_frame):
+            # shutdown() blocks until serve_forever() exits, so it cannot run on the main thread
+            threading.Thread(target=server.drain, daemon=True).start()
+
+        signal_manager = di.get(DI_SIGNAL)
+        signal_manager.add_handler(signal.SIGTERM, stop)
+        signal_manager.add_handler(signal.SIGINT, stop)
+        try:
+            server.serve_forever()
+            server.drain()
+        finally:
+            signal_manager.shutdown()
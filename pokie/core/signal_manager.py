@@ -1,4 +1,7 @@
+import atexit
 import signal
+import threading
+
 from rick.mixin import Injectable
 from rick.base import Di
 
@@ -7,6 +10,9 @@ class SignalManager(Injectable):
     def __init__(self, di: Di):
         super().__init__(di)
         self.handlers = {}
+        self.shutdown_handlers = []
+        self._shutdown_lock = threading.Lock()
+        self._atexit = False
 
     def add_handler(self, signalnum: int, handler: callable):
         assert callable(handler) is True
@@ -18,6 +24,34 @@ class SignalManager(Injectable):
             self.handlers[signalnum] = [handler]
             self._register_handler(signalnum)
 
+    def add_shutdown_handler(self, handler: callable):
+        """
+        Register a handler to be called once when the process exits
+
+        Shutdown handlers receive the Di object, and run on normal interpreter exit (including exit() calls from
+        signal handlers), or when the application drains, via shutdown(). No signal handlers are installed; signal
+        handling belongs to the application
+        :param handler:
+        :return:
+        """
+        assert callable(handler) is True
+        with self._shutdown_lock:
+            if not self.shutdown_handlers and not self._atexit:
+                atexit.register(self.shutdown)
+                self._atexit = True
+            self.shutdown_handlers.append(handler)
+
+    def shutdown(self):
+        """
+        Run and clear the shutdown handlers
+        :return:
+        """
+        with self._shutdown_lock:
+            handlers = self.shutdown_handlers
+            self.shutdown_handlers = []
+        for handler in handlers:
+            handler(self.get_di())
+
     def _register_handler(self, signalnum: int):
         def wrap_signal(signal_no, stack_frame):
             for handler in self.handlers[signal_no]:
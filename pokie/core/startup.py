@@ -0,0 +1,213 @@
+import json
+import sys
+import threading
+from collections import namedtuple
+from contextlib import contextmanager, nullcontext
+from inspect import isfunction
+from time import perf_counter
+
+from rick.base import Di
+
+from pokie.constants import DI_APP
+
+# boot stages
+BOOT_FACTORIES = "factories"  # run factories
+BOOT_LOAD = "load"  # import module classes
+BOOT_BUILD = "build"  # assemble the service map, events and middleware
+BOOT_INIT = "init"  # build modules and run pre-http hooks
+BOOT_AUTO = "auto"  # database introspection for automatic views
+
+# warmup stages, run in this order
+WARMUP_POOLS = "pools"  # open database and redis pool connections
+WARMUP_SERVICES = "services"  # instantiate declared services
+WARMUP_ROUTES = "routes"  # compile the url map and warm up view classes
+WARMUP_MODULES = "modules"  # run module warmup() hooks
+
+WARMUP_STAGES = [WARMUP_POOLS, WARMUP_SERVICES, WARMUP_ROUTES, WARMUP_MODULES]
+
+# a recorded step; import_time and imports cover python modules imported during the step
+StartupStep = namedtuple(
+    "StartupStep", ["stage", "name", "duration", "import_time", "imports"]
+)
+
+
+class ImportTimer:
+    """
+    Meta path finder that measures the time spent importing python modules
+
+    Specs are resolved by the remaining finders; the loader exec_module() of each spec is timed. Nested imports are
+    counted, but only the outermost import of each thread adds to the import time
+    """
+
+    def __init__(self):
+        self.time = 0.0
+        self.count = 0
+        self._local = threading.local()
+
+    def install(self):
+        if self not in sys.meta_path:
+            sys.meta_path.insert(0, self)
+
+    def uninstall(self):
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+    def find_spec(self, fullname, path=None, target=None):
+        spec = None
+        for finder in list(sys.meta_path):
+            if finder is self:
+                continue
+            find_spec = getattr(finder, "find_spec", None)
+            if find_spec is None:
+                continue
+            spec = find_spec(fullname, path, target)
+            if spec is not None:
+                break
+        if spec is None:
+            return None
+
+        loader = spec.loader
+        exec_module = getattr(type(loader), "exec_module", None)
+        if loader is None or isinstance(loader, type) or not isfunction(exec_module):
+            # no loader, or class-level loaders such as builtin and frozen modules
+            return spec
+
+        timer = self
+        local = self._local
+
+        def timed_exec_module(module):
+            # restore the loader method; the loader may be shared by several modules
+            loader.__dict__.pop("exec_module", None)
+            depth = getattr(local, "depth", 0)
+            local.depth = depth + 1
+            start = perf_counter()
+            try:
+                exec_module(loader, module)
+            finally:
+                local.depth = depth
+                timer.count += 1
+                if depth == 0:
+                    timer.time += perf_counter() - start
+
+        try:
+            loader.exec_module = timed_exec_module
+        except AttributeError:
+            pass
+        return spec
+
+
+class StartupReport:
+    """
+    Records the duration of application startup steps, and the time spent importing python modules on each step
+    """
+
+    def __init__(self):
+        self.entries = []  # list of StartupStep
+        self.errors = {}  # (stage, name): error message
+        self.started = None  # perf_counter() value when startup began
+        self._timer = ImportTimer()
+        self._depth = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def measure(self, stage: str, name: str):
+        """
+        ContextManager to record the duration of a step
+        Steps may be nested; the import timer is active while any step is being measured
+        :param stage: stage name
+        :param name: step name
+        :return:
+        """
+        with self._lock:
+            if self._depth == 0:
+                self._timer.install()
+            self._depth += 1
+
+        timer = self._timer
+        import_time = timer.time
+        imports = timer.count
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.entries.append(
+                StartupStep(
+                    stage,
+                    name,
+                    perf_counter() - start,
+                    timer.time - import_time,
+                    timer.count - imports,
+                )
+            )
+            with self._lock:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._timer.uninstall()
+
+    def start(self):
+        """
+        Mark the beginning of the startup
+        :return:
+        """
+        self.started = perf_counter()
+
+    def elapsed(self) -> float:
+        """
+        Wall time since start(), in seconds
+        :return:
+        """
+        if self.started is None:
+            return 0.0
+        return perf_counter() - self.started
+
+    def totals(self) -> dict:
+        """
+        Total duration per stage
+        Nested steps are also included in the total of their parent stage
+        :return: dict of stage: seconds, in recording order
+        """
+        result = {}
+        for step in self.entries:
+            result[step.stage] = result.get(step.stage, 0.0) + step.duration
+        return result
+
+    def error(self, stage: str, name: str, message: str):
+        self.errors[(stage, name)] = message
+
+    def to_dict(self) -> dict:
+        steps = []
+        for step in self.entries:
+            item = step._asdict()
+            item["error"] = self.errors.get((step.stage, step.name), None)
+            steps.append(item)
+        return {
+            "python": sys.version.split()[0],
+            "elapsed": self.elapsed(),
+            "import_time": self._timer.time,
+            "imports": self._timer.count,
+            "steps": steps,
+            "totals": self.totals(),
+        }
+
+    def to_json(self, **kwargs) -> str:
+        return json.dumps(self.to_dict(), **kwargs)
+
+    def clear(self):
+        self.entries = []
+        self.errors = {}
+        self.started = None
+
+
+def measure(di: Di, stage: str, name: str):
+    """
+    Record a startup step in the application StartupReport, if available
+    :param di:
+    :param stage: stage name
+    :param name: step name
+    :return: ContextManager
+    """
+    if di.has(DI_APP):
+        report = getattr(di.get(DI_APP), "startup", None)
+        if report is not None:
+            return report.measure(stage, name)
+    return nullcontext()
@@ -0,0 +1,272 @@
+import abc
+import os
+import signal
+import traceback
+from time import monotonic, sleep
+
+from pokie.constants import DI_SIGNAL, DI_CONFIG, CFG_JOB_STATE_FILE
+from pokie.core.scheduler import worker_state_file
+from pokie.core.signal_manager import SignalManager
+
+# job distribution policies, declared by jobs in the 'policy' attribute
+JOB_PARTITION = "partition"  # job runs in a single worker process (default)
+JOB_REPLICATE = "replicate"  # job runs in every worker process
+
+
+class ProcessSupervisor(abc.ABC):
+    """
+    Runs and supervises forked worker processes
+
+    Workers that exit unexpectedly are restarted with exponential backoff; on SIGTERM/SIGINT, workers are asked to
+    stop and are given DRAIN_TIMEOUT seconds to finish before being killed. On SIGHUP, workers are replaced: if
+    'rolling' is True, new workers are started before the old ones are stopped; otherwise, each worker is restarted
+    after the previous one exits. Subclasses implement worker()
+    """
+
+    BACKOFF_MIN = 1
+    BACKOFF_MAX = 60
+    # workers that run for at least this long reset their backoff
+    STABLE_TIME = 30
+    DRAIN_TIMEOUT = 60
+    POLL_INTERVAL = 0.2
+
+    # replace workers by starting new ones before stopping the old ones
+    rolling = False
+
+    def __init__(self, app, workers: int, silent: bool = False):
+        """
+        :param app: FlaskApplication
+        :param workers: number of worker processes
+        :param silent:
+        """
+        self.app = app
+        self.workers = workers
+        self.silent = silent
+        self.pids = {}  # pid: worker index
+        self.started = {}  # worker index: monotonic start time
+        self.failures = [0] * workers
+        self.restart_at = {}  # worker index: monotonic time
+        self.retiring = set()  # pids of replaced workers
+        self.draining = False
+        self.reloading = False
+        self._drain_deadline = None
+
+    def start_message(self) -> str:
+        return "\nRunning {} worker processes, press CTRL+C to abort...".format(
+            self.workers
+        )
+
+    def active(self, idx: int) -> bool:
+        """
+        Check if a worker process should be started
+        :param idx: worker index
+        :return:
+        """
+        return True
+
+    @abc.abstractmethod
+    def worker(self, idx: int):
+        """
+        Worker process entrypoint
+        :param idx: worker index
+        :return:
+        """
+        pass
+
+    def run(self) -> bool:
+        signal_manager = self.app.di.get(DI_SIGNAL)
+        signal_manager.add_handler(signal.SIGTERM, self._drain)
+        signal_manager.add_handler(signal.SIGINT, self._drain)
+        signal_manager.add_handler(signal.SIGHUP, self._reload)
+
+        if not self.silent:
+            self.app.tty.write(self.start_message())
+
+        for idx in range(self.workers):
+            if self.active(idx):
+                self.spawn(idx)
+
+        while self.pids or (self.restart_at and not self.draining):
+            if self.reloading:
+                self.reloading = False
+                self.replace()
+            self._reap()
+            now = monotonic()
+            if not self.draining:
+                for idx, when in list(self.restart_at.items()):
+                    if when <= now:
+                        del self.restart_at[idx]
+                        self.spawn(idx)
+            elif now >= self._drain_deadline:
+                for pid in list(self.pids.keys()):
+                    self._kill(pid, signal.SIGKILL)
+            sleep(self.POLL_INTERVAL)
+        return True
+
+    def spawn(self, idx: int):
+        pid = os.fork()
+        if pid == 0:
+            # worker process; never returns
+            code = 1
+            try:
+                self._reset_signals()
+                self.worker(idx)
+                code = 0
+            except BaseException:
+                traceback.print_exc()
+            finally:
+                os._exit(code)
+
+        self.pids[pid] = idx
+        self.started[idx] = monotonic()
+        if not self.silent:
+            self.app.tty.write("Started worker {} (pid {})".format(idx, pid))
+
+    def replace(self):
+        """
+        Replace all running workers
+        :return:
+        """
+        if self.draining:
+            return
+        for pid, idx in list(self.pids.items()):
+            if pid in self.retiring:
+                continue
+            self.retiring.add(pid)
+            if self.rolling:
+                self.spawn(idx)
+            self._kill(pid, signal.SIGTERM)
+
+    def _reset_signals(self):
+        # signal handlers and shutdown hooks belong to the supervisor
+        di = self.app.di
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        signal.signal(signal.SIGHUP, signal.SIG_DFL)
+        di.add(DI_SIGNAL, SignalManager(di), replace=True)
+
+    def _reap(self):
+        while self.pids:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                self.pids = {}
+                return
+            if pid == 0:
+                return
+            idx = self.pids.pop(pid, None)
+            if idx is None:
+                continue
+
+            code = os.waitstatus_to_exitcode(status)
+            if self.draining:
+                continue
+
+            if pid in self.retiring:
+                self.retiring.discard(pid)
+                if not self.rolling:
+                    self.restart_at[idx] = monotonic()
+                continue
+
+            uptime = monotonic() - self.started.get(idx, 0)
+            if uptime >= self.STABLE_TIME:
+                self.failures[idx] = 0
+            self.failures[idx] += 1
+            delay = min(
+                self.BACKOFF_MAX, self.BACKOFF_MIN * 2 ** (self.failures[idx] - 1)
+            )
+            self.restart_at[idx] = monotonic() + delay
+            if not self.silent:
+                self.app.tty.write(
+                    "Worker {} (pid {}) exited with code {}, restarting in {}s".format(
+                        idx, pid, code, delay
+                    )
+                )
+
+    def _reload(self, di, signal_no, stack_frame):
+        # workers are replaced from the main loop, not from the signal handler
+        self.reloading = True
+        if not self.silent:
+            self.app.tty.write("\nSignal received, replacing workers...")
+
+    def _drain(self, di, signal_no, stack_frame):
+        if self.draining:
+            # second signal, stop waiting
+            for pid in list(self.pids.keys()):
+                self._kill(pid, signal.SIGKILL)
+            return
+
+        self.draining = True
+        self._drain_deadline = monotonic() + self.DRAIN_TIMEOUT
+        self.restart_at = {}
+        if not self.silent:
+            self.app.tty.write("\nSignal received, waiting for workers to finish...")
+        for pid in list(self.pids.keys()):
+            self._kill(pid, signal.SIGTERM)
+
+    @staticmethod
+    def _kill(pid: int, signal_no: int):
+        try:
+            os.kill(pid, signal_no)
+        except ProcessLookupError:
+            pass
+
+
+class WorkerSupervisor(ProcessSupervisor):
+    """
+    Runs jobs in multiple forked worker processes
+
+    Jobs are distributed by their 'policy' attribute: partitioned jobs are assigned round-robin to a single worker,
+    and replicated jobs run in every worker. Each worker rebuilds factory resources (database and redis pools)
+    after fork and runs its own JobScheduler
+    """
+
+    def __init__(self, app, job_list: list, workers: int, silent: bool = False):
+        """
+        :param app: FlaskApplication
+        :param job_list: list of (name, job class)
+        :param workers: number of worker processes
+        :param silent:
+        """
+        super().__init__(app, workers, silent)
+        self.assignments = self.assign(job_list, workers)
+
+    @staticmethod
+    def assign(job_list: list, workers: int) -> list:
+        """
+        Distribute jobs across workers
+        :param job_list: list of (name, job class)
+        :param workers:
+        :return: list of job lists, one per worker
+        """
+        result = [[] for _ in range(workers)]
+        idx = 0
+        for name, job in job_list:
+            if getattr(job, "policy", JOB_PARTITION) == JOB_REPLICATE:
+                for jobs in result:
+                    jobs.append((name, job))
+            else:
+                result[idx % workers].append((name, job))
+                idx += 1
+        return result
+
+    def start_message(self) -> str:
+        return "\nRunning jobs in {} worker processes, press CTRL+C to abort...".format(
+            self.workers
+        )
+
+    def active(self, idx: int) -> bool:
+        return len(self.assignments[idx]) > 0
+
+    def worker(self, idx: int):
+        di = self.app.di
+        self.app.rebuild_factories()
+
+        job_list = [(name, job(di)) for name, job in self.assignments[idx]]
+        state_file = worker_state_file(
+            di.get(DI_CONFIG).get(CFG_JOB_STATE_FILE, None), idx
+        )
+        try:
+            self.app.run_scheduler(job_list, silent=True, state_file=state_file)
+        finally:
+            di.get(DI_SIGNAL).shutdown()
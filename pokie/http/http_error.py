@@ -15,6 +15,7 @@ from pokie.constants import (
     HTTP_INTERNAL_ERROR,
     DI_FLASK,
     HTTP_NOT_ALLOWED,
+    HTTP_SERVICE_UNAVAILABLE,
 )
 from .response import JsonResponse
 
@@ -26,6 +27,7 @@ class HttpErrorHandler(Injectable):
         "405 Method Not Allowed: The method is not allowed for the requested URL."
     )
     ERROR_500 = "500 Internal Server Error"
+    ERROR_503 = "503 Service Unavailable"
 
     def __init__(self, di: Di):
         super().__init__(di)
@@ -43,11 +45,15 @@ class HttpErrorHandler(Injectable):
         def wrapper_500(e):
             return self.error_500(_app, e)
 
+        def wrapper_503(e):
+            return self.error_503(_app, e)
+
         # register global error handler
         _app.register_error_handler(400, wrapper_400)
         _app.register_error_handler(404, wrapper_404)
         _app.register_error_handler(405, wrapper_405)
         _app.register_error_handler(500, wrapper_500)
+        _app.register_error_handler(503, wrapper_503)
 
     def error_400(self, _app, e):
         r = self.response(
@@ -73,5 +79,18 @@ class HttpErrorHandler(Injectable):
         )
         return r.assemble(_app)
 
+    def error_503(self, _app, e):
+        headers = None
+        retry_after = getattr(e, "retry_after", None)
+        if retry_after is not None:
+            headers = [("Retry-After", str(retry_after))]
+        r = self.response(
+            error={"message": self.ERROR_503},
+            success=False,
+            code=HTTP_SERVICE_UNAVAILABLE,
+            headers=headers,
+        )
+        return r.assemble(_app)
+
     def response(self, **kwargs):
         return JsonResponse(**kwargs)
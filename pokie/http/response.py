@@ -5,6 +5,9 @@ import humps
 from rick.serializer.json.json import CamelCaseJsonEncoder, ExtendedJsonEncoder
 from pokie.constants import HTTP_OK
 
+# shared JSON encoder instances, by (encoder class, indent)
+_encoders = {}
+
 
 class ResponseRendererInterface:
     def __init__(
@@ -99,16 +102,7 @@ class JsonResponse(ResponseRendererInterface):
         :param _app:
         :return: Response
         """
-        indent = None
-        separators = (",", ":")
-
-        if _app.json.compact or _app.debug:
-            indent = 2
-            separators = (", ", ": ")
-
-        data = json.dumps(
-            self.response, indent=indent, separators=separators, cls=self.serializer()
-        )
+        data = self.encoder(_app.json.compact or _app.debug).encode(self.response)
         return _app.response_class(
             data, status=self.code, mimetype=self.mime_type, headers=self.headers
         )
@@ -120,6 +114,23 @@ class JsonResponse(ResponseRendererInterface):
         """
         return ExtendedJsonEncoder
 
+    def encoder(self, indent: bool = False) -> json.JSONEncoder:
+        """
+        Get a JSON encoder instance for the serializer
+        Encoders are stateless, and are shared by all responses
+        :param indent: if True, output is indented
+        :return:
+        """
+        key = (self.serializer(), bool(indent))
+        encoder = _encoders.get(key, None)
+        if encoder is None:
+            if indent:
+                encoder = key[0](indent=2, separators=(", ", ": "))
+            else:
+                encoder = key[0](separators=(",", ":"))
+            _encoders[key] = encoder
+        return encoder
+
 
 class CamelCaseJsonResponse(JsonResponse):
     def assemble(self, _app, **kwargs):
@@ -128,18 +139,8 @@ class CamelCaseJsonResponse(JsonResponse):
         :param _app:
         :return: Response
         """
-        indent = None
-        separators = (",", ":")
-
-        if _app.json.compact or _app.debug:
-            indent = 2
-            separators = (", ", ": ")
-
-        data = json.dumps(
-            humps.camelize(self.response),
-            indent=indent,
-            separators=separators,
-            cls=self.serializer(),
+        data = self.encoder(_app.json.compact or _app.debug).encode(
+            humps.camelize(self.response)
         )
         return _app.response_class(
             data, status=self.code, mimetype=self.mime_type, headers=self.headers
@@ -1,5 +1,6 @@
 import json
 import logging
+from inspect import iscoroutinefunction
 from typing import Any, Optional, Callable
 from flask import request
 from flask.views import MethodView
@@ -34,22 +35,35 @@ class PokieView(MethodView):
     # if true, responses are camelCased
     camel_case = False
 
+    # response class used when response_class is None, resolved once per view class
+    _default_response_class = JsonResponse
+
+    # handler method name: True if the handler is a coroutine function, resolved once per view class
+    _async_handlers = {}
+
     # default error message
     msg_error_default = "request failed"
 
     # mixin constructors, to be called at the end of __init__
     init_methods = []
 
-    def __init__(self, *args, **kwargs):
-        self.di = current_app.di
-        self.logger = current_app.logger
-
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
         # if no specific response class, use generic one
         # based on camelCase options
+        cls._default_response_class = (
+            CamelCaseJsonResponse if cls.camel_case else JsonResponse
+        )
+        cls._async_handlers = {}
+
+    def __init__(self, *args, **kwargs):
+        app = current_app._get_current_object()
+        self.app = app
+        self.di = app.di
+        self.logger = app.logger
+
         if self.response_class is None:
-            self.response_class = (
-                CamelCaseJsonResponse if self.camel_case else JsonResponse
-            )
+            self.response_class = self._default_response_class
 
         # methods where automatic body deserialization is attempted
         #
@@ -156,20 +170,34 @@ class PokieView(MethodView):
         assert handler is not None, "Cannot resolve handler method for dispatch"
 
         try:
-            # run pre-dispatch hooks
-            hook_list = self.dispatch_hooks
-            hook_list.extend(self.internal_hooks)  # add system hooks
-            for name in hook_list:
-                hook = getattr(self, name, None)
-                assert hook is not None, f"non-existing dispatch hook {name!r}"
-                pre = hook(method, *args, **kwargs)
-                if pre is not None:
-                    return pre
-
-            return current_app.ensure_sync(handler)(*args, **kwargs)
+            # run pre-dispatch hooks, followed by system hooks
+            for hook_list in (self.dispatch_hooks, self.internal_hooks):
+                for name in hook_list:
+                    hook = getattr(self, name, None)
+                    assert hook is not None, f"non-existing dispatch hook {name!r}"
+                    pre = hook(method, *args, **kwargs)
+                    if pre is not None:
+                        return pre
+
+            return self.ensure_sync(handler)(*args, **kwargs)
         except Exception as e:
             return self.exception_handler(e)
 
+    def ensure_sync(self, handler: Callable) -> Callable:
+        """
+        Flask ensure_sync() variant that inspects each handler method once per view class
+        :param handler: bound handler method
+        :return: Callable
+        """
+        name = handler.__name__
+        is_async = self._async_handlers.get(name, None)
+        if is_async is None:
+            is_async = iscoroutinefunction(handler)
+            self._async_handlers[name] = is_async
+        if is_async:
+            return self.app.ensure_sync(handler)
+        return handler
+
     @classmethod
     def view_method(
         cls, action_method: str, name=None, *class_args: Any, **class_kwargs: Any
@@ -192,7 +220,7 @@ class PokieView(MethodView):
             self = view.view_class(*class_args, **class_kwargs)  # type: ignore
             # add the action method to the dispatch arguments
             kwargs["_action_method_"] = action_method
-            return current_app.ensure_sync(self.dispatch_request)(*args, **kwargs)
+            return self.ensure_sync(self.dispatch_request)(*args, **kwargs)
 
         if cls.decorators:
             view.__name__ = name
@@ -213,6 +241,16 @@ class PokieView(MethodView):
         view.provide_automatic_options = cls.provide_automatic_options  # type: ignore
         return view
 
+    @classmethod
+    def warmup(cls, di):
+        """
+        Prepare the view class to serve requests, eg. resolve services
+        Called once per process, for each routed view class, during application warmup
+        :param di:
+        :return:
+        """
+        pass
+
     def exception_handler(self, e) -> ResponseReturnValue:
         """
         Generic exception handler for dispatch
@@ -231,7 +269,7 @@ class PokieView(MethodView):
         :return: Response
         """
         cls = self.response_class(data=data, success=True, code=code)
-        return cls.assemble(current_app)
+        return cls.assemble(self.app)
 
     def success_message(self, message: str):
         """
@@ -254,7 +292,7 @@ class PokieView(MethodView):
             message = self.msg_error_default
 
         cls = self.response_class(error={"message": message}, success=False, code=code)
-        return cls.assemble(current_app)
+        return cls.assemble(self.app)
 
     def request_error(self, request_object: RequestRecord, code=HTTP_BADREQ):
         """
@@ -269,7 +307,7 @@ class PokieView(MethodView):
             "formError": request_object.get_errors(),
         }
         cls = self.response_class(error=error, success=False, code=code)
-        return cls.assemble(current_app)
+        return cls.assemble(self.app)
 
     def empty_body(self):
         """
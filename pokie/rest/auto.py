@@ -11,6 +11,7 @@ import pokie.codegen.pg
 from pokie.codegen import RequestGenerator
 from pokie.codegen.pg import PgTableSpec
 from pokie.constants import DI_DB
+from pokie.core.startup import measure, BOOT_AUTO
 from pokie.http import PokieView, AutoRouter
 
 from pokie.rest import RestView
@@ -86,16 +87,17 @@ class Auto:
         if not schema:
             schema = PgInfo.SCHEMA_DEFAULT
 
-        db = app.di.get(DI_DB)
-        info = PgInfo(db)
-        if not info.table_exists(table_name, schema=schema):
-            raise ValueError(
-                "Auto.view(): table name '{}' not found in schema '{}'".format(
-                    table_name, schema
+        with measure(app.di, BOOT_AUTO, "{}.{}".format(schema, table_name)):
+            db = app.di.get(DI_DB)
+            info = PgInfo(db)
+            if not info.table_exists(table_name, schema=schema):
+                raise ValueError(
+                    "Auto.view(): table name '{}' not found in schema '{}'".format(
+                        table_name, schema
+                    )
                 )
-            )
 
-        spec = PgTableSpec(db).generate(table_name, schema)
+            spec = PgTableSpec(db).generate(table_name, schema)
         if search_fields is None:
             search_fields = [
                 f.name for f in spec.fields if f.dtype in ["varchar", "text"]
@@ -201,9 +203,11 @@ class Auto:
 
             # found a table name, lets assume it is actually a db table
             if table:
-                pg_spec = PgTableSpec(di.get(DI_DB))
-                spec = pg_spec.generate(table, schema)
-                return RequestGenerator().generate_class(spec)
+                name = "{}.{}".format(schema, table) if schema else table
+                with measure(di, BOOT_AUTO, name):
+                    pg_spec = PgTableSpec(di.get(DI_DB))
+                    spec = pg_spec.generate(table, schema)
+                    return RequestGenerator().generate_class(spec)
         return None
 
     @staticmethod
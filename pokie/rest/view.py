@@ -84,24 +84,39 @@ class RestView(PokieView):
 
     @property
     def svc(self) -> RestService:
-        mgr = self.di.get(DI_SERVICES)
-        if not self.service_name:
+        return self.rest_service(self.di)
+
+    @classmethod
+    def rest_service(cls, di) -> RestService:
+        """
+        Resolve the view service
+        If no service_name is specified, a RestService for record_class is built and registered on first use
+        :param di:
+        :return: RestService
+        """
+        mgr = di.get(DI_SERVICES)
+        if not cls.service_name:
             svc_name = "svc.rest.{}.{}".format(
-                self.__module__,
-                str(self.record_class.__name__).replace("Record", "", 1),
+                cls.__module__,
+                str(cls.record_class.__name__).replace("Record", "", 1),
             )
             if mgr.contains(svc_name):
                 return mgr.get(svc_name)
 
             # build service
-            svc = RestService(self.di)
-            svc.set_record_class(self.record_class)
+            svc = RestService(di)
+            svc.set_record_class(cls.record_class)
 
             # register it in the service manager
             mgr.register(svc_name, svc)
             return svc
 
-        svc = mgr.get(self.service_name)
+        svc = mgr.get(cls.service_name)
         if not isinstance(svc, RestServiceMixin):
             raise RuntimeError("Service '{}' does not implement RestService mixin")
         return svc
+
+    @classmethod
+    def warmup(cls, di):
+        if cls.record_class is not None or cls.service_name:
+            cls.rest_service(di)
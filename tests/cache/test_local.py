@@ -0,0 +1,79 @@
+from pokie.cache import LocalCache
+import pokie.cache.local as local_module
+
+
+class TestLocalCache:
+
+    def test_cache(self):
+        cache = LocalCache()
+        key = "key1"
+        assert cache.has(key) is False
+        assert cache.get(key) is None
+        cache.set(key, "value")
+        assert cache.has(key) is True
+        assert cache.get(key) == "value"
+        assert len(cache) == 1
+
+        cache.remove(key)
+        assert cache.has(key) is False
+        assert len(cache) == 0
+
+        cache.set("a", 1)
+        cache.set("b", 2)
+        assert len(cache) == 2
+        cache.purge()
+        assert len(cache) == 0
+        assert cache.get("a") is None
+
+    def test_lru_eviction(self):
+        cache = LocalCache(max_size=3)
+        for key in ["a", "b", "c"]:
+            cache.set(key, key)
+        assert len(cache) == 3
+
+        # touch "a", so "b" becomes the least recently used entry
+        assert cache.get("a") == "a"
+        cache.set("d", "d")
+        assert len(cache) == 3
+        assert cache.get("b") is None
+        assert cache.get("a") == "a"
+        assert cache.get("c") == "c"
+        assert cache.get("d") == "d"
+
+        # overwriting an existing key does not evict
+        cache.set("c", "c2")
+        assert len(cache) == 3
+        assert cache.get("c") == "c2"
+
+    def test_ttl_expiry(self, monkeypatch):
+        now = [1000.0]
+        monkeypatch.setattr(local_module, "monotonic", lambda: now[0])
+
+        cache = LocalCache(ttl=10)
+        cache.set("default", 1)
+        cache.set("short", 2, ttl=1)
+        cache.set("long", 3, ttl=100)
+
+        now[0] += 5
+        assert cache.get("short") is None
+        assert cache.get("default") == 1
+        assert cache.get("long") == 3
+        # expired entries are dropped on read
+        assert len(cache) == 2
+
+        now[0] += 10
+        assert cache.has("default") is False
+        assert cache.get("long") == 3
+
+        now[0] += 100
+        assert cache.get("long") is None
+        assert len(cache) == 0
+
+    def test_no_ttl(self, monkeypatch):
+        now = [1000.0]
+        monkeypatch.setattr(local_module, "monotonic", lambda: now[0])
+
+        cache = LocalCache()
+        cache.set("key", "value")
+        now[0] += 1e9
+        assert cache.get("key") == "value"
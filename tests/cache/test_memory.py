@@ -1,3 +1,5 @@
+import threading
+
 from pokie.cache import MemoryCache
 
 
@@ -17,3 +19,27 @@ class TestMemoryCache:
         record = cache.get(key)
         assert record is not None
         assert record["key"] == "value"
+
+    def test_counter(self, pokie_di):
+        cache = MemoryCache(pokie_di)
+        key = "counter1"
+        assert cache.get_counter(key) == 0
+        assert cache.incr(key) == 1
+        assert cache.incr(key, 2) == 3
+        assert cache.get_counter(key) == 3
+
+    def test_concurrent_incr(self, pokie_di):
+        cache = MemoryCache(pokie_di)
+        key = "counter1"
+
+        def worker():
+            for _ in range(1000):
+                cache.incr(key)
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        # no increments are lost
+        assert cache.get_counter(key) == 8000
@@ -1,6 +1,8 @@
 import pytest
 
 from pokie.cache import MemoryCache, RedisCache
+from pokie.constants import DI_REDIS
+from pokie.core.factories.redis import parse_bool, redis_pool_stats
 
 
 @pytest.fixture
@@ -23,3 +25,29 @@ class TestRedisCache:
         record = redis_cache.get(key)
         assert record is not None
         assert record["key"] == "value"
+
+    def test_counter(self, redis_cache):
+        key = "counter1"
+        assert redis_cache.get_counter(key) == 0
+        assert redis_cache.incr(key) == 1
+        assert redis_cache.incr(key, 2) == 3
+        assert redis_cache.get_counter(key) == 3
+        redis_cache.remove(key)
+
+    def test_pool_stats(self, pokie_di, redis_cache):
+        redis_cache.set("key2", 1)
+        stats = redis_pool_stats(pokie_di.get(DI_REDIS))
+        assert stats["max_connections"] > 0
+        assert stats["created"] >= 1
+        assert stats["in_use"] == 0
+        assert 0 <= stats["saturation"] <= 1
+        redis_cache.remove("key2")
+
+
+class TestRedisFactory:
+
+    def test_parse_bool(self):
+        for value in [True, 1, "1", "true", "True", "yes", "on", " true "]:
+            assert parse_bool(value) is True
+        for value in [False, 0, None, "", "0", "false", "False", "no", "off"]:
+            assert parse_bool(value) is False
@@ -134,6 +134,77 @@ class TestAclService:
         resource_list = svc_role.get_user_resources(user.id)
         assert len(resource_list) == 0
 
+    def test_user_acl(self, pokie_service_manager):
+        svc_role = pokie_service_manager.get(SVC_ACL)  # type: AclService
+        svc_user = pokie_service_manager.get(SVC_USER)  # type: UserService
+
+        id_role = svc_role.add_role("role 1")
+        res1 = AclResourceRecord(id="resource:foo", description="resource foo")
+        svc_role.resource_repository.insert_pk(res1)
+        svc_role.add_role_resource(id_role, res1.id)
+
+        user = UserRecord(username="user1", password="")
+        user.id = svc_user.add_user(user)
+        svc_role.add_user_role(user.id, id_role)
+
+        acl = svc_role.get_user_acl(user.id)
+        assert isinstance(acl.resources, frozenset)
+        assert acl.has_role(id_role)
+        assert acl.can_access(res1.id)
+        assert acl.can_access("resource:bar") is False
+
+        # compiled acl is reused while the acl version does not change
+        assert svc_role.get_user_acl(user.id) is acl
+
+        # any acl change triggers a rebuild
+        svc_role.remove_role_resource(id_role, res1.id)
+        acl = svc_role.get_user_acl(user.id)
+        assert acl.can_access(res1.id) is False
+        assert acl.has_role(id_role)
+
+    def test_acl_snapshot(self, pokie_service_manager):
+        svc_role = pokie_service_manager.get(SVC_ACL)  # type: AclService
+
+        id_role1 = svc_role.add_role("role 1")
+        id_role2 = svc_role.add_role("role 2")
+        res1 = AclResourceRecord(id="resource:foo", description="resource foo")
+        res2 = AclResourceRecord(id="resource:bar", description="resource bar")
+        res3 = AclResourceRecord(id="resource:baz", description="resource baz")
+        for res in [res1, res2, res3]:
+            svc_role.resource_repository.insert_pk(res)
+        svc_role.add_role_resource(id_role1, res1.id)
+        svc_role.add_role_resource(id_role2, res1.id)
+        svc_role.add_role_resource(id_role2, res2.id)
+
+        snapshot = svc_role.get_snapshot()
+        assert snapshot.version == svc_role.get_version()
+        assert len(snapshot.resources) == 3
+        assert snapshot.resource_ids([id_role1]) == frozenset([res1.id])
+        assert snapshot.resource_ids([id_role1, id_role2]) == frozenset(
+            [res1.id, res2.id]
+        )
+        assert len(snapshot.resource_ids([])) == 0
+        resources = snapshot.resolve([id_role2])
+        assert resources[res2.id].description == res2.description
+
+        # snapshot is reused until the acl changes
+        assert svc_role.get_snapshot() is snapshot
+        svc_role.remove_role_resource(id_role2, res2.id)
+        snapshot = svc_role.get_snapshot()
+        assert snapshot.resource_ids([id_role2]) == frozenset([res1.id])
+
+    def test_db_version(self, pokie_di, pokie_service_manager):
+        svc_role = pokie_service_manager.get(SVC_ACL)  # type: AclService
+        # a second service simulates another process
+        other = AclService(pokie_di)
+        assert svc_role.db_version is True
+        other.check_interval = 0
+
+        version = other.get_version()
+        svc_role.add_role("role 1")
+        # without a shared cache, the change version is read from the database
+        assert other.get_version() == version + 1
+
 
 class TestCachedAclService(TestAclService):
     def test_cached_acl_role(self, pokie_di, pokie_service_manager):
@@ -143,3 +214,39 @@ class TestCachedAclService(TestAclService):
     def test_cached_acl_resources(self, pokie_di, pokie_service_manager):
         pokie_di.add(DI_CACHE, MemoryCache)
         self.test_acl_resources(pokie_service_manager)
+
+    def test_cached_acl_generation(self, pokie_di, pokie_service_manager):
+        pokie_di.add(DI_CACHE, MemoryCache)
+        svc_role = pokie_service_manager.get(SVC_ACL)  # type: AclService
+        svc_user = pokie_service_manager.get(SVC_USER)  # type: UserService
+
+        role1 = svc_role.get_role(svc_role.add_role("role 1"))
+        res1 = AclResourceRecord(id="resource:foo", description="resource foo")
+        svc_role.resource_repository.insert_pk(res1)
+        svc_role.add_role_resource(role1.id, res1.id)
+
+        user = UserRecord(username="user1", password="")
+        user.id = svc_user.add_user(user)
+        svc_role.add_user_role(user.id, role1.id)
+        assert res1.id in svc_role.get_user_resources(user.id).keys()
+
+        # changing role resources bumps the role generation only
+        gen = svc_role.get_generation()
+        role_gen = svc_role.get_role_generation(role1.id)
+        svc_role.remove_role_resource(role1.id, res1.id)
+        assert svc_role.get_generation() == gen
+        assert svc_role.get_role_generation(role1.id) == role_gen + 1
+        assert len(svc_role.get_user_resources(user.id)) == 0
+
+        # truncating role users bumps the global generation
+        svc_role.truncate_role_users(role1.id)
+        assert svc_role.get_generation() == gen + 1
+        assert len(svc_role.get_user_roles(user.id)) == 0
+
+    def test_cached_user_acl(self, pokie_di, pokie_service_manager):
+        pokie_di.add(DI_CACHE, MemoryCache)
+        self.test_user_acl(pokie_service_manager)
+
+    def test_cached_acl_snapshot(self, pokie_di, pokie_service_manager):
+        pokie_di.add(DI_CACHE, MemoryCache)
+        self.test_acl_snapshot(pokie_service_manager)
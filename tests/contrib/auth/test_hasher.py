@@ -0,0 +1,57 @@
+import threading
+import time
+
+import pytest
+from rick.crypto.hasher.bcrypt import BcryptHasher
+
+from pokie.contrib.auth.hasher import PooledHasher, HasherBusyError
+from pokie.core.metrics import MetricsRegistry
+
+
+class SlowHasher(BcryptHasher):
+    def __init__(self):
+        super().__init__(rounds=4)
+        self.release = threading.Event()
+
+    def is_valid(self, password: str, pw_hash: str) -> bool:
+        self.release.wait(5)
+        return super().is_valid(password, pw_hash)
+
+
+class TestPooledHasher:
+    def test_hasher(self):
+        metrics = MetricsRegistry()
+        hasher = PooledHasher(BcryptHasher(rounds=4), 2, 4, metrics)
+        pw_hash = hasher.hash("somePassword")
+        assert hasher.is_valid("somePassword", pw_hash) is True
+        assert hasher.is_valid("otherPassword", pw_hash) is False
+        assert hasher.need_rehash(pw_hash) is False
+        assert hasher.latency.count == 3
+        assert hasher.queue_depth.value == 0
+        hasher.shutdown()
+
+    def test_busy(self):
+        slow = SlowHasher()
+        pw_hash = slow.hash("somePassword")
+        hasher = PooledHasher(slow, 1, 1)
+
+        # fill the worker and the queue
+        threads = [
+            threading.Thread(target=hasher.is_valid, args=["somePassword", pw_hash])
+            for _ in range(2)
+        ]
+        for t in threads:
+            t.start()
+        while hasher.queue_depth.value < 2:
+            time.sleep(0.01)
+
+        with pytest.raises(HasherBusyError):
+            hasher.is_valid("somePassword", pw_hash)
+        assert hasher.rejected.value == 1
+
+        slow.release.set()
+        for t in threads:
+            t.join()
+        assert hasher.queue_depth.value == 0
+        assert hasher.is_valid("somePassword", pw_hash) is True
+        hasher.shutdown()
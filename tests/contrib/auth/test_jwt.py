@@ -0,0 +1,137 @@
+from datetime import datetime, timezone, timedelta
+from time import time
+
+import pytest
+from rick.base import Container, Di
+
+from pokie.constants import DI_CONFIG
+from pokie.contrib.auth.constants import SVC_USER
+from pokie.contrib.auth.dto import UserRecord, JwtRevokedRecord
+from pokie.contrib.auth.jwt import jwt_encode, jwt_decode, RevocationList, JWT_REFRESH
+from pokie.contrib.auth.provider import JWTProvider
+from pokie.contrib.auth.repository import JwtRevokedRepository
+
+
+class TestJwt:
+    secret = b"some_secret"
+
+    def test_encode_decode(self):
+        claims = {"sub": "1", "jti": "abc", "exp": int(time()) + 60, "roles": [1, 2]}
+        token = jwt_encode(claims, self.secret)
+        assert len(token.split(".")) == 3
+        assert jwt_decode(token, self.secret) == claims
+
+        # invalid secret
+        assert jwt_decode(token, b"other_secret") is None
+
+        # tampered payload
+        other = jwt_encode(dict(claims, sub="2"), self.secret)
+        header, _, signature = token.split(".")
+        forged = ".".join([header, other.split(".")[1], signature])
+        assert jwt_decode(forged, self.secret) is None
+
+        # malformed tokens
+        for value in ["", "abc", "a.b.c", token + "."]:
+            assert jwt_decode(value, self.secret) is None
+
+        # expired token
+        expired = jwt_encode(dict(claims, exp=int(time()) - 1), self.secret)
+        assert jwt_decode(expired, self.secret) is None
+
+    def test_revocation_list(self):
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        rows = [
+            JwtRevokedRecord(
+                id=1, jti="a", expires=now + timedelta(minutes=5), created=now
+            ),
+            JwtRevokedRecord(
+                id=2, jti="b", expires=now - timedelta(minutes=5), created=now
+            ),
+        ]
+        revoked = RevocationList()
+        revoked.load(rows)
+        assert "a" in revoked
+        assert "b" in revoked
+
+        revoked.prune(time())
+        assert "a" in revoked
+        assert "b" not in revoked
+        assert len(revoked) == 1
+
+    def test_revocation_window(self):
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        expires = now + timedelta(minutes=5)
+        committed = [JwtRevokedRecord(id=2, jti="b", expires=expires, created=now)]
+
+        class Repository:
+            def __init__(self):
+                self.since = []
+
+            def find_since(self, since, utc_now):
+                self.since.append(since)
+                return [r for r in committed if since is None or r.created >= since]
+
+        repo = Repository()
+        revoked = RevocationList(margin=60)
+        revoked.refresh(repo, True)
+        assert repo.since == [None]
+        assert "b" in revoked
+
+        # a row with a lower id, from a transaction started earlier, commits after the refresh
+        committed.append(
+            JwtRevokedRecord(
+                id=1, jti="a", expires=expires, created=now - timedelta(seconds=1)
+            )
+        )
+        last_refresh = revoked.last_refresh
+        revoked.refresh(repo, True)
+        assert repo.since[1] == last_refresh - timedelta(seconds=60)
+        assert "a" in revoked
+        assert len(revoked) == 2
+        # rows in the overlap window are loaded once
+        assert sorted(revoked._window.keys()) == [1, 2]
+
+    def test_secret(self):
+        # a signing secret must be configured
+        di = Di()
+        di.add(DI_CONFIG, Container({}))
+        with pytest.raises(RuntimeError):
+            JWTProvider(di)
+
+    def test_provider(self, pokie_di, pokie_service_manager, pokie_db):
+        svc_user = pokie_service_manager.get(SVC_USER)
+        record = UserRecord(username="user1", password=svc_user.hasher.hash("pwd"))
+        svc_user.add_user(record)
+
+        provider = JWTProvider(pokie_di)
+        assert provider.login("user1", "invalid") is None
+        user = provider.login("user1", "pwd")
+        assert user is not None
+
+        claims = provider.verify(user.access_token)
+        assert claims is not None
+        assert int(claims["sub"]) == user.id
+        # access and refresh tokens are not interchangeable
+        assert provider.verify(user.refresh_token) is None
+        assert provider.verify(user.access_token, JWT_REFRESH) is None
+
+        # refresh rotates the refresh token
+        tokens = provider.refresh(user.refresh_token)
+        assert tokens is not None
+        assert provider.refresh(user.refresh_token) is None
+        assert provider.verify(tokens["access"]) is not None
+
+        # revoked tokens are visible to other workers after a refresh of the revocation list
+        assert provider.revoke(tokens["access"]) is True
+        assert provider.verify(tokens["access"]) is None
+        other = JWTProvider(pokie_di)
+        other.revoked.refresh(JwtRevokedRepository(pokie_db), force=True)
+        assert other.verify(tokens["access"]) is None
+        assert other.verify(user.access_token) is not None
+
+        # a refresh token is single-use, even if another worker has not seen its revocation yet
+        stale = JWTProvider(pokie_di)
+        stale.revoked.refresh(JwtRevokedRepository(pokie_db), force=True)
+        assert other.refresh(tokens["refresh"]) is not None
+        assert stale.verify(tokens["refresh"], JWT_REFRESH) is not None
+        assert stale.refresh(tokens["refresh"]) is None
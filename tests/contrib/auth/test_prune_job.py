@@ -0,0 +1,47 @@
+from datetime import datetime, timezone, timedelta
+
+from pokie.constants import DI_METRICS
+from pokie.contrib.auth.constants import SVC_USER, METRIC_PRUNE_REMOVED
+from pokie.contrib.auth.dto import UserRecord, JwtRevokedRecord
+from pokie.contrib.auth.job import TokenPruneJob
+from pokie.contrib.auth.repository import JwtRevokedRepository
+
+
+class TestTokenPruneJob:
+    def test_prune(self, pokie_di, pokie_service_manager, pokie_db):
+        svc_user = pokie_service_manager.get(SVC_USER)
+        user = UserRecord(username="user1", password="")
+        user.id = svc_user.add_user(user)
+
+        earlier = datetime.now(timezone.utc) - timedelta(minutes=10)
+        later = datetime.now(timezone.utc) + timedelta(minutes=10)
+        for _ in range(5):
+            svc_user.add_user_token(user.id, earlier)
+        valid, _ = svc_user.add_user_token(user.id, later)
+
+        repo = JwtRevokedRepository(pokie_db)
+        for i, expires in enumerate([earlier, earlier, earlier, later]):
+            repo.insert(
+                JwtRevokedRecord(
+                    jti="jti{}".format(i),
+                    expires=expires.replace(tzinfo=None),
+                )
+            )
+
+        removed = pokie_di.get(DI_METRICS).counter(METRIC_PRUNE_REMOVED)
+        count = removed.value
+        job = TokenPruneJob(pokie_di)
+        job.batch_size = 2
+        job.batch_delay = 0
+        assert job.prune() == 8
+        assert removed.value - count == 8
+
+        tokens = svc_user.list_user_tokens(user.id)
+        assert len(tokens) == 1
+        assert tokens[0].id == valid.id
+        assert len(repo.fetch_all()) == 1
+
+        # nothing left to prune
+        assert job.schedule == job.interval
+        job.run(pokie_di)
+        assert job.prune() == 0
@@ -0,0 +1,46 @@
+from pokie.constants import DI_FLASK
+from pokie.contrib.auth.constants import SVC_USER, SVC_ACL
+from pokie.contrib.auth.dto import UserRecord, AclResourceRecord
+from pokie.contrib.auth.provider import SessionProvider
+from pokie.contrib.auth.provider.session_provider import SessionUser
+
+
+class TestSessionProvider:
+    def test_session_acl(self, pokie_di, pokie_service_manager):
+        svc_user = pokie_service_manager.get(SVC_USER)
+        svc_acl = pokie_service_manager.get(SVC_ACL)
+
+        record = UserRecord(username="user1", password=svc_user.hasher.hash("pwd"))
+        record.id = svc_user.add_user(record)
+        id_role = svc_acl.add_role("role1")
+        svc_acl.resource_repository.insert_pk(
+            AclResourceRecord(id="res1", description="resource 1")
+        )
+        svc_acl.add_role_resource(id_role, "res1")
+        svc_acl.add_user_role(record.id, id_role)
+
+        provider = SessionProvider(pokie_di)
+        provider.session_acl = True
+        app = pokie_di.get(DI_FLASK)
+        load_user = app.login_manager._user_callback
+
+        with app.test_request_context():
+            user = provider.login("user1", "pwd")
+            assert user is not None
+            assert user.can_access("res1")
+
+            # user is restored from the session snapshot
+            user = load_user(str(record.id))
+            assert isinstance(user, SessionUser)
+            assert user.can_access("res1")
+            assert user.has_role(id_role)
+            assert user.record.username == "user1"
+
+            # acl changes invalidate the snapshot
+            svc_acl.remove_role_resource(id_role, "res1")
+            svc_acl._version_expires = 0
+            user = load_user(str(record.id))
+            assert not isinstance(user, SessionUser)
+            assert not user.can_access("res1")
+
+            provider.logout()
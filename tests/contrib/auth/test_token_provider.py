@@ -0,0 +1,112 @@
+from datetime import datetime, timezone, timedelta
+
+from flask import request
+
+from pokie.constants import DI_FLASK
+from pokie.contrib.auth.constants import SVC_USER, SVC_ACL
+from pokie.contrib.auth.dto import UserRecord, AclResourceRecord
+from pokie.contrib.auth.provider import TokenProvider
+from pokie.contrib.auth.service import UserService
+
+
+class TestTokenProvider:
+    def setup_user(self, pokie_service_manager) -> int:
+        svc_user = pokie_service_manager.get(SVC_USER)
+        svc_acl = pokie_service_manager.get(SVC_ACL)
+
+        record = UserRecord(username="user1", password=svc_user.hasher.hash("pwd"))
+        record.id = svc_user.add_user(record)
+        id_role = svc_acl.add_role("role1")
+        for id_resource in ["res1", "res2"]:
+            svc_acl.resource_repository.insert_pk(
+                AclResourceRecord(id=id_resource, description=id_resource)
+            )
+        svc_acl.add_role_resource(id_role, "res1")
+        svc_acl.add_user_role(record.id, id_role)
+        return id_role
+
+    def get_user(self, pokie_di, provider: TokenProvider, token: str):
+        app = pokie_di.get(DI_FLASK)
+        headers = {"Authorization": "Bearer {}".format(token)}
+        with app.test_request_context(headers=headers):
+            return provider.get_user(request)
+
+    def test_login(self, pokie_di, pokie_service_manager):
+        self.setup_user(pokie_service_manager)
+        svc_user = pokie_service_manager.get(SVC_USER)
+        provider = TokenProvider(pokie_di)
+
+        assert provider.login("user1", "invalid") is None
+        user = provider.login("user1", "pwd")
+        assert user is not None
+        assert user.can_access("res1")
+        # only the token hash is stored
+        token = svc_user.get_token(user.token)
+        assert token is not None
+        assert token.token != user.token
+        assert token.expires is not None
+
+    def test_get_user(self, pokie_di, pokie_service_manager, monkeypatch):
+        self.setup_user(pokie_service_manager)
+        svc_user = pokie_service_manager.get(SVC_USER)
+        provider = TokenProvider(pokie_di)
+        token = provider.login("user1", "pwd").token
+
+        user = self.get_user(pokie_di, provider, token)
+        assert user is not None
+        assert user.record.username == "user1"
+        assert user.can_access("res1")
+
+        # cached lookups do not use the user service
+        def fail(token):
+            raise AssertionError("token lookup not cached")
+
+        monkeypatch.setattr(svc_user, "get_user_by_token", fail)
+        user = self.get_user(pokie_di, provider, token)
+        assert user.record.username == "user1"
+        monkeypatch.undo()
+
+        # unknown tokens are cached as negative entries
+        assert self.get_user(pokie_di, provider, "invalid") is None
+        key = UserService.hash_token("invalid")
+        assert provider.local_cache.get(key) is TokenProvider.NEGATIVE_MARKER
+
+        # malformed headers are ignored
+        app = pokie_di.get(DI_FLASK)
+        with app.test_request_context(headers={"Authorization": token}):
+            assert provider.get_user(request) is None
+
+    def test_acl_version(self, pokie_di, pokie_service_manager):
+        id_role = self.setup_user(pokie_service_manager)
+        svc_acl = pokie_service_manager.get(SVC_ACL)
+        provider = TokenProvider(pokie_di)
+        token = provider.login("user1", "pwd").token
+
+        user = self.get_user(pokie_di, provider, token)
+        assert user.can_access("res2") is False
+
+        # cached entries are rebuilt when the acl version changes
+        svc_acl.add_role_resource(id_role, "res2")
+        user = self.get_user(pokie_di, provider, token)
+        assert user.can_access("res2")
+        _, acl = provider.local_cache.get(UserService.hash_token(token))
+        assert acl.version == svc_acl.get_version()
+
+    def test_revoke(self, pokie_di, pokie_service_manager):
+        self.setup_user(pokie_service_manager)
+        svc_user = pokie_service_manager.get(SVC_USER)
+        provider = TokenProvider(pokie_di)
+        token = provider.login("user1", "pwd").token
+        assert self.get_user(pokie_di, provider, token) is not None
+
+        provider.logout(token=token)
+        assert svc_user.get_token(token).active is False
+        assert self.get_user(pokie_di, provider, token) is None
+
+        # revoking an expired token
+        expires = datetime.now(timezone.utc) - timedelta(minutes=1)
+        token = provider.login("user1", "pwd", expires=expires).token
+        assert self.get_user(pokie_di, provider, token) is None
+        record = svc_user.get_token(token)
+        assert provider.revoke(record.id) is True
+        assert provider.revoke(0) is False
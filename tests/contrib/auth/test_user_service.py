@@ -5,8 +5,12 @@ import pytest
 from psycopg2.errors import UniqueViolation
 
 from pokie.cache.memory import MemoryCache
-from pokie.constants import DI_CACHE
-from pokie.contrib.auth.constants import SVC_USER
+from pokie.constants import DI_CACHE, DI_METRICS
+from pokie.contrib.auth.constants import (
+    SVC_USER,
+    METRIC_USERNAME_MISS,
+    METRIC_TOKEN_MISS,
+)
 from pokie.contrib.auth.dto import UserRecord
 from pokie.contrib.auth.service import UserService
 
@@ -56,6 +60,10 @@ class TestUserService:
         invalid_user = svc_user.authenticate(user1.username, "someInvalidPassword")
         assert invalid_user is None
 
+        # last_login is written inline by default
+        record = svc_user.get_by_id(user1.id)
+        assert record.last_login is not None
+
         # test load_id and sanitization
         record = svc_user.load_id(user1.id)
         assert record is not None
@@ -83,16 +91,21 @@ class TestUserService:
         user2.id = svc_user.add_user(user2)
 
         # create tokens
-        tok1 = svc_user.add_user_token(user1.id)
+        tok1, token1 = svc_user.add_user_token(user1.id)
         assert tok1 is not None
-        assert len(tok1.token) > 0
+        assert len(token1) > 0
         assert tok1.expires is None
         assert tok1.user == user1.id
         assert tok1.active == True
+        # only the token hash is stored
+        stored = svc_user.user_token_repository.fetch_pk(tok1.id)
+        assert stored.token != token1
+        assert stored.token == svc_user.hash_token(token1)
+        assert tok1.token == stored.token
         later = datetime.now(timezone.utc) + timedelta(minutes=10)
-        tok2 = svc_user.add_user_token(user2.id, later)
+        tok2, token2 = svc_user.add_user_token(user2.id, later)
         assert tok2 is not None
-        assert len(tok2.token) > 0
+        assert len(token2) > 0
         assert tok2.expires is not None
         assert tok2.user == user2.id
         assert tok2.active == True
@@ -103,10 +116,10 @@ class TestUserService:
             assert user is None
 
         # find user from existing token
-        user = svc_user.get_user_by_token(tok1.token)
+        user = svc_user.get_user_by_token(token1)
         assert user is not None
         assert user.id == user1.id
-        user = svc_user.get_user_by_token(tok2.token)
+        user = svc_user.get_user_by_token(token2)
         assert user is not None
         assert user.id == user2.id
 
@@ -115,9 +128,9 @@ class TestUserService:
         assert svc_user.disable_user_token(tok1.id) is True
 
         # token inactive, should fail
-        user = svc_user.get_user_by_token(tok1.token)
+        user = svc_user.get_user_by_token(token1)
         assert user is None
-        tok = svc_user.get_token(tok1.token)
+        tok = svc_user.get_token(token1)
         assert tok.active is False
 
         # list tokens
@@ -126,16 +139,16 @@ class TestUserService:
         assert token_list[0].user == user2.id
 
         # remove token
-        user = svc_user.get_user_by_token(tok2.token)
+        user = svc_user.get_user_by_token(token2)
         assert user is not None
         svc_user.remove_user_token(tok2.id)
-        user = svc_user.get_user_by_token(tok2.token)
+        user = svc_user.get_user_by_token(token2)
         assert user is None
 
         # add a new token, force expiry
         later = datetime.now(timezone.utc) + timedelta(minutes=10)
-        tok1 = svc_user.add_user_token(user2.id, later)
-        user = svc_user.get_user_by_token(tok1.token)
+        tok1, token1 = svc_user.add_user_token(user2.id, later)
+        user = svc_user.get_user_by_token(token1)
         assert user is not None
 
         # warning: this will cause cache inconsistency
@@ -154,3 +167,31 @@ class TestCachedUserService(TestUserService):
     def test_cached_user_token(self, pokie_di, pokie_service_manager):
         pokie_di.add(DI_CACHE, MemoryCache(pokie_di))
         self.test_user_token(pokie_service_manager)
+
+    def test_negative_cache(self, pokie_di, pokie_service_manager):
+        pokie_di.add(DI_CACHE, MemoryCache(pokie_di))
+        svc_user = pokie_service_manager.get(SVC_USER)  # type: UserService
+        metrics = pokie_di.get(DI_METRICS)
+
+        # unknown username is cached as a negative entry
+        assert svc_user.get_by_username("user1") is None
+        assert svc_user.cache.get(svc_user.KEY_USERNAME.format("user1")) is False
+        assert svc_user.get_by_username("user1") is None
+        assert metrics.counter(METRIC_USERNAME_MISS).value == 2
+
+        # creating the user invalidates the negative entry
+        user1 = UserRecord(username="user1", password="")
+        user1.id = svc_user.add_user(user1)
+        record = svc_user.get_by_username("user1")
+        assert record is not None
+        assert record.id == user1.id
+
+        # unknown token is cached as a negative entry
+        token = secrets.token_hex()
+        assert svc_user.get_user_by_token(token) is None
+        assert (
+            svc_user.cache.get(svc_user.KEY_TOKEN.format(svc_user.hash_token(token)))
+            is False
+        )
+        assert svc_user.get_user_by_token(token) is None
+        assert metrics.counter(METRIC_TOKEN_MISS).value == 2
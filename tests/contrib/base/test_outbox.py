@@ -0,0 +1,97 @@
+import pytest
+from rick.event import EventHandler
+
+from pokie.constants import DI_EVENTS
+from pokie.contrib.base.constants import SVC_OUTBOX
+from pokie.contrib.base.job import OutboxRelayJob
+from pokie.contrib.base.service import OutboxService
+
+received = []
+
+
+class OutboxEventHandler(EventHandler):
+    fail = False
+
+    def outboxTest(self, idempotency_key: str, value: int, **kwargs):
+        if OutboxEventHandler.fail:
+            raise ValueError("handler failed")
+        received.append((idempotency_key, value))
+
+
+@pytest.fixture
+def outbox_handler(pokie_di):
+    evt_mgr = pokie_di.get(DI_EVENTS)
+    handler = "tests.contrib.base.test_outbox.OutboxEventHandler"
+    evt_mgr.add_handler("outboxTest", handler)
+    received.clear()
+    OutboxEventHandler.fail = False
+    yield
+    evt_mgr.remove_handler("outboxTest", handler)
+
+
+class TestOutbox:
+    def test_publish_relay(self, pokie_di, pokie_service_manager, outbox_handler):
+        svc = pokie_service_manager.get(SVC_OUTBOX)  # type: OutboxService
+
+        with svc.transaction() as conn:
+            svc.publish(conn, "outboxTest", {"value": 1}, key="evt-1")
+            # duplicate key is ignored
+            assert svc.publish(conn, "outboxTest", {"value": 2}, key="evt-1") is None
+            svc.publish(conn, "outboxTest", {"value": 3})
+
+        # rolled back transactions do not publish events
+        with pytest.raises(RuntimeError):
+            with svc.transaction() as conn:
+                svc.publish(conn, "outboxTest", {"value": 4})
+                raise RuntimeError("rollback")
+
+        assert svc.stats()["pending"] == 2
+        OutboxRelayJob(pokie_di).run(pokie_di)
+        assert len(received) == 2
+        assert received[0] == ("evt-1", 1)
+        assert received[1][0].startswith("outbox:")
+        assert received[1][1] == 3
+        assert svc.stats()["pending"] == 0
+
+        # published events are not delivered again
+        assert svc.relay(10) == 0
+        assert len(received) == 2
+
+    def test_failure(self, pokie_service_manager, outbox_handler):
+        svc = pokie_service_manager.get(SVC_OUTBOX)  # type: OutboxService
+        svc.max_attempts = 2
+        svc.retry_delay = 0
+        OutboxEventHandler.fail = True
+
+        with svc.transaction() as conn:
+            svc.publish(conn, "outboxTest", {"value": 1})
+            svc.publish(conn, "outboxTest", {"value": 2})
+
+        # delivery stops at the failed event, to preserve ordering
+        assert svc.relay(10) == 0
+        assert svc.stats()["pending"] == 2
+        assert svc.relay(10) == 0
+        stats = svc.stats()
+        assert stats["pending"] == 1
+        assert stats["dead"] == 1
+
+        OutboxEventHandler.fail = False
+        assert svc.relay(10) == 1
+        assert len(received) == 1
+        assert received[0][1] == 2
+
+    def test_backoff(self, pokie_service_manager, outbox_handler):
+        svc = pokie_service_manager.get(SVC_OUTBOX)  # type: OutboxService
+        svc.retry_delay = 60
+        OutboxEventHandler.fail = True
+
+        with svc.transaction() as conn:
+            svc.publish(conn, "outboxTest", {"value": 1})
+            svc.publish(conn, "outboxTest", {"value": 2})
+
+        assert svc.relay(10) == 0
+        # the failed event, and the events after it, wait for the retry delay
+        OutboxEventHandler.fail = False
+        assert svc.relay(10) == 0
+        assert len(received) == 0
+        assert svc.stats()["pending"] == 2
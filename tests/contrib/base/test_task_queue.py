@@ -0,0 +1,109 @@
+from datetime import datetime, timezone, timedelta
+
+import pytest
+from rick.mixin import Injectable
+
+from pokie.contrib.base.constants import SVC_TASK_QUEUE
+from pokie.contrib.base.job import TaskQueueJob
+from pokie.contrib.base.repository.task import TASK_QUEUED, TASK_DEAD
+from pokie.contrib.base.service import TaskQueueService, TaskError
+
+executed = []
+
+
+class SampleTask(Injectable):
+    def run(self, payload: dict):
+        executed.append(payload["value"])
+
+
+class FailingTask(Injectable):
+    def run(self, payload: dict):
+        raise ValueError("task failed")
+
+
+class TestTaskQueue:
+    def test_enqueue_execute(self, pokie_di, pokie_service_manager):
+        svc = pokie_service_manager.get(SVC_TASK_QUEUE)  # type: TaskQueueService
+        executed.clear()
+
+        with pytest.raises(TaskError):
+            svc.enqueue("tests.contrib.base.test_task_queue.MissingTask")
+
+        later = datetime.now(timezone.utc) + timedelta(hours=1)
+        task = "tests.contrib.base.test_task_queue.SampleTask"
+        svc.enqueue(task, {"value": 1})
+        svc.enqueue(task, {"value": 2}, priority=10)
+        svc.enqueue(task, {"value": 3}, run_at=later)
+
+        stats = svc.stats()
+        assert stats[TASK_QUEUED]["total"] == 3
+        assert stats[TASK_QUEUED]["due"] == 2
+
+        job = TaskQueueJob(pokie_di)
+        job.run(pokie_di)
+        # higher priority first; delayed task is not due
+        assert executed == [2, 1]
+        assert svc.stats()[TASK_QUEUED]["total"] == 1
+        assert svc.claim(10) == []
+
+    def test_retry_dead(self, pokie_service_manager):
+        svc = pokie_service_manager.get(SVC_TASK_QUEUE)  # type: TaskQueueService
+        svc.retry_delay = 0
+        id_task = svc.enqueue(
+            "tests.contrib.base.test_task_queue.FailingTask", max_attempts=2
+        )
+
+        records = svc.claim(10)
+        assert len(records) == 1
+        assert records[0].attempts == 1
+        assert svc.execute(records[0]) is False
+        assert svc.stats()[TASK_QUEUED]["total"] == 1
+
+        records = svc.claim(10)
+        assert records[0].attempts == 2
+        assert svc.execute(records[0]) is False
+        assert svc.stats()[TASK_DEAD]["total"] == 1
+
+        dead = svc.list_dead()
+        assert len(dead) == 1
+        assert dead[0].id == id_task
+        assert "task failed" in dead[0].last_error
+
+        assert svc.retry_dead(id_task) == 1
+        assert svc.stats()[TASK_QUEUED]["total"] == 1
+        assert TASK_DEAD not in svc.stats().keys()
+
+    def test_expired_lease(self, pokie_service_manager):
+        svc = pokie_service_manager.get(SVC_TASK_QUEUE)  # type: TaskQueueService
+        executed.clear()
+        svc.enqueue("tests.contrib.base.test_task_queue.SampleTask", {"value": 1})
+
+        svc.lease = 0
+        stale = svc.claim(10)
+        assert len(stale) == 1
+        # the lease expired, and another worker claims the task again
+        svc.lease = 300
+        records = svc.claim(10)
+        assert len(records) == 1
+        assert records[0].attempts == 2
+
+        # the stale claim cannot run, complete or re-queue the task
+        assert svc.execute(stale[0]) is False
+        assert executed == []
+        repo = svc.repo_task
+        assert repo.complete(stale[0].id, stale[0].locked_until) is False
+        assert repo.retry(stale[0].id, stale[0].locked_until, 0, "error") is False
+        assert repo.bury(stale[0].id, stale[0].locked_until, "error") is False
+
+        assert svc.execute(records[0]) is True
+        assert executed == [1]
+        assert svc.stats() == {}
+
+    def test_backoff(self, pokie_service_manager):
+        svc = pokie_service_manager.get(SVC_TASK_QUEUE)  # type: TaskQueueService
+        svc.retry_delay = 5
+        svc.retry_max_delay = 60
+        assert svc.backoff(1) == 5
+        assert svc.backoff(2) == 10
+        assert svc.backoff(3) == 20
+        assert svc.backoff(10) == 60
@@ -0,0 +1,49 @@
+import time
+
+from pokie.core import WriteBehindBuffer
+
+
+class TestWriteBehindBuffer:
+    def test_flush(self):
+        flushed = []
+        buffer = WriteBehindBuffer(flushed.append, interval=60, max_staleness=60)
+        buffer.add(1, "a")
+        buffer.add(2, "b")
+        buffer.add(1, "c")
+        assert len(buffer) == 2
+        assert buffer.get(1) == "c"
+
+        assert buffer.flush() == 2
+        assert flushed == [{1: "c", 2: "b"}]
+        assert len(buffer) == 0
+        assert buffer.flush() == 0
+        assert len(flushed) == 1
+
+    def test_max_size(self):
+        flushed = []
+        buffer = WriteBehindBuffer(flushed.append, interval=60, max_size=2)
+        buffer.add(1, "a")
+        assert len(flushed) == 0
+        buffer.add(2, "b")
+        assert flushed == [{1: "a", 2: "b"}]
+
+    def test_timer(self):
+        flushed = []
+        buffer = WriteBehindBuffer(flushed.append, interval=0.05, max_staleness=0.1)
+        buffer.add(1, "a")
+        deadline = time.monotonic() + 2
+        while not flushed and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert flushed == [{1: "a"}]
+
+    def test_error(self):
+        errors = []
+
+        def fail(values):
+            raise ValueError("flush failed")
+
+        buffer = WriteBehindBuffer(fail, interval=60, on_error=errors.append)
+        buffer.add(1, "a")
+        assert buffer.flush() == 1
+        assert len(errors) == 1
+        assert isinstance(errors[0], ValueError)
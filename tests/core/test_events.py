@@ -0,0 +1,254 @@
+import threading
+import time
+
+import pytest
+from rick.base import Di
+from rick.event import EventHandler
+
+from pokie.constants import DI_SERVICES
+from pokie.contrib.base.constants import SVC_TASK_QUEUE
+from pokie.core.events import (
+    PokieEventManager,
+    DeferredDispatcher,
+    EventHandlerTask,
+    deferred,
+    DEFERRED_QUEUE,
+    EVENT_TASK,
+)
+from pokie.core.metrics import MetricsRegistry
+
+calls = []
+lock = threading.Lock()
+
+
+class ComposeHandler(EventHandler):
+    def compose(self, data: dict = None, **kwargs):
+        data["sync"] = True
+
+
+class SlowDeferredHandler(EventHandler):
+    deferred = True
+
+    def compose(self, data: dict = None, **kwargs):
+        time.sleep(0.05)
+        with lock:
+            calls.append(("slow", data["seq"], data.get("sync", False)))
+
+
+class FailingDeferredHandler(EventHandler):
+    deferred = True
+
+    def compose(self, **kwargs):
+        raise RuntimeError("handler failed")
+
+
+@deferred()
+def deferred_function(event_name: str = None, data: dict = None, **kwargs):
+    with lock:
+        calls.append((event_name, data["seq"]))
+
+
+class QueuedHandler(EventHandler):
+    deferred = DEFERRED_QUEUE
+
+    def compose(self, data: dict = None, **kwargs):
+        calls.append(("queued", data["seq"]))
+
+
+class StatelessHandler(EventHandler):
+    stateless = True
+    instances = 0
+
+    def __init__(self, di):
+        super().__init__(di)
+        StatelessHandler.instances += 1
+
+    def compose(self, data: dict = None, **kwargs):
+        data["count"] = data.get("count", 0) + 1
+
+
+class StatefulHandler(EventHandler):
+    instances = 0
+
+    def __init__(self, di):
+        super().__init__(di)
+        StatefulHandler.instances += 1
+
+    def compose(self, data: dict = None, **kwargs):
+        data["count"] = data.get("count", 0) + 1
+
+
+class BlockingHandler(EventHandler):
+    stateless = True
+
+    def compose(self, barrier: threading.Barrier = None, **kwargs):
+        barrier.wait(5)
+
+
+class CircularHandler(EventHandler):
+    def compose(self, mgr=None, **kwargs):
+        mgr.dispatch(self.get_di(), "compose", mgr=mgr)
+
+
+class TaskQueueStub:
+    def __init__(self):
+        self.tasks = []
+
+    def enqueue(self, task_path: str, payload: dict = None, **kwargs):
+        self.tasks.append((task_path, payload))
+
+
+class TestPokieEventManager:
+    def wait(self, dispatcher: DeferredDispatcher, timeout: float = 5.0):
+        limit = time.monotonic() + timeout
+        while dispatcher.pending > 0 and time.monotonic() < limit:
+            time.sleep(0.01)
+        assert dispatcher.pending == 0
+
+    def test_deferred(self):
+        calls.clear()
+        metrics = MetricsRegistry()
+        dispatcher = DeferredDispatcher(workers=4, metrics=metrics)
+        mgr = PokieEventManager(dispatcher)
+        mgr.add_handler("compose", "tests.core.test_events.ComposeHandler", 10)
+        mgr.add_handler("compose", "tests.core.test_events.SlowDeferredHandler", 5)
+        mgr.add_handler("compose", "tests.core.test_events.FailingDeferredHandler", 20)
+        mgr.add_handler("other", "tests.core.test_events.deferred_function", 10)
+
+        start = time.monotonic()
+        for i in range(5):
+            data = {"seq": i}
+            assert mgr.dispatch(Di(), "compose", data=data) is True
+            # synchronous handlers compose the result before dispatch() returns
+            assert data["sync"] is True
+            mgr.dispatch(Di(), "other", data={"seq": i})
+        # deferred handlers do not delay the caller
+        assert time.monotonic() - start < 0.2
+        assert mgr.dispatch(Di(), "missing") is False
+
+        self.wait(dispatcher)
+        # deferred handlers run after synchronous handlers, in dispatch order per event
+        assert [c for c in calls if c[0] == "slow"] == [
+            ("slow", i, True) for i in range(5)
+        ]
+        assert [c for c in calls if c[0] == "other"] == [("other", i) for i in range(5)]
+
+        # errors are isolated and counted
+        assert metrics.counter("event_deferred_failed").value == 5
+        assert metrics.histogram("event_deferred_duration").count == 15
+        dispatcher.shutdown()
+
+    def test_queue_full(self):
+        metrics = MetricsRegistry()
+        dispatcher = DeferredDispatcher(workers=1, queue_size=2, metrics=metrics)
+        mgr = PokieEventManager(dispatcher)
+        mgr.add_handler("compose", "tests.core.test_events.SlowDeferredHandler", 5)
+        for i in range(4):
+            mgr.dispatch(Di(), "compose", data={"seq": i})
+        assert metrics.counter("event_deferred_dropped").value == 2
+        self.wait(dispatcher)
+        dispatcher.shutdown()
+
+    def test_queue(self):
+        calls.clear()
+        queue = TaskQueueStub()
+        di = Di()
+        di.add(DI_SERVICES, {SVC_TASK_QUEUE: queue})
+        mgr = PokieEventManager()
+        mgr.add_handler("compose", "tests.core.test_events.QueuedHandler", 10)
+        mgr.dispatch(di, "compose", data={"seq": 1})
+
+        assert calls == []
+        assert len(queue.tasks) == 1
+        task_path, payload = queue.tasks[0]
+        assert task_path == EVENT_TASK
+        assert payload["handler"] == "tests.core.test_events.QueuedHandler"
+
+        # the task queue worker runs the handler
+        EventHandlerTask(di).run(payload)
+        assert calls == [("queued", 1)]
+
+    def test_dispatch_durable(self):
+        calls.clear()
+        queue = TaskQueueStub()
+        di = Di()
+        di.add(DI_SERVICES, {SVC_TASK_QUEUE: queue})
+        mgr = PokieEventManager()
+        mgr.add_handler("compose", "tests.core.test_events.QueuedHandler", 10)
+
+        # queued handlers use the given enqueue function
+        tasks = []
+        mgr.dispatch_durable(
+            di, "compose", lambda *args: tasks.append(args), {"data": {"seq": 1}}
+        )
+        assert queue.tasks == []
+        assert len(tasks) == 1
+        assert tasks[0][0] == EVENT_TASK
+
+        # enqueue errors are not swallowed
+        def enqueue(task_path, payload):
+            raise RuntimeError("enqueue failed")
+
+        with pytest.raises(RuntimeError):
+            mgr.dispatch_durable(di, "compose", enqueue, {"data": {"seq": 2}})
+        assert calls == []
+
+    def test_compile(self):
+        mgr = PokieEventManager()
+        mgr.add_handler("compose", "tests.core.test_events.StatelessHandler", 10)
+        mgr.add_handler("compose", "tests.core.test_events.StatefulHandler", 20)
+        StatelessHandler.instances = 0
+        StatefulHandler.instances = 0
+        mgr.compile(Di())
+        assert StatelessHandler.instances == 1
+
+        for _ in range(3):
+            data = {}
+            mgr.dispatch(Di(), "compose", data=data)
+            assert data["count"] == 2
+        # stateless handlers are reused; others are created on every dispatch
+        assert StatelessHandler.instances == 1
+        assert StatefulHandler.instances == 3
+
+        # the table is rebuilt after changes
+        mgr.remove_handler("compose", "tests.core.test_events.StatefulHandler")
+        data = {}
+        mgr.dispatch(Di(), "compose", data=data)
+        assert data["count"] == 1
+
+        # invalid handlers fail at compile time
+        mgr.add_handler("other", "tests.core.test_events.StatelessHandler", 10)
+        with pytest.raises(RuntimeError):
+            mgr.compile(Di())
+        mgr.remove_handler("other", "tests.core.test_events.StatelessHandler")
+        mgr.add_handler("compose", "tests.core.test_events.MissingHandler", 10)
+        with pytest.raises(RuntimeError):
+            mgr.compile(Di())
+
+    def test_concurrent_dispatch(self):
+        mgr = PokieEventManager()
+        mgr.add_handler("compose", "tests.core.test_events.BlockingHandler", 10)
+        mgr.compile(Di())
+        # the same event may be dispatched concurrently from different threads
+        barrier = threading.Barrier(2)
+        errors = []
+
+        def dispatch():
+            try:
+                mgr.dispatch(Di(), "compose", barrier=barrier)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=dispatch) for _ in range(2)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(5)
+        assert errors == []
+
+        mgr = PokieEventManager()
+        mgr.add_handler("compose", "tests.core.test_events.CircularHandler", 10)
+        with pytest.raises(RuntimeError):
+            mgr.dispatch(Di(), "compose", mgr=mgr)
+        # stack is cleaned up after errors
+        assert mgr._local.stack == []
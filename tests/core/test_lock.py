@@ -0,0 +1,137 @@
+import pytest
+from rick.base import Container, Di
+
+from pokie.constants import DI_CONFIG, DI_REDIS
+from pokie.core.lock import (
+    AdvisoryLock,
+    RedisLease,
+    job_lock_factory,
+    LOCK_BACKEND_REDIS,
+)
+
+
+def pool_used(db) -> int:
+    # connections currently checked out of the pool
+    return len(db._pool._used)
+
+
+class TestAdvisoryLock:
+    def test_acquire(self, pokie_db):
+        used = pool_used(pokie_db)
+        lock = AdvisoryLock(pokie_db, "test:advisory")
+        assert lock.acquire() is True
+        assert lock.held is True
+        # the lock keeps its connection until released
+        assert pool_used(pokie_db) == used + 1
+        assert lock.acquire() is True
+        assert lock.renew() is True
+
+        lock.release()
+        assert lock.held is False
+        assert lock.renew() is False
+        assert pool_used(pokie_db) == used
+
+    def test_contention(self, pokie_db):
+        used = pool_used(pokie_db)
+        lock1 = AdvisoryLock(pokie_db, "test:advisory")
+        lock2 = AdvisoryLock(pokie_db, "test:advisory")
+        other = AdvisoryLock(pokie_db, "test:other")
+        assert lock1.acquire() is True
+        assert lock2.acquire() is False
+        assert lock2.held is False
+        assert other.acquire() is True
+        # failed attempts return the connection to the pool
+        assert pool_used(pokie_db) == used + 2
+
+        lock1.release()
+        assert lock2.acquire() is True
+        lock2.release()
+        other.release()
+        assert pool_used(pokie_db) == used
+
+    def test_lost_connection(self, pokie_db):
+        lock1 = AdvisoryLock(pokie_db, "test:advisory")
+        assert lock1.acquire() is True
+        # closing the connection releases the lock
+        lock1._conn.db.close()
+        assert lock1.renew() is False
+        assert lock1.held is False
+
+        lock2 = AdvisoryLock(pokie_db, "test:advisory")
+        assert lock2.acquire() is True
+        lock2.release()
+
+
+class TestRedisLease:
+    def test_acquire(self, pokie_di):
+        redis = pokie_di.get(DI_REDIS)
+        lease = RedisLease(redis, "test:lease", 5)
+        try:
+            assert lease.acquire() is True
+            assert lease.held is True
+            assert 0 < redis.pttl(lease.key) <= 5000
+            # acquiring a held lease renews it
+            assert lease.acquire() is True
+        finally:
+            lease.release()
+        assert lease.held is False
+        assert redis.exists(lease.key) == 0
+
+    def test_contention(self, pokie_di):
+        redis = pokie_di.get(DI_REDIS)
+        lease1 = RedisLease(redis, "test:lease", 5)
+        lease2 = RedisLease(redis, "test:lease", 5)
+        try:
+            assert lease1.acquire() is True
+            assert lease2.acquire() is False
+            assert lease2.renew() is False
+            lease1.release()
+            assert lease2.acquire() is True
+        finally:
+            lease1.release()
+            lease2.release()
+
+    def test_renew(self, pokie_di):
+        redis = pokie_di.get(DI_REDIS)
+        lease = RedisLease(redis, "test:lease", 5)
+        try:
+            assert lease.acquire() is True
+            redis.pexpire(lease.key, 100)
+            assert lease.renew() is True
+            assert redis.pttl(lease.key) > 100
+        finally:
+            lease.release()
+
+    def test_release_owner(self, pokie_di):
+        redis = pokie_di.get(DI_REDIS)
+        lease1 = RedisLease(redis, "test:lease", 5)
+        lease2 = RedisLease(redis, "test:lease", 5)
+        try:
+            assert lease1.acquire() is True
+            # the lease expires, and is taken by another holder
+            redis.delete(lease1.key)
+            assert lease2.acquire() is True
+
+            # the previous holder can neither renew nor release it
+            assert lease1.renew() is False
+            lease1._held = True
+            lease1.release()
+            assert redis.exists(lease2.key) == 1
+            assert lease2.renew() is True
+        finally:
+            lease2.release()
+        assert redis.exists(lease2.key) == 0
+
+
+class TestJobLockFactory:
+    def test_backend(self, pokie_di):
+        di = Di()
+        di.add(DI_CONFIG, Container({"job_lock_backend": LOCK_BACKEND_REDIS}))
+        di.add(DI_REDIS, pokie_di.get(DI_REDIS))
+        lock = job_lock_factory(di)("test:factory")
+        assert isinstance(lock, RedisLease)
+
+        di = Di()
+        di.add(DI_CONFIG, Container({"job_lock_backend": "invalid"}))
+        with pytest.raises(ValueError):
+            job_lock_factory(di)
@@ -0,0 +1,109 @@
+import json
+import os
+import stat
+
+from rick.base import Di
+from rick.util.loader import load_class
+
+from pokie.core.manifest import CommandManifest, default_manifest_file
+
+
+class SampleModule:
+    name = "sample"
+    description = "sample module"
+
+    def __init__(self, cmd: dict):
+        self.cmd = cmd
+
+
+class TestCommandManifest:
+    def modules(self):
+        return {
+            "sample": SampleModule(
+                {
+                    "version": "pokie.contrib.base.cli.VersionCmd",
+                    "help": "pokie.contrib.base.cli.HelpCmd",
+                    "pytest": "pokie.contrib.base.cli.PyTestCmd",
+                }
+            )
+        }
+
+    def test_build(self):
+        manifest = CommandManifest(Di(), self.modules())
+        commands = manifest.commands()
+        assert list(commands.keys()) == ["version", "help", "pytest"]
+
+        help_cmd = commands["help"]
+        assert help_cmd["path"] == "pokie.contrib.base.cli.HelpCmd"
+        assert help_cmd["module"] == "sample"
+        assert help_cmd["description"] == load_class(help_cmd["path"]).description
+        assert "command" in help_cmd["usage"]
+        assert help_cmd["options"] == []
+        # skipargs commands have no usage
+        assert commands["pytest"]["options"] == []
+        assert manifest.get("missing") is None
+
+    def test_cache(self, tmp_path, monkeypatch):
+        path = str(tmp_path / "manifest.json")
+        manifest = CommandManifest(Di(), self.modules(), path)
+        commands = manifest.commands()
+        with open(path) as f:
+            assert json.load(f)["commands"] == commands
+
+        # cached manifest is used without loading command classes
+        def fail(self):
+            raise AssertionError("manifest rebuilt")
+
+        monkeypatch.setattr(CommandManifest, "build", fail)
+        assert CommandManifest(Di(), self.modules(), path).commands() == commands
+
+    def test_invalidation(self, tmp_path):
+        path = str(tmp_path / "manifest.json")
+        modules = self.modules()
+        CommandManifest(Di(), modules, path).commands()
+
+        modules["sample"].cmd["list"] = "pokie.contrib.base.cli.ListCmd"
+        commands = CommandManifest(Di(), modules, path).commands()
+        assert "list" in commands.keys()
+
+        modules["sample"].version = "2.0"
+        manifest = CommandManifest(Di(), modules, path)
+        assert manifest.read(manifest.key()) is None
+
+    def test_file_permissions(self, tmp_path):
+        path = str(tmp_path / "manifest.json")
+        CommandManifest(Di(), self.modules(), path).commands()
+        assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+        # no temp files are left behind
+        assert os.listdir(str(tmp_path)) == ["manifest.json"]
+
+    def test_default_file(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+        path = default_manifest_file()
+        cache_dir = os.path.dirname(path)
+        assert cache_dir == str(tmp_path / "pokie")
+        assert stat.S_IMODE(os.stat(cache_dir).st_mode) == 0o700
+
+        # cache dir cannot be created
+        blocker = tmp_path / "file"
+        blocker.write_text("")
+        monkeypatch.setenv("XDG_CACHE_HOME", str(blocker))
+        assert default_manifest_file() is None
+
+    def test_invalid_file(self, tmp_path):
+        path = tmp_path / "manifest.json"
+        path.write_text("not json")
+        manifest = CommandManifest(Di(), self.modules(), str(path))
+        assert "version" in manifest.commands().keys()
+
+        # write errors are ignored
+        manifest = CommandManifest(
+            Di(), self.modules(), str(tmp_path / "missing" / "manifest.json")
+        )
+        assert "version" in manifest.commands().keys()
+
+    def test_lazy_exports(self):
+        cls = load_class("pokie.contrib.auth.cli.UserListCmd")
+        assert cls is not None
+        assert cls.__module__ == "pokie.contrib.auth.cli.user"
+        assert load_class("pokie.contrib.base.cli.MissingCmd") is None
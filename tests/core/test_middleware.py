@@ -0,0 +1,200 @@
+import threading
+from time import sleep
+
+from rick.base import Container, Di
+
+from pokie.constants import DI_METRICS
+from pokie.core import FlaskApplication, ModuleRunnerMiddleware, PokieMiddleware
+from pokie.core.metrics import MetricsRegistry
+from pokie.core.middleware import MiddlewareTimer
+from pokie.http import PokieView, JsonResponse, CamelCaseJsonResponse
+
+MIDDLEWARE_MODULE = """
+from pokie.core import BaseModule
+
+
+class Module(BaseModule):
+    name = "middleware_sample"
+    middlewares = {
+        20: ["tests.core.test_middleware.InnerMiddleware"],
+        10: [
+            "tests.core.test_middleware.OuterMiddleware",
+            "tests.core.test_middleware.HeaderMiddleware",
+        ],
+    }
+"""
+
+
+class OuterMiddleware(PokieMiddleware):
+    def __call__(self, environ, start_response):
+        environ.setdefault("sample.stages", []).append("outer")
+        return self.app(environ, start_response)
+
+
+class InnerMiddleware(PokieMiddleware):
+    def __call__(self, environ, start_response):
+        environ.setdefault("sample.stages", []).append("inner")
+        return self.app(environ, start_response)
+
+
+class HeaderMiddleware:
+    # generic WSGI middleware
+    def __init__(self, app):
+        self.app = app
+
+    def __call__(self, environ, start_response):
+        def header_start_response(status, headers, exc_info=None):
+            headers.append(("X-Stages", ",".join(environ["sample.stages"])))
+            return start_response(status, headers, exc_info)
+
+        environ["sample.stages"].append("header")
+        return self.app(environ, header_start_response)
+
+
+class SampleView(PokieView):
+    def get(self):
+        return self.success({"some_value": 1})
+
+
+class CamelView(SampleView):
+    camel_case = True
+
+
+class AsyncView(PokieView):
+    async def get(self):
+        return self.success({"async": True})
+
+
+class TestInitMiddleware:
+    def build(self) -> FlaskApplication:
+        app = FlaskApplication(Container({}))
+        flask = app.build([])
+        flask.add_url_rule("/sample", view_func=SampleView.as_view("sample"))
+        flask.add_url_rule("/camel", view_func=CamelView.as_view("camel"))
+        return app
+
+    def test_lazy_init(self):
+        calls = []
+
+        def hook(app):
+            calls.append(app)
+
+        app = self.build()
+        app.register_pre_http_hook(hook)
+        assert isinstance(app.app.wsgi_app, ModuleRunnerMiddleware)
+        assert app.ready is False
+
+        with app.app.test_client() as client:
+            assert client.get("/sample").status_code == 200
+            assert client.get("/sample").status_code == 200
+
+        # middleware is removed once initialized
+        assert app.ready is True
+        assert app.initialized is True
+        assert not isinstance(app.app.wsgi_app, ModuleRunnerMiddleware)
+        assert calls == [app]
+
+    def test_init(self):
+        app = self.build()
+        app.init()
+        app.init()
+        assert app.ready is True
+        assert not isinstance(app.app.wsgi_app, ModuleRunnerMiddleware)
+
+        with app.app.test_client() as client:
+            assert client.get("/sample").json == {
+                "success": True,
+                "data": {"some_value": 1},
+            }
+            assert client.get("/camel").json == {
+                "success": True,
+                "data": {"someValue": 1},
+            }
+
+
+class TestMiddlewareChain:
+    def build(self, tmp_path, monkeypatch, timing=True) -> FlaskApplication:
+        pkg = tmp_path / "middleware_sample"
+        pkg.mkdir()
+        (pkg / "__init__.py").write_text("")
+        (pkg / "module.py").write_text(MIDDLEWARE_MODULE)
+        monkeypatch.syspath_prepend(str(tmp_path))
+
+        app = FlaskApplication(Container({"http_middleware_timing": timing}))
+        flask = app.build(["middleware_sample"])
+        flask.add_url_rule("/sample", view_func=SampleView.as_view("sample"))
+        return app
+
+    def test_chain(self, tmp_path, monkeypatch):
+        app = self.build(tmp_path, monkeypatch)
+        assert [priority for priority, _ in app.middlewares] == [10, 10, 20]
+
+        with app.app.test_client() as client:
+            result = client.get("/sample")
+            assert result.status_code == 200
+            assert result.headers["X-Stages"] == "outer,header,inner"
+            client.get("/sample")
+
+        metrics = app.di.get(DI_METRICS)
+        for name in [
+            "tests.core.test_middleware.OuterMiddleware",
+            "tests.core.test_middleware.HeaderMiddleware",
+            "tests.core.test_middleware.InnerMiddleware",
+            "flask",
+        ]:
+            histogram = metrics.get("http_middleware:{}".format(name))
+            assert histogram.count == 2
+
+    def test_timer(self):
+        metrics = MetricsRegistry()
+        local = threading.local()
+
+        def slow_app(environ, start_response):
+            sleep(0.05)
+            return []
+
+        inner = MiddlewareTimer(slow_app, metrics.histogram("inner"), local)
+        outer = MiddlewareTimer(
+            PokieMiddleware(inner, Di()), metrics.histogram("outer"), local
+        )
+        outer({}, None)
+        # outer stages do not include the time of inner stages
+        assert metrics.get("inner").sum >= 0.05
+        assert metrics.get("outer").sum < 0.01
+
+    def test_no_timing(self, tmp_path, monkeypatch):
+        app = self.build(tmp_path, monkeypatch, timing=False)
+        with app.app.test_client() as client:
+            assert client.get("/sample").headers["X-Stages"] == "outer,header,inner"
+        metrics = app.di.get(DI_METRICS)
+        assert [n for n in metrics.names() if n.startswith("http_middleware:")] == []
+
+
+class TestView:
+    def test_response_class(self):
+        assert SampleView._default_response_class is JsonResponse
+        assert CamelView._default_response_class is CamelCaseJsonResponse
+
+    def test_ensure_sync(self):
+        app = FlaskApplication(Container({}))
+        flask = app.build([])
+        flask.add_url_rule("/sample", view_func=SampleView.as_view("sample"))
+        app.init()
+        with flask.test_client() as client:
+            assert client.get("/sample").status_code == 200
+        assert SampleView._async_handlers == {"get": False}
+
+        # coroutine handlers are wrapped by Flask
+        wrapped = []
+
+        def ensure_sync(fn):
+            wrapped.append(fn.__name__)
+            return fn
+
+        flask.ensure_sync = ensure_sync
+        with flask.test_request_context("/"):
+            view = AsyncView()
+            view.ensure_sync(view.get)
+            view.ensure_sync(view.get)
+        assert wrapped == ["get", "get"]
+        assert AsyncView._async_handlers == {"get": True}
@@ -0,0 +1,237 @@
+import threading
+import time
+from datetime import datetime
+
+import pytest
+from rick.base import Container, Di
+
+from pokie.constants import DI_CONFIG
+from pokie.contrib.base.module import Module as BaseModule
+from pokie.core.metrics import MetricsRegistry
+from pokie.core.scheduler import (
+    CronSchedule,
+    JobScheduler,
+    ScheduledJob,
+    read_state_file,
+    job_health,
+    JOB_CONTINUOUS,
+    JOB_INTERVAL,
+    JOB_CRON,
+    JOB_OK,
+    JOB_RUNNING,
+    JOB_FAILING,
+    JOB_OVERRUN,
+    JOB_LATE,
+    JOB_STALE,
+)
+
+
+class CounterJob:
+    def __init__(self, schedule=None, delay=0.0, max_runtime=None):
+        self.schedule = schedule
+        self.max_runtime = max_runtime
+        self.delay = delay
+        self.runs = 0
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+
+    def run(self, di):
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(self.delay)
+        with self.lock:
+            self.active -= 1
+            self.runs += 1
+
+
+class FailingJob:
+    schedule = 0.05
+
+    def run(self, di):
+        raise RuntimeError("job failed")
+
+
+class SingletonJob(CounterJob):
+    singleton = True
+
+
+class MemoryLock:
+    # in-process stand-in for a shared lock backend
+    owners = {}
+
+    def __init__(self, key):
+        self.key = key
+        self.held = False
+
+    def acquire(self) -> bool:
+        if self.owners.setdefault(self.key, self) is self:
+            self.held = True
+        return self.held
+
+    def renew(self) -> bool:
+        return self.held
+
+    def release(self):
+        if self.owners.get(self.key, None) is self:
+            del self.owners[self.key]
+        self.held = False
+
+
+class TestCronSchedule:
+    def test_next(self):
+        cron = CronSchedule("*/15 * * * *")
+        assert cron.next(datetime(2024, 1, 1, 10, 7)) == datetime(2024, 1, 1, 10, 15)
+        assert cron.next(datetime(2024, 1, 1, 10, 45)) == datetime(2024, 1, 1, 11, 0)
+
+        cron = CronSchedule("30 2 * * 0")  # sundays at 2:30
+        assert cron.next(datetime(2024, 1, 1, 0, 0)) == datetime(2024, 1, 7, 2, 30)
+
+        cron = CronSchedule("0 0 1 1-3,6 *")
+        assert cron.next(datetime(2024, 3, 2, 0, 0)) == datetime(2024, 6, 1, 0, 0)
+
+        # both day fields restricted: either matches
+        cron = CronSchedule("0 12 15 * 1")
+        assert cron.next(datetime(2024, 1, 1, 13, 0)) == datetime(2024, 1, 8, 12, 0)
+
+    def test_invalid(self):
+        for expr in ["* * * *", "60 * * * *", "*/0 * * * *", "5-1 * * * *"]:
+            with pytest.raises(ValueError):
+                CronSchedule(expr)
+
+
+class TestJobScheduler:
+    def test_modes(self):
+        assert ScheduledJob("a", CounterJob()).mode == JOB_CONTINUOUS
+        assert ScheduledJob("b", CounterJob(5)).mode == JOB_INTERVAL
+        assert ScheduledJob("c", CounterJob("* * * * *")).mode == JOB_CRON
+
+    def test_delay(self):
+        now = time.time()
+        job = ScheduledJob("a", CounterJob(), idle_interval=15)
+        assert job.next_delay(now) == 0.0
+        # continuous jobs wait idle_interval after each run
+        job.last_run = now
+        assert job.next_delay(now) == 15
+
+        # failed runs back off exponentially
+        job = ScheduledJob("b", CounterJob(schedule=0.1))
+        job.last_run = now
+        job.consecutive_failures = 1
+        assert job.next_delay(now) == ScheduledJob.BACKOFF_MIN
+        job.consecutive_failures = 3
+        assert job.next_delay(now) == ScheduledJob.BACKOFF_MIN * 4
+        job.consecutive_failures = 100
+        assert job.next_delay(now) == ScheduledJob.BACKOFF_MAX
+
+    def test_scheduler(self, tmp_path):
+        continuous = CounterJob(delay=0.01)
+        interval = CounterJob(schedule=0.2)
+        slow = CounterJob(schedule=0.01, delay=0.3, max_runtime=0.1)
+        metrics = MetricsRegistry()
+        state_file = str(tmp_path / "jobs.json")
+        scheduler = JobScheduler(
+            None,
+            [
+                ("continuous", continuous),
+                ("interval", interval),
+                ("slow", slow),
+                ("failing", FailingJob()),
+            ],
+            workers=4,
+            state_file=state_file,
+            metrics=metrics,
+            idle_interval=0.01,
+        )
+        runner = threading.Thread(target=scheduler.run)
+        runner.start()
+        time.sleep(1.1)
+        scheduler.stop()
+        runner.join(5)
+        assert not runner.is_alive()
+
+        # slow job does not delay the others
+        assert continuous.runs > 10
+        assert 4 <= interval.runs <= 7
+        # jobs never overlap with themselves
+        assert slow.max_active == 1
+        assert continuous.max_active == 1
+        assert metrics.counter("job_overrun").value >= 1
+        assert metrics.counter("job_failed").value >= 1
+
+        state = read_state_file(state_file)
+        assert state["interval"]["runs"] == interval.runs
+        assert state["interval"]["last_duration"] is not None
+        assert state["failing"]["last_error"] == "job failed"
+        assert state["slow"]["overruns"] >= 1
+        assert state["interval"]["last_success"] is not None
+        assert state["failing"]["last_success"] is None
+
+        # per-job metrics
+        assert metrics.histogram("job_duration:interval").count == interval.runs
+        assert metrics.counter("job_runs:continuous").value == continuous.runs
+        assert metrics.counter("job_failed:failing").value >= 1
+        assert metrics.counter("job_overrun:slow").value >= 1
+        assert state["interval"]["duration"]["count"] == interval.runs
+
+    def test_health(self):
+        now = time.time()
+        info = {"running": False, "max_runtime": 10, "next_run": now + 5}
+        assert job_health(info, now, now, 60) == JOB_OK
+        assert job_health(info, now - 120, now, 60) == JOB_STALE
+        assert job_health(dict(info, next_run=now - 120), now, now, 60) == JOB_LATE
+        assert job_health(dict(info, last_error="error"), now, now, 60) == JOB_FAILING
+
+        info = dict(info, running=True, last_run=now - 5)
+        assert job_health(info, now, now, 60) == JOB_RUNNING
+        info["last_run"] = now - 20
+        assert job_health(info, now, now, 60) == JOB_OVERRUN
+
+    def test_singleton(self, tmp_path):
+        jobs = [SingletonJob(schedule=0.05), SingletonJob(schedule=0.05)]
+        schedulers = [
+            JobScheduler(
+                None,
+                [("singleton", job)],
+                state_file=str(tmp_path / "jobs{}.json".format(i)),
+                lock_factory=MemoryLock,
+                lock_renew=0.1,
+            )
+            for i, job in enumerate(jobs)
+        ]
+        runners = [threading.Thread(target=s.run) for s in schedulers]
+        runners[0].start()
+        time.sleep(0.3)
+        runners[1].start()
+        time.sleep(0.3)
+
+        # only the lock holder runs the job
+        assert jobs[0].runs > 0
+        assert jobs[1].runs == 0
+        assert schedulers[1].jobs[0].skipped > 0
+
+        # lock is released on stop, and the other scheduler takes over
+        schedulers[0].stop()
+        runners[0].join(5)
+        time.sleep(0.5)
+        schedulers[1].stop()
+        runners[1].join(5)
+        assert jobs[1].runs > 0
+        assert MemoryLock.owners == {}
+
+
+class TestModuleJobs:
+    def jobs(self, cfg: dict) -> list:
+        di = Di()
+        di.add(DI_CONFIG, Container(cfg))
+        return BaseModule(di).jobs
+
+    def test_opt_in(self):
+        # database polling jobs are disabled by default
+        assert self.jobs({}) == ["pokie.contrib.base.job.IdleJob"]
+        assert self.jobs({"task_queue_job": True, "outbox_relay_job": True}) == [
+            "pokie.contrib.base.job.IdleJob",
+            "pokie.contrib.base.job.TaskQueueJob",
+            "pokie.contrib.base.job.OutboxRelayJob",
+        ]
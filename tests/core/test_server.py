@@ -0,0 +1,48 @@
+import threading
+import time
+from http.client import HTTPConnection
+
+from pokie.core.server import PoolWSGIServer, bind_socket
+
+
+def slow_app(environ, start_response):
+    if environ["PATH_INFO"] == "/slow":
+        time.sleep(0.5)
+    start_response("200 OK", [("Content-Type", "text/plain")])
+    return [environ["PATH_INFO"].encode("utf-8")]
+
+
+def request(port: int, path: str) -> str:
+    conn = HTTPConnection("127.0.0.1", port, timeout=5)
+    try:
+        conn.request("GET", path)
+        return conn.getresponse().read().decode("utf-8")
+    finally:
+        conn.close()
+
+
+class TestPoolWSGIServer:
+    def test_serve_drain(self):
+        sock = bind_socket("127.0.0.1", 0)
+        port = sock.getsockname()[1]
+        server = PoolWSGIServer("127.0.0.1", port, slow_app, 2, sock.fileno())
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+        try:
+            assert request(port, "/") == "/"
+
+            # requests running when drain is called are completed
+            result = []
+            client = threading.Thread(
+                target=lambda: result.append(request(port, "/slow"))
+            )
+            client.start()
+            time.sleep(0.1)
+            server.drain()
+            client.join()
+            assert result == ["/slow"]
+        finally:
+            server.drain()
+            thread.join(5)
+            sock.close()
+        assert not thread.is_alive()
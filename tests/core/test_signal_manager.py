@@ -0,0 +1,38 @@
+import signal
+import threading
+
+from rick.base import Di
+
+from pokie.core import SignalManager
+
+
+class TestSignalManager:
+    def test_shutdown_handlers(self):
+        calls = []
+        previous = signal.getsignal(signal.SIGTERM)
+        di = Di()
+        manager = SignalManager(di)
+
+        def handler(_di):
+            calls.append(_di)
+
+        manager.add_shutdown_handler(handler)
+        # registering shutdown handlers does not install signal handlers
+        assert signal.getsignal(signal.SIGTERM) is previous
+        assert manager.handlers == {}
+
+        # handlers run once
+        manager.shutdown()
+        manager.shutdown()
+        assert calls == [di]
+
+    def test_thread_registration(self):
+        manager = SignalManager(Di())
+        thread = threading.Thread(
+            target=manager.add_shutdown_handler, args=(lambda _di: None,)
+        )
+        thread.start()
+        thread.join()
+        assert len(manager.shutdown_handlers) == 1
+        assert manager.handlers == {}
+        manager.shutdown()
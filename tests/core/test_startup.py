@@ -0,0 +1,101 @@
+import importlib
+import sys
+
+from rick.base import Container
+
+from pokie.constants import DI_SERVICES
+from pokie.core import FlaskApplication
+from pokie.core.startup import (
+    StartupReport,
+    ImportTimer,
+    BOOT_LOAD,
+    BOOT_BUILD,
+    BOOT_INIT,
+    WARMUP_SERVICES,
+    WARMUP_ROUTES,
+    WARMUP_MODULES,
+)
+from pokie.http import PokieView
+
+warmed = []
+
+
+class SampleView(PokieView):
+    @classmethod
+    def warmup(cls, di):
+        warmed.append(cls)
+
+    def get(self):
+        return self.success()
+
+
+class TestStartup:
+    def test_report(self):
+        report = StartupReport()
+        with report.measure("a", "one"):
+            pass
+        with report.measure("b", "two"):
+            pass
+        with report.measure("a", "three"):
+            pass
+        assert [(step.stage, step.name) for step in report.entries] == [
+            ("a", "one"),
+            ("b", "two"),
+            ("a", "three"),
+        ]
+        assert list(report.totals().keys()) == ["a", "b"]
+        report.error("a", "one", "failed")
+        assert report.errors[("a", "one")] == "failed"
+        data = report.to_dict()
+        assert [step["name"] for step in data["steps"]] == ["one", "two", "three"]
+        assert data["steps"][0]["error"] == "failed"
+        report.clear()
+        assert report.entries == []
+        assert report.errors == {}
+
+    def test_import_time(self, tmp_path, monkeypatch):
+        (tmp_path / "startup_sample.py").write_text("SAMPLE = 1\n")
+        monkeypatch.syspath_prepend(str(tmp_path))
+        report = StartupReport()
+        with report.measure("a", "import"):
+            importlib.import_module("startup_sample")
+        step = report.entries[0]
+        assert step.imports == 1
+        assert 0 < step.import_time <= step.duration
+        # the import timer is only active while measuring
+        assert all(not isinstance(f, ImportTimer) for f in sys.meta_path)
+        module = sys.modules.pop("startup_sample")
+        assert module.SAMPLE == 1
+        assert "exec_module" not in vars(module.__loader__)
+
+    def test_warmup(self):
+        app = FlaskApplication(Container({}))
+        flask = app.build([])
+        flask.add_url_rule("/sample", view_func=SampleView.as_view("sample"))
+        flask.add_url_rule("/other", view_func=SampleView.as_view("other"))
+        warmed.clear()
+
+        report = app.warmup()
+        assert app.initialized is True
+        # view classes are warmed up once
+        assert warmed == [SampleView]
+
+        steps = [(step.stage, step.name) for step in report.entries]
+        assert (WARMUP_ROUTES, "url_map") in steps
+        assert (WARMUP_MODULES, "pokie.contrib.base") in steps
+        # boot steps are recorded by build() and init()
+        assert (BOOT_LOAD, "pokie.contrib.base") in steps
+        assert (BOOT_BUILD, "events") in steps
+        assert (BOOT_INIT, "pokie.contrib.base") in steps
+        assert report.elapsed() > 0
+
+        # base services require a database; failures are reported, and services can still be built later
+        services = [name for stage, name in steps if stage == WARMUP_SERVICES]
+        assert len(services) == len(app.service_map)
+        name = services[0]
+        assert (WARMUP_SERVICES, name) in report.errors.keys()
+        mgr = app.di.get(DI_SERVICES)
+        try:
+            mgr.get(name)
+        except RuntimeError as e:
+            assert "circular" not in str(e)
@@ -0,0 +1,74 @@
+import pytest
+from rick.base import Di
+
+from pokie.constants import DI_SERVICES
+from pokie.core.application import FlaskApplication
+from pokie.core.supervisor import (
+    ProcessSupervisor,
+    WorkerSupervisor,
+    JOB_REPLICATE,
+)
+
+
+class PartitionedJob:
+    pass
+
+
+class ReplicatedJob:
+    policy = JOB_REPLICATE
+
+
+class TestWorkerSupervisor:
+    def test_abstract(self):
+        # subclasses must implement worker()
+        with pytest.raises(TypeError):
+            ProcessSupervisor(None, 1)
+
+    def test_assign(self):
+        jobs = [
+            ("a", PartitionedJob),
+            ("b", ReplicatedJob),
+            ("c", PartitionedJob),
+            ("d", PartitionedJob),
+        ]
+        result = WorkerSupervisor.assign(jobs, 2)
+        assert [name for name, _ in result[0]] == ["a", "b", "d"]
+        assert [name for name, _ in result[1]] == ["b", "c"]
+
+        # more workers than jobs
+        result = WorkerSupervisor.assign(jobs[:1], 3)
+        assert len(result[0]) == 1
+        assert result[1] == []
+        assert result[2] == []
+
+    def test_match_job(self):
+        assert FlaskApplication._match_job("module.job.SampleJob", ["SampleJob"])
+        assert FlaskApplication._match_job(
+            "module.job.SampleJob", ["module.job.SampleJob"]
+        )
+        assert not FlaskApplication._match_job("module.job.SampleJob", ["Sample"])
+
+    def test_rebuild_factories(self):
+        built = []
+
+        def factory(_di: Di):
+            @_di.register("resource")
+            def _factory(_di: Di):
+                built.append(1)
+                return object()
+
+        app = FlaskApplication.__new__(FlaskApplication)
+        app.di = Di()
+        app.factories = [factory]
+        app.service_map = {}
+        factory(app.di)
+        first = app.di.get("resource")
+
+        # resources are replaced and built lazily
+        app.rebuild_factories()
+        assert len(built) == 1
+        second = app.di.get("resource")
+        assert second is not first
+        assert len(built) == 2
+        # services are built again, with the new resources
+        assert app.di.has(DI_SERVICES)
@@ -1,6 +1,7 @@
 from flask import Response
 
 from pokie.constants import DI_APP
+from pokie.contrib.auth.hasher import HasherBusyError
 from pokie.http import HttpErrorHandler
 
 
@@ -28,3 +29,9 @@ class TestErrorHandler:
         assert isinstance(err, Response)
         assert err.status == "500 INTERNAL SERVER ERROR"
         assert err.json["success"] == False
+
+        err = obj.error_503(pokie_app, HasherBusyError(retry_after=2))
+        assert isinstance(err, Response)
+        assert err.status == "503 SERVICE UNAVAILABLE"
+        assert err.headers["Retry-After"] == "2"
+        assert err.json["success"] == False